@@ -0,0 +1,61 @@
+"""
+Per-report cost for a periodic sensor gateway: send_device_telemetry() and
+send_position() with keyword arguments on every call, versus a telemetry_template() /
+position_template() that only updates the changing fields.
+
+    python benchmarks/bench_builders.py --count 20000
+"""
+
+import argparse
+import socket
+import time
+
+from mudp import conn, node, position_template, send_device_telemetry, send_position, set_quiet, telemetry_template
+
+
+def per_send_usec(count: int, send) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for i in range(count):
+            send(i)
+        best = min(best, time.perf_counter() - start)
+    return best / count * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    set_quiet()
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    conn.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    conn.host, conn.port = sink.getsockname()
+    node.node_id, node.channel, node.key = "!00000abc", "LongFast", "1PG7OiApB1nwvP+rz05pAQ=="
+
+    telemetry = telemetry_template(battery_level=100, voltage=4.1, channel_utilization=3.5, air_util_tx=1.2)
+    position = position_template(52.5, 13.4, altitude=40, sats_in_view=9, precision_bits=32)
+    cases = (
+        (
+            "device telemetry",
+            lambda i: send_device_telemetry(
+                battery_level=i % 100, voltage=4.1, channel_utilization=3.5, air_util_tx=1.2, uptime_seconds=i
+            ),
+            lambda i: telemetry.send(battery_level=i % 100, uptime_seconds=i),
+        ),
+        (
+            "position",
+            lambda i: send_position(52.5, 13.4, altitude=40 + i % 5, sats_in_view=9, precision_bits=32),
+            lambda i: position.send(altitude=40 + i % 5),
+        ),
+    )
+    for label, kwargs_send, template_send in cases:
+        plain = per_send_usec(args.count, kwargs_send)
+        templated = per_send_usec(args.count, template_send)
+        print(f"{label:17s} kwargs {plain:6.2f} us   template {templated:6.2f} us   ({plain / templated:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
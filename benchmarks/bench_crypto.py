@@ -0,0 +1,64 @@
+"""
+Per-packet crypto overhead with and without the prepared cipher key cache.
+
+"cold" invalidates the cache before every call, which reproduces the old behavior of
+normalizing, base64-decoding and building an AES object per packet.
+
+    python benchmarks/bench_crypto.py --iterations 50000
+"""
+
+import argparse
+import time
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp.encryption import decrypt_packet, encrypt_packet, generate_hash, invalidate_cipher_cache
+
+CHANNEL = "LongFast"
+KEY = "AQ=="
+
+
+def build_packet() -> tuple[mesh_pb2.MeshPacket, mesh_pb2.Data]:
+    packet = mesh_pb2.MeshPacket()
+    packet.id = 0x01020304
+    setattr(packet, "from", 0xDEADBEEF)
+    data = mesh_pb2.Data()
+    data.portnum = portnums_pb2.PortNum.TEXT_MESSAGE_APP
+    data.payload = b"hello mesh" * 4
+    packet.encrypted = encrypt_packet(CHANNEL, KEY, packet, data)
+    return packet, data
+
+
+def measure(func, iterations: int, cold: bool) -> float:
+    start = time.perf_counter()
+    if cold:
+        for _ in range(iterations):
+            invalidate_cipher_cache()
+            func()
+    else:
+        for _ in range(iterations):
+            func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    packet, data = build_packet()
+    cases = {
+        "encrypt_packet": lambda: encrypt_packet(CHANNEL, KEY, packet, data),
+        "decrypt_packet": lambda: decrypt_packet(packet, KEY),
+        "generate_hash": lambda: generate_hash(CHANNEL, KEY),
+    }
+
+    print(f"{'case':<16} {'cold us':>10} {'cached us':>10} {'speedup':>8}")
+    for name, func in cases.items():
+        cold = measure(func, args.iterations, cold=True)
+        cached = measure(func, args.iterations, cold=False)
+        print(f"{name:<16} {cold:>10.2f} {cached:>10.2f} {cold / cached:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
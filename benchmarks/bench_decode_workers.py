@@ -0,0 +1,96 @@
+"""
+Decode throughput of UDPPacketStream with sender-sharded decode workers.
+
+Encrypted telemetry packets from many senders are fed straight into the stream's
+delivery path (no socket) and timed until every unique packet has been decoded.
+Thread workers only scale on free-threaded builds; process workers scale everywhere
+but pay a pickling round trip per packet.
+
+    python benchmarks/bench_decode_workers.py --packets 20000 --workers 0 1 2 4
+"""
+
+import argparse
+import threading
+import time
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2, telemetry_pb2
+
+from mudp.encryption import encrypt_packet
+from mudp.rx_message_handler import UDPPacketStream
+
+CHANNEL = "LongFast"
+KEY = "AQ=="
+ADDR = ("127.0.0.1", 4403)
+
+
+def build_datagrams(count: int, senders: int) -> list[bytes]:
+    datagrams = []
+    for i in range(count):
+        packet = mesh_pb2.MeshPacket()
+        packet.id = i + 1
+        setattr(packet, "from", 0x10000 + (i % senders))
+        packet.to = 0xFFFFFFFF
+        data = mesh_pb2.Data()
+        data.portnum = portnums_pb2.PortNum.TELEMETRY_APP
+        data.payload = telemetry_pb2.Telemetry(
+            time=i, device_metrics=telemetry_pb2.DeviceMetrics(battery_level=50, voltage=3.9, uptime_seconds=i)
+        ).SerializeToString()
+        packet.encrypted = encrypt_packet(CHANNEL, KEY, packet, data)
+        datagrams.append(packet.SerializeToString())
+    return datagrams
+
+
+def run(datagrams: list[bytes], workers: int, executor: str) -> float:
+    stream = UDPPacketStream(
+        "224.0.0.69",
+        4403,
+        key=KEY,
+        parse_payload=True,
+        decode_workers=workers,
+        decode_executor=executor,
+        queue_size=len(datagrams),
+        overflow_policy="block",
+    )
+    done = threading.Event()
+    lock = threading.Lock()
+    remaining = [len(datagrams)]
+
+    def count(packet, addr) -> None:
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                done.set()
+
+    stream._publish_unique_topics = count
+    stream._start_workers()
+    try:
+        start = time.perf_counter()
+        for raw in datagrams:
+            stream._deliver(raw, ADDR)
+        done.wait()
+        elapsed = time.perf_counter() - start
+    finally:
+        stream._stop_workers()
+    return len(datagrams) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=20000)
+    parser.add_argument("--senders", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--executors", nargs="+", default=["thread", "process"])
+    args = parser.parse_args()
+
+    datagrams = build_datagrams(args.packets, args.senders)
+    print(f"{'executor':<8} {'workers':>7} {'pkt/s':>12}")
+    for executor in args.executors:
+        for workers in args.workers:
+            if workers == 0 and executor == "process":
+                continue
+            pps = run(datagrams, workers, executor)
+            print(f"{executor if workers else 'queue':<8} {workers:>7} {pps:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
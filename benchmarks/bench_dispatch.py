@@ -0,0 +1,110 @@
+"""
+Per-packet RX topic dispatch cost with zero, one and all topics subscribed,
+with subscriber-aware dispatch on (default) and off.
+
+    python benchmarks/bench_dispatch.py --iterations 50000
+"""
+
+import argparse
+import time
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+from pubsub import pub
+
+from mudp.dispatch import (
+    RX_ACK,
+    RX_DECODED,
+    RX_PACKET,
+    RX_ROUTING,
+    RX_TEXT,
+    RX_UNIQUE_PACKET,
+    port_topic,
+)
+from mudp.rx_message_handler import UDPPacketStream
+
+ADDR = ("127.0.0.1", 4403)
+
+
+def on_packet(packet, addr=None):
+    pass
+
+
+def on_decoded(packet, portnum, addr=None):
+    pass
+
+
+def on_routing(packet, routing, addr=None):
+    pass
+
+
+def on_ack(packet, routing, addr=None, pending=None):
+    pass
+
+
+def build_packets() -> dict[str, mesh_pb2.MeshPacket]:
+    text = mesh_pb2.MeshPacket(id=1, to=4321)
+    setattr(text, "from", 1234)
+    text.decoded.portnum = portnums_pb2.PortNum.TEXT_MESSAGE_APP
+    text.decoded.payload = b"hello"
+
+    ack = mesh_pb2.MeshPacket(id=2, to=4321)
+    setattr(ack, "from", 1234)
+    ack.decoded.portnum = portnums_pb2.PortNum.ROUTING_APP
+    ack.decoded.request_id = 99
+    ack.decoded.payload = mesh_pb2.Routing(error_reason=mesh_pb2.Routing.Error.NONE).SerializeToString()
+    return {"text": text, "ack": ack}
+
+
+ALL_TOPICS = [
+    (RX_PACKET, on_packet),
+    (RX_UNIQUE_PACKET, on_packet),
+    (RX_DECODED, on_decoded),
+    (port_topic(portnums_pb2.PortNum.TEXT_MESSAGE_APP), on_packet),
+    (port_topic(portnums_pb2.PortNum.ROUTING_APP), on_packet),
+    (RX_TEXT, on_packet),
+    (RX_ROUTING, on_routing),
+    (RX_ACK, on_ack),
+]
+
+SCENARIOS = {
+    "none": [],
+    "one": [(RX_TEXT, on_packet)],
+    "all": ALL_TOPICS,
+}
+
+
+def measure(stream: UDPPacketStream, packet: mesh_pb2.MeshPacket, iterations: int) -> float:
+    publish = stream._publish_unique_topics
+    start = time.perf_counter()
+    for _ in range(iterations):
+        publish(packet, ADDR)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    packets = build_packets()
+    streams = {
+        "skip": UDPPacketStream("224.0.0.69", 4403, parse_payload=False),
+        "send-all": UDPPacketStream("224.0.0.69", 4403, parse_payload=False, skip_unsubscribed_topics=False),
+    }
+
+    print(f"{'subscribed':<11} {'packet':<6} {'send-all us':>12} {'skip us':>10}")
+    for scenario, subscriptions in SCENARIOS.items():
+        for topic, listener in subscriptions:
+            pub.subscribe(listener, topic)
+        try:
+            for name, packet in packets.items():
+                full = measure(streams["send-all"], packet, args.iterations)
+                skip = measure(streams["skip"], packet, args.iterations)
+                print(f"{scenario:<11} {name:<6} {full:>12.2f} {skip:>10.2f}")
+        finally:
+            for topic, listener in subscriptions:
+                pub.unsubscribe(listener, topic)
+
+
+if __name__ == "__main__":
+    main()
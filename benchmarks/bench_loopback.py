@@ -0,0 +1,71 @@
+"""
+End-to-end TX -> RX throughput over the in-process loopback transport, no sockets needed.
+
+One MeshContext sends encrypted text messages on a LoopbackNetwork and a UDPPacketStream
+on a second context decodes, dedupes and publishes them. Loss and duplication can be
+applied to see the pipeline's cost under impairment.
+
+    python benchmarks/bench_loopback.py --packets 200000 --duplicate 0.5
+"""
+
+import argparse
+import threading
+import time
+
+from pubsub import pub
+
+from mudp import LoopbackNetwork, MeshContext, Node, UDPPacketStream, send_text_message
+
+KEY = "1PG7OiApB1nwvP+rz05pAQ=="
+GROUP = ("224.0.0.69", 4403)
+
+
+def run(packets: int, loss: float, duplicate: float, parse_payload) -> tuple[float, int, dict]:
+    network = LoopbackNetwork(loss=loss, duplicate=duplicate, max_queued=packets * 2 + 1, seed=1)
+    sender = MeshContext(node=Node(node_id="!00000abc", channel="LongFast", key=KEY), connection=network.connection())
+    sender.connection.host, sender.connection.port = GROUP
+    receiver = MeshContext(connection=network.connection(*GROUP))
+
+    received = [0]
+    expected = packets - round(packets * loss)
+    done = threading.Event()
+
+    def on_text(packet, addr=None) -> None:
+        received[0] += 1
+        if received[0] >= expected:
+            done.set()
+
+    pub.subscribe(on_text, "mesh.rx.text")
+    stream = UDPPacketStream(*GROUP, key=KEY, parse_payload=parse_payload, select_timeout=0.05, context=receiver)
+    stream.start()
+    start = time.perf_counter()
+    for index in range(packets):
+        send_text_message(f"message {index}", context=sender)
+    # With loss the exact count is random, so stop once the inbox has drained.
+    while not done.wait(0.05):
+        if receiver.connection.queued() == 0:
+            break
+    elapsed = time.perf_counter() - start
+    stream.stop()
+    pub.unsubscribe(on_text, "mesh.rx.text")
+    return elapsed, received[0], network.stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=50000)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--duplicate", type=float, default=0.0)
+    parser.add_argument("--parse-payload", choices=["true", "false", "lazy"], default="false")
+    args = parser.parse_args()
+
+    parse_payload = {"true": True, "false": False, "lazy": "lazy"}[args.parse_payload]
+    elapsed, received, stats = run(args.packets, args.loss, args.duplicate, parse_payload)
+    print(f"sent       {args.packets:>12,}")
+    print(f"unique rx  {received:>12,}")
+    print(f"datagrams  {stats['delivered']:>12,}  (dropped {stats['dropped']:,}, duplicated {stats['duplicated']:,})")
+    print(f"throughput {args.packets / elapsed:>12,.0f} pkt/s end to end")
+
+
+if __name__ == "__main__":
+    main()
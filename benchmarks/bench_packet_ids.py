@@ -0,0 +1,77 @@
+"""
+Packet id allocation under thread contention: the old unlocked global rolling counter
+(get_message_id), the same counter behind a lock, and PacketIdAllocator. Reports
+throughput and how many ids were handed out more than once.
+
+    python benchmarks/bench_packet_ids.py --threads 1 4 8 --count 100000
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from mudp.packet_id import PacketIdAllocator
+from mudp.tx_message_handler import get_message_id
+
+
+def unlocked_global():
+    state = {"id": random.getrandbits(32)}
+
+    def next_id() -> int:
+        state["id"] = get_message_id(state["id"])
+        return state["id"]
+
+    return next_id
+
+
+def locked_global():
+    lock = threading.Lock()
+    unlocked = unlocked_global()
+
+    def next_id() -> int:
+        with lock:
+            return unlocked()
+
+    return next_id
+
+
+def allocator():
+    return PacketIdAllocator().next_id
+
+
+def run(factory, threads: int, count: int) -> tuple[float, int]:
+    next_id = factory()
+    chunks: list[list[int]] = []
+    barrier = threading.Barrier(threads + 1)
+
+    def worker() -> None:
+        barrier.wait()
+        chunks.append([next_id() for _ in range(count)])
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    ids = [packet_id for chunk in chunks for packet_id in chunk]
+    return len(ids) / elapsed, len(ids) - len(set(ids))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--count", type=int, default=100000, help="ids per thread")
+    args = parser.parse_args()
+
+    for threads in args.threads:
+        for label, factory in (("unlocked", unlocked_global), ("locked", locked_global), ("allocator", allocator)):
+            rate, duplicates = run(factory, threads, args.count)
+            print(f"{threads:3d} threads  {label:10s} {rate / 1e6:6.2f} M ids/s   duplicates {duplicates}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Receive-path throughput: single recvfrom per select() vs batched recvmmsg / recv_into.
+
+Datagrams are pushed through a localhost UDP socket in bursts, and only the time spent
+draining them through UDPPacketStream is measured.
+
+    python benchmarks/bench_recv.py --packets 200000 --burst 512
+"""
+
+import argparse
+import select
+import socket
+import time
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp.batch_receiver import RecvIntoReceiver, RecvmmsgReceiver, recvmmsg_available
+from mudp.rx_message_handler import UDPPacketStream
+
+
+def build_datagram(size: int) -> bytes:
+    packet = mesh_pb2.MeshPacket()
+    packet.id = 1
+    setattr(packet, "from", 0x12345678)
+    packet.to = 0xFFFFFFFF
+    packet.decoded.portnum = portnums_pb2.PortNum.TEXT_MESSAGE_APP
+    packet.decoded.payload = b"x" * size
+    return packet.SerializeToString()
+
+
+def drain_single(stream: UDPPacketStream, sock: socket.socket, expected: int) -> None:
+    received = 0
+    while received < expected:
+        r, _, _ = select.select([sock], [], [], 0.2)
+        if not r:
+            break
+        raw, addr = sock.recvfrom(stream.recv_buf)
+        stream._handle_datagram(raw, addr)
+        received += 1
+
+
+def drain_batch(stream: UDPPacketStream, sock: socket.socket, expected: int) -> None:
+    received = 0
+    while received < expected:
+        r, _, _ = select.select([sock], [], [], 0.2)
+        if not r:
+            break
+        received += stream._drain_batches()
+
+
+def run(mode: str, receiver_cls, packets: int, burst: int, payload: bytes, full: bool) -> float:
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    rx.bind(("127.0.0.1", 0))
+    rx.setblocking(False)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    target = rx.getsockname()
+
+    stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=False, recv_mode="single" if mode == "single" else "batch")
+    stream._sock = rx
+    if receiver_cls is not None:
+        stream._receiver = receiver_cls(rx, batch_size=stream.recv_batch_size, bufsize=stream.recv_buf)
+    if not full:
+        stream._handle_datagram = lambda raw, addr: None
+
+    elapsed = 0.0
+    sent = 0
+    while sent < packets:
+        count = min(burst, packets - sent)
+        for _ in range(count):
+            tx.sendto(payload, target)
+        start = time.perf_counter()
+        if mode == "single":
+            drain_single(stream, rx, count)
+        else:
+            drain_batch(stream, rx, count)
+        elapsed += time.perf_counter() - start
+        sent += count
+
+    rx.close()
+    tx.close()
+    return packets / elapsed if elapsed else float("inf")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=100000)
+    parser.add_argument("--burst", type=int, default=512)
+    parser.add_argument("--size", type=int, default=64, help="payload bytes per datagram")
+    parser.add_argument("--full", action="store_true", help="run the full decode/dedupe/pubsub pipeline per datagram")
+    args = parser.parse_args()
+
+    payload = build_datagram(args.size)
+    modes = [("single", None), ("recv_into", RecvIntoReceiver)]
+    if recvmmsg_available():
+        modes.append(("recvmmsg", RecvmmsgReceiver))
+
+    baseline = None
+    for name, receiver_cls in modes:
+        pps = run(name, receiver_cls, args.packets, args.burst, payload, args.full)
+        baseline = baseline or pps
+        print(f"{name:<10} {pps:>12,.0f} pkt/s  ({pps / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Retransmit scheduler cost with many outstanding want_ack packets: tracking, resolving,
+a process_due() pass with nothing due, and idle CPU used by the retry worker.
+
+    python benchmarks/bench_retry.py --pending 10000
+"""
+
+import argparse
+import time
+from unittest import mock
+
+from mudp.reliability import PendingAckRegistry
+
+ADDR = ("224.0.0.69", 4403)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pending", type=int, default=10000)
+    parser.add_argument("--idle-sec", type=float, default=1.0)
+    args = parser.parse_args()
+
+    registry = PendingAckRegistry()
+    raw = b"x" * 64
+
+    with mock.patch("mudp.reliability.conn.sendto"), mock.patch("mudp.reliability.pub.sendMessage"):
+        start = time.perf_counter()
+        for packet_id in range(args.pending):
+            registry.track(packet_id, 4321, time.time(), raw, ADDR)
+        elapsed = time.perf_counter() - start
+        print(f"track:        {args.pending / elapsed:12,.0f} ops/s")
+
+        start = time.perf_counter()
+        for _ in range(100):
+            registry.process_due()
+        elapsed = time.perf_counter() - start
+        print(f"process_due:  {elapsed / 100 * 1e6:12,.1f} us/pass with {len(registry)} pending, none due")
+
+        cpu_start = time.process_time()
+        time.sleep(args.idle_sec)
+        cpu = time.process_time() - cpu_start
+        print(f"idle worker:  {cpu / args.idle_sec * 100:12.2f} % CPU")
+
+        start = time.perf_counter()
+        for packet_id in range(args.pending):
+            registry.resolve(packet_id)
+        elapsed = time.perf_counter() - start
+        print(f"resolve:      {args.pending / elapsed:12,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+send_text_message() throughput with mudp logging at DEBUG and INFO (console handler
+writing to a null stream, roughly the old per-send print() output), at the default
+level, and in quiet mode.
+
+    python benchmarks/bench_send_logging.py --count 20000
+"""
+
+import argparse
+import logging
+import os
+import socket
+import time
+
+from mudp import conn, enable_console_logging, node, send_text_message, set_quiet
+from mudp.log import logger
+
+
+def send_rate(count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        send_text_message("status", to=0x10000000 + i % 64)
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    conn.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    conn.host, conn.port = sink.getsockname()
+    node.node_id, node.channel, node.key = "!00000abc", "LongFast", "1PG7OiApB1nwvP+rz05pAQ=="
+
+    with open(os.devnull, "w") as devnull:
+        for label, level in (("debug", logging.DEBUG), ("info", logging.INFO)):
+            handler = enable_console_logging(level, devnull)
+            print(f"{label:8s} {send_rate(args.count):10.0f} sends/s")
+            logger.removeHandler(handler)
+
+    logger.setLevel(logging.NOTSET)
+    print(f"{'default':8s} {send_rate(args.count):10.0f} sends/s")
+    set_quiet()
+    print(f"{'quiet':8s} {send_rate(args.count):10.0f} sends/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Wall time to fan a text message out to a roster of destinations, one send_text_message()
+call per destination versus a single send_text_many() batch.
+
+    python benchmarks/bench_send_many.py --destinations 1000
+"""
+
+import argparse
+import contextlib
+import io
+import socket
+import time
+
+from mudp import conn, node, send_text_message, send_text_many
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--destinations", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    sink.bind(("127.0.0.1", 0))
+    conn.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    conn.host, conn.port = sink.getsockname()
+    node.node_id, node.channel, node.key = "!00000abc", "LongFast", "1PG7OiApB1nwvP+rz05pAQ=="
+    roster = [0x10000000 + i for i in range(args.destinations)]
+
+    def loop() -> None:
+        # send_text_message echoes every packet to stdout; keep that out of the timing.
+        with contextlib.redirect_stdout(io.StringIO()):
+            for destination in roster:
+                send_text_message("check-in", to=destination)
+
+    def batch() -> None:
+        send_text_many("check-in", roster)
+
+    for label, func in (("loop", loop), ("send_many", batch)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        print(f"{label:10s} {best * 1000:8.2f} ms   {best / len(roster) * 1e6:7.2f} us/packet")
+
+
+if __name__ == "__main__":
+    main()
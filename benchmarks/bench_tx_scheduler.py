@@ -0,0 +1,53 @@
+"""
+ACK queueing latency behind a burst of background telemetry on a paced link, with
+every packet sent FIFO versus through the priority TX scheduler.
+
+    python benchmarks/bench_tx_scheduler.py --rate 500 --telemetry 200 --acks 20
+"""
+
+import argparse
+import statistics
+import time
+
+from mudp.tx_scheduler import FixedRatePacer, Priority, TxScheduler
+
+ADDR = ("224.0.0.69", 4403)
+
+
+def run(rate: float, telemetry: int, acks: int, prioritized: bool) -> list[float]:
+    submitted: dict[bytes, float] = {}
+    latencies: list[float] = []
+
+    def sendto(raw: bytes, addr) -> None:
+        if raw.startswith(b"ack"):
+            latencies.append(time.perf_counter() - submitted[raw])
+
+    scheduler = TxScheduler(pacer=FixedRatePacer(rate), starvation_sec=60.0)
+    scheduler.start()
+    ack_every = max(telemetry // acks, 1)
+    for i in range(telemetry):
+        scheduler.submit(b"telemetry %d" % i, sendto, ADDR, Priority.BACKGROUND)
+        if i % ack_every == 0:
+            raw = b"ack %d" % i
+            submitted[raw] = time.perf_counter()
+            priority = Priority.ACK if prioritized else Priority.BACKGROUND
+            scheduler.submit(raw, sendto, ADDR, priority)
+    scheduler.stop(timeout=None)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=500.0, help="paced packets per second")
+    parser.add_argument("--telemetry", type=int, default=200)
+    parser.add_argument("--acks", type=int, default=20)
+    args = parser.parse_args()
+
+    for label, prioritized in (("fifo", False), ("priority", True)):
+        latencies = run(args.rate, args.telemetry, args.acks, prioritized)
+        p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1]
+        print(f"{label:9s} ACK latency: mean {statistics.mean(latencies) * 1000:8.1f} ms   p95 {p95 * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,10 +11,25 @@ from .tx_message_handler import (
     send_health_metrics,
     send_waypoint,
     send_data,
+    send_many,
+    send_text_many,
+    PacketTemplate,
+    position_template,
+    telemetry_template,
 )
 from .rx_message_handler import UDPPacketStream
+from .rx_stats import LatencyHistogram, RxStatsSnapshot
+from .aio import AsyncPacketStream
+from .decoded_packet import DecodedPacket
 from .encryption import decrypt_packet, encrypt_packet
+from .keyring import ChannelKey, KeyRing
+from .loopback import LoopbackConnection, LoopbackNetwork
+from .metrics import MetricsExporter
+from .log import enable_console_logging, set_quiet
 from .reliability import (
+    AckHandle,
+    AckResult,
+    DeliveryError,
     build_routing_ack_data,
     compute_reply_hop_limit,
     is_ack,
@@ -26,4 +41,7 @@ from .reliability import (
     send_ack,
     should_ack_with_want_ack,
 )
+from .connection import Connection, Transport
+from .context import MeshContext, default_context
+from .node import Node
 from .singleton import conn, node
@@ -1,3 +1,4 @@
+import sys
 import time
 from pubsub import pub
 from mudp import UDPPacketStream
@@ -14,6 +15,14 @@ def on_recieve(packet: mesh_pb2.MeshPacket, addr=None):
 
 
 def start() -> None:
+    if sys.argv[1:2] == ["bench"]:
+        from mudp.bench import main
+
+        sys.exit(main(sys.argv[2:]))
+    listen()
+
+
+def listen() -> None:
     interface = UDPPacketStream(MCAST_GRP, MCAST_PORT, key=KEY, parse_payload=True)
     pub.subscribe(on_recieve, "mesh.rx.unique_packet")
     interface.start()
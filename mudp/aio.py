@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Callable, Optional
+
+from meshtastic.protobuf import mesh_pb2
+from pubsub import pub
+
+from mudp import tx_message_handler as tx
+from mudp.connection import Connection
+from mudp.context import MeshContext
+from mudp.dispatch import RX_LISTENER_ERROR
+from mudp.flow_control import send_window
+from mudp.reliability import AckHandle, parse_node_id, send_ack
+from mudp.rx_message_handler import UDPPacketStream
+from mudp.singleton import conn as default_conn
+from mudp.tx_scheduler import packet_priority, scheduled_sendto
+
+_CLOSED = object()
+
+
+class _LoopPacketStream(UDPPacketStream):
+    """UDPPacketStream driven by an asyncio protocol instead of its own threads."""
+
+    def __init__(self, owner: "AsyncPacketStream", *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._owner = owner
+
+    def _publish_unique_topics(self, packet, addr, channel=None) -> None:
+        super()._publish_unique_topics(packet, addr, channel)
+        self._owner._emit(packet, addr)
+
+
+class _StreamProtocol(asyncio.DatagramProtocol):
+    def __init__(self, stream: _LoopPacketStream) -> None:
+        self.stream = stream
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            self.stream._handle_datagram(data, addr)
+        except Exception as e:
+            pub.sendMessage(RX_LISTENER_ERROR, error=e)
+
+    def error_received(self, exc: Exception) -> None:
+        pub.sendMessage(RX_LISTENER_ERROR, error=exc)
+
+
+class PacketIterator:
+    """
+    Async iterator over unique packets matching a set of filters. Each iterator has its
+    own bounded buffer; when a consumer falls behind, the oldest buffered packet is dropped
+    and counted in .dropped.
+    """
+
+    def __init__(
+        self,
+        stream: "AsyncPacketStream",
+        *,
+        portnum: Optional[int] = None,
+        from_id: Optional[int | str] = None,
+        to: Optional[int | str] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+        with_addr: bool = False,
+        maxsize: int = 1024,
+    ) -> None:
+        self._stream = stream
+        self.portnum = portnum
+        self.from_id = parse_node_id(from_id) if from_id is not None else None
+        self.to = parse_node_id(to) if to is not None else None
+        self.predicate = predicate
+        self.with_addr = with_addr
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(max(int(maxsize), 1))
+        stream._iterators.add(self)
+
+    def matches(self, packet) -> bool:
+        if self.portnum is not None:
+            if not packet.HasField("decoded") or packet.decoded.portnum != self.portnum:
+                return False
+        if self.from_id is not None and getattr(packet, "from") != self.from_id:
+            return False
+        if self.to is not None and packet.to != self.to:
+            return False
+        return self.predicate is None or bool(self.predicate(packet))
+
+    def _offer(self, item) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    def close(self) -> None:
+        self._stream._iterators.discard(self)
+        self._offer(_CLOSED)
+
+    def __aiter__(self) -> "PacketIterator":
+        return self
+
+    async def __anext__(self):
+        item = await self._queue.get()
+        if item is _CLOSED:
+            self._stream._iterators.discard(self)
+            raise StopAsyncIteration
+        packet, addr = item
+        return (packet, addr) if self.with_addr else packet
+
+
+class AsyncPacketStream:
+    """
+    asyncio-native listener and sender on the Connection.setup_multicast socket (set up
+    on start() unless the connection already has a socket).
+
+    Datagrams are processed on the event loop by an asyncio DatagramProtocol using the
+    same decode/dedupe pipeline (and pubsub topics) as UDPPacketStream, with no background
+    threads and no select() polling. Iterate unique packets with
+
+        async for packet in stream: ...
+        async for packet in stream.packets(portnum=portnums_pb2.TEXT_MESSAGE_APP): ...
+
+    and send with the send_* coroutines, which build packets with build_mesh_packet and
+    transmit them through the asyncio transport. Like the synchronous send functions they
+    return an AckHandle for direct want_ack packets; await it for the ACK/NAK.
+
+    With context=MeshContext(...) packets are sent as context.node and tracked in the
+    context's registry, and the connection defaults to context.connection.
+
+    Keyword arguments are passed to UDPPacketStream (key, keyring, parse_payload,
+    dedupe_ttl_sec, ...). Its threading options (recv_mode, queue_size, decode_workers)
+    do not apply here.
+    """
+
+    def __init__(
+        self,
+        mcast_grp: str,
+        mcast_port: int,
+        *,
+        connection: Optional[Connection] = None,
+        context: Optional[MeshContext] = None,
+        **stream_kwargs,
+    ) -> None:
+        self.mcast_grp = mcast_grp
+        self.mcast_port = mcast_port
+        self.context = context
+        if connection is None:
+            connection = default_conn if context is None else context.connection
+        self.connection = connection
+        self.stream = _LoopPacketStream(self, mcast_grp, mcast_port, context=context, **stream_kwargs)
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._iterators: set[PacketIterator] = set()
+
+    async def start(self) -> None:
+        if self._transport is not None:
+            return
+        loop = self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        if self.connection.socket is None:
+            self.connection.setup_multicast(self.mcast_grp, self.mcast_port)
+        if self.connection.socket is None:
+            raise RuntimeError("AsyncPacketStream needs a socket-backed connection; use UDPPacketStream instead.")
+        # The transport closes its socket, so give it a duplicate and leave the connection's own
+        # socket open for the sync send functions and later restarts.
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _StreamProtocol(self.stream),
+            sock=self.connection.socket.dup(),
+        )
+
+    def stop(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+            # The duplicate shares the file status flags, and asyncio made it non-blocking.
+            sock = self.connection.socket
+            if sock is not None and sock.fileno() != -1:
+                sock.settimeout(sock.gettimeout())
+        for iterator in list(self._iterators):
+            iterator.close()
+
+    async def __aenter__(self) -> "AsyncPacketStream":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.stop()
+
+    def _emit(self, packet, addr) -> None:
+        for iterator in list(self._iterators):
+            if iterator.matches(packet):
+                iterator._offer((packet, addr))
+
+    def packets(self, **filters) -> PacketIterator:
+        """Iterate unique packets matching portnum, from_id, to and/or predicate."""
+        return PacketIterator(self, **filters)
+
+    def __aiter__(self) -> PacketIterator:
+        return self.packets()
+
+    def _transport_or_raise(self) -> asyncio.DatagramTransport:
+        if self._transport is None:
+            raise RuntimeError("AsyncPacketStream is not started.")
+        return self._transport
+
+    def _sendto(self, data: bytes, addr=None) -> None:
+        transport = self._transport_or_raise()
+        addr = (self.connection.host, self.connection.port)
+        # Queued reliable sends can be released from the RX or retry threads.
+        if threading.get_ident() == self._loop_thread:
+            transport.sendto(data, addr)
+        else:
+            self._loop.call_soon_threadsafe(transport.sendto, data, addr)
+
+    async def send_packet(self, packet: mesh_pb2.MeshPacket) -> Optional[AckHandle]:
+        """Transmit an already built MeshPacket, tracking it for ACKs if it wants one."""
+        self._transport_or_raise()
+        portnum = packet.decoded.portnum if packet.HasField("decoded") else None
+        sendto = scheduled_sendto(self._sendto, packet_priority(packet, portnum), portnum, blocking=False)
+        window = send_window if self.context is None else self.context.send_window
+        addr = (self.connection.host, self.connection.port)
+        return window.send(packet, packet.SerializeToString(), sendto, addr)
+
+    async def _send(self, send_function: Callable, *args, **kwargs) -> Optional[AckHandle]:
+        self._transport_or_raise()
+        if self.context is not None:
+            kwargs.setdefault("context", self.context)
+        with tx.transmit_via(self._sendto, blocking=False):
+            return send_function(*args, **kwargs)
+
+    async def send_text_message(self, message: str, **kwargs) -> Optional[AckHandle]:
+        return await self._send(tx.send_text_message, message, **kwargs)
+
+    async def send_reply(self, message: str, reply_id: int, emoji: bool = False, **kwargs) -> Optional[AckHandle]:
+        return await self._send(tx.send_reply, message, reply_id, emoji=emoji, **kwargs)
+
+    async def send_nodeinfo(self, **kwargs) -> Optional[AckHandle]:
+        return await self._send(tx.send_nodeinfo, **kwargs)
+
+    async def send_position(self, latitude: float = None, longitude: float = None, **kwargs) -> Optional[AckHandle]:
+        return await self._send(tx.send_position, latitude, longitude, **kwargs)
+
+    async def send_device_telemetry(self, **kwargs) -> Optional[AckHandle]:
+        return await self._send(tx.send_device_telemetry, **kwargs)
+
+    async def send_power_metrics(self, **kwargs) -> Optional[AckHandle]:
+        return await self._send(tx.send_power_metrics, **kwargs)
+
+    async def send_environment_metrics(self, **kwargs) -> Optional[AckHandle]:
+        return await self._send(tx.send_environment_metrics, **kwargs)
+
+    async def send_health_metrics(self, **kwargs) -> Optional[AckHandle]:
+        return await self._send(tx.send_health_metrics, **kwargs)
+
+    async def send_waypoint(self, latitude: float = None, longitude: float = None, **kwargs) -> Optional[AckHandle]:
+        return await self._send(tx.send_waypoint, latitude, longitude, **kwargs)
+
+    async def send_data(self, destination_id: str, payload: bytes, portnum: int = 256, want_ack: bool = False) -> Optional[AckHandle]:
+        return await self._send(tx.send_data, destination_id, payload, portnum=portnum, want_ack=want_ack)
+
+    async def send_ack(self, request_packet: mesh_pb2.MeshPacket, **kwargs) -> Optional[AckHandle]:
+        kwargs.setdefault("context", self.context)
+        return await self.send_packet(send_ack(request_packet, **kwargs))
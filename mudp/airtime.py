@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from threading import Lock
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from mudp.tx_scheduler import TxScheduler
+
+UDP_MIN_PACKET_AIRTIME_MSEC = 80
+UDP_AIRTIME_PER_BYTE_MSEC = 8
+
+DEFAULT_DUTY_CYCLE = 0.1
+DEFAULT_BURST_MSEC = 10_000.0
+LIMIT_DELAY = "delay"
+LIMIT_REJECT = "reject"
+LIMIT_MODES = (LIMIT_DELAY, LIMIT_REJECT)
+
+
+def packet_airtime_msec(raw_size: int) -> int:
+    """Modelled on-air time of a raw_size byte packet."""
+    return max(UDP_MIN_PACKET_AIRTIME_MSEC, int(raw_size) * UDP_AIRTIME_PER_BYTE_MSEC)
+
+
+class AirtimeExceeded(Exception):
+    """A send was refused because its airtime budget is exhausted."""
+
+    def __init__(self, message: str, wait_sec: float) -> None:
+        super().__init__(message)
+        self.wait_sec = wait_sec
+
+
+@dataclass
+class AirtimeStats:
+    duty_cycle: float
+    utilization: float
+    airtime_msec: float
+    available_msec: float
+    packets: int
+    throttled: int
+    rejected: int
+    delayed_sec: float
+    ports: dict[int, "AirtimeStats"]
+
+
+class _Bucket:
+    __slots__ = ("duty_cycle", "capacity_msec", "tokens_msec", "updated", "airtime_msec", "packets", "throttled")
+
+    def __init__(self, duty_cycle: float, capacity_msec: float, now: float) -> None:
+        self.duty_cycle = float(duty_cycle)
+        self.capacity_msec = float(capacity_msec)
+        self.tokens_msec = self.capacity_msec
+        self.updated = now
+        self.airtime_msec = 0.0
+        self.packets = 0
+        self.throttled = 0
+
+    def wait_sec(self, cost_msec: float, now: float) -> float:
+        """Refill, then return how long until cost_msec can be spent (0.0 if it can now)."""
+        self.tokens_msec = min(self.capacity_msec, self.tokens_msec + (now - self.updated) * 1000.0 * self.duty_cycle)
+        self.updated = now
+        # A packet larger than the whole bucket may go once the bucket is full, leaving it in debt.
+        needed = min(cost_msec, self.capacity_msec)
+        if self.tokens_msec >= needed:
+            return 0.0
+        return (needed - self.tokens_msec) / (1000.0 * self.duty_cycle)
+
+    def charge(self, cost_msec: float) -> None:
+        self.tokens_msec -= cost_msec
+        self.airtime_msec += cost_msec
+        self.packets += 1
+
+
+class AirtimeLimiter:
+    """
+    Token-bucket duty-cycle limiter for transmissions, charged with each packet's modelled
+    airtime (packet_airtime_msec).
+
+    duty_cycle is the long-run share of wall time that may be spent transmitting. burst_msec
+    is how much unused airtime can be saved up. port_duty_cycles adds a separate, usually
+    smaller, budget per portnum on top of the overall one. When a budget is exhausted,
+    acquire() sleeps until it refills (mode="delay", for at most max_delay_sec when set) or
+    raises AirtimeExceeded (mode="reject"). reserve() never blocks, which also makes the
+    limiter usable as a TxScheduler pacer.
+
+    Threads that must not sleep (the RX and retry threads, event loops) use
+    wrap(blocking=False): in delay mode a send that has to wait is queued on the limiter's
+    own pacing thread instead.
+    """
+
+    def __init__(
+        self,
+        duty_cycle: float = DEFAULT_DUTY_CYCLE,
+        burst_msec: float = DEFAULT_BURST_MSEC,
+        port_duty_cycles: Optional[dict[int, float]] = None,
+        mode: str = LIMIT_DELAY,
+        max_delay_sec: Optional[float] = None,
+    ) -> None:
+        if not 0.0 < float(duty_cycle) <= 1.0:
+            raise ValueError(f"duty_cycle must be in (0, 1], got {duty_cycle!r}")
+        if mode not in LIMIT_MODES:
+            raise ValueError(f"mode must be one of {LIMIT_MODES}, got {mode!r}")
+        now = time.monotonic()
+        self.mode = mode
+        self.max_delay_sec = max_delay_sec
+        self.burst_msec = float(burst_msec)
+        self._lock = Lock()
+        self._started = now
+        self._bucket = _Bucket(duty_cycle, burst_msec, now)
+        self._ports = {
+            int(portnum): _Bucket(port_duty, burst_msec * port_duty / duty_cycle, now)
+            for portnum, port_duty in (port_duty_cycles or {}).items()
+        }
+        self._throttled = 0
+        self._rejected = 0
+        self._delayed_sec = 0.0
+        self._delay_queue: Optional[TxScheduler] = None
+
+    def reserve(self, raw_size: int, priority: int = 0, portnum: Optional[int] = None) -> float:
+        """Charge raw_size's airtime and return 0.0, or return seconds to wait without charging."""
+        cost = packet_airtime_msec(raw_size)
+        now = time.monotonic()
+        with self._lock:
+            buckets = [self._bucket]
+            port_bucket = self._ports.get(portnum) if portnum is not None else None
+            if port_bucket is not None:
+                buckets.append(port_bucket)
+            wait = 0.0
+            for bucket in buckets:
+                bucket_wait = bucket.wait_sec(cost, now)
+                if bucket_wait > 0.0:
+                    bucket.throttled += 1
+                    wait = max(wait, bucket_wait)
+            if wait > 0.0:
+                self._throttled += 1
+                return wait
+            for bucket in buckets:
+                bucket.charge(cost)
+            return 0.0
+
+    def _refuse_after(self, waited: float, wait: float) -> None:
+        if self.mode == LIMIT_REJECT or (self.max_delay_sec is not None and waited + wait > self.max_delay_sec):
+            with self._lock:
+                self._rejected += 1
+            raise AirtimeExceeded(f"Airtime budget exhausted, next send allowed in {wait:.2f}s", wait)
+
+    def acquire(self, raw_size: int, portnum: Optional[int] = None) -> None:
+        """Charge a send, sleeping or raising AirtimeExceeded according to mode."""
+        waited = 0.0
+        while True:
+            wait = self.reserve(raw_size, portnum=portnum)
+            if wait <= 0.0:
+                break
+            self._refuse_after(waited, wait)
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            with self._lock:
+                self._delayed_sec += waited
+
+    def wrap(
+        self,
+        sendto: Callable[[bytes, tuple], None],
+        portnum: Optional[int] = None,
+        priority: int = 0,
+        blocking: bool = True,
+    ) -> Callable[[bytes, tuple], None]:
+        """
+        A sendto-compatible callable that acquires airtime before sending. With blocking=False
+        it never sleeps: a send that would wait is queued at priority on the limiter's pacing
+        thread (or refused, as acquire() would).
+        """
+        if blocking:
+
+            def limited_sendto(raw_bytes: bytes, addr: tuple) -> None:
+                self.acquire(len(raw_bytes), portnum)
+                sendto(raw_bytes, addr)
+
+            return limited_sendto
+
+        def deferred_sendto(raw_bytes: bytes, addr: tuple) -> None:
+            wait = self.reserve(len(raw_bytes), portnum=portnum)
+            if wait <= 0.0:
+                sendto(raw_bytes, addr)
+                return
+            self._refuse_after(0.0, wait)
+            with self._lock:
+                self._delayed_sec += wait
+            self._pacing_queue().submit(raw_bytes, sendto, addr, priority, portnum)
+
+        return deferred_sendto
+
+    def _pacing_queue(self) -> TxScheduler:
+        from mudp.tx_scheduler import TxScheduler
+
+        with self._lock:
+            if self._delay_queue is None:
+                self._delay_queue = TxScheduler(pacer=self)
+                self._delay_queue.start()
+            return self._delay_queue
+
+    def close(self, drain: bool = True) -> None:
+        """Stop the pacing thread used by non-blocking sends, sending what it holds unless drain is False."""
+        with self._lock:
+            queue, self._delay_queue = self._delay_queue, None
+        if queue is not None:
+            queue.stop(drain=drain)
+
+    def stats(self) -> AirtimeStats:
+        now = time.monotonic()
+        with self._lock:
+            elapsed_msec = max((now - self._started) * 1000.0, 1.0)
+            ports = {
+                portnum: self._bucket_stats(bucket, now, elapsed_msec, bucket.throttled, 0, 0.0)
+                for portnum, bucket in self._ports.items()
+            }
+            return self._bucket_stats(
+                self._bucket, now, elapsed_msec, self._throttled, self._rejected, self._delayed_sec, ports
+            )
+
+    @staticmethod
+    def _bucket_stats(
+        bucket: _Bucket,
+        now: float,
+        elapsed_msec: float,
+        throttled: int,
+        rejected: int,
+        delayed_sec: float,
+        ports: Optional[dict[int, AirtimeStats]] = None,
+    ) -> AirtimeStats:
+        bucket.wait_sec(0.0, now)
+        return AirtimeStats(
+            duty_cycle=bucket.duty_cycle,
+            utilization=bucket.airtime_msec / elapsed_msec,
+            airtime_msec=bucket.airtime_msec,
+            available_msec=bucket.tokens_msec,
+            packets=bucket.packets,
+            throttled=throttled,
+            rejected=rejected,
+            delayed_sec=delayed_sec,
+            ports=ports or {},
+        )
+
+
+_limiter: Optional[AirtimeLimiter] = None
+
+
+def set_airtime_limiter(limiter: Optional[AirtimeLimiter]) -> None:
+    """Charge every transmission against limiter (None turns limiting off)."""
+    global _limiter
+    _limiter = limiter
+
+
+def active_airtime_limiter() -> Optional[AirtimeLimiter]:
+    return _limiter
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import socket
+import struct
+import sys
+
+MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0x40)
+SOCKADDR_STORAGE_SIZE = 128
+
+
+class IOVec(ctypes.Structure):
+    _fields_ = [
+        ("iov_base", ctypes.c_void_p),
+        ("iov_len", ctypes.c_size_t),
+    ]
+
+
+class MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(IOVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class MMsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_hdr", MsgHdr),
+        ("msg_len", ctypes.c_uint),
+    ]
+
+
+def _load_recvmmsg():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        func = libc.recvmmsg
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.POINTER(MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    func.restype = ctypes.c_int
+    return func
+
+
+_recvmmsg = _load_recvmmsg()
+
+
+def recvmmsg_available() -> bool:
+    return _recvmmsg is not None
+
+
+def _parse_sockaddr(raw: bytes) -> tuple[str, int] | None:
+    family = int.from_bytes(raw[0:2], sys.byteorder)
+    if family == socket.AF_INET:
+        port = int.from_bytes(raw[2:4], "big")
+        return (socket.inet_ntop(socket.AF_INET, raw[4:8]), port)
+    if family == socket.AF_INET6:
+        port = int.from_bytes(raw[2:4], "big")
+        return (socket.inet_ntop(socket.AF_INET6, raw[8:24]), port)
+    return None
+
+
+class RecvIntoReceiver:
+    """
+    Drains a non-blocking socket with recvfrom_into over a preallocated ring of
+    bytearray slots. Returned memoryviews point into the ring and are only valid
+    until the next call to receive().
+    """
+
+    def __init__(self, sock, batch_size: int = 32, bufsize: int = 65535) -> None:
+        self.sock = sock
+        self.batch_size = max(int(batch_size), 1)
+        self.bufsize = max(int(bufsize), 1)
+        self._ring = bytearray(self.batch_size * self.bufsize)
+        self._view = memoryview(self._ring)
+        self._slots = [
+            self._view[i * self.bufsize : (i + 1) * self.bufsize] for i in range(self.batch_size)
+        ]
+
+    def receive(self) -> list[tuple[memoryview, tuple]]:
+        datagrams = []
+        recvfrom_into = self.sock.recvfrom_into
+        for slot in self._slots:
+            try:
+                size, addr = recvfrom_into(slot)
+            except (BlockingIOError, InterruptedError):
+                break
+            datagrams.append((slot[:size], addr))
+        return datagrams
+
+
+class RecvmmsgReceiver:
+    """
+    Drains up to batch_size datagrams per syscall with Linux recvmmsg(2) via ctypes.
+    Returned memoryviews point into a preallocated ring and are only valid until
+    the next call to receive().
+    """
+
+    def __init__(self, sock, batch_size: int = 32, bufsize: int = 65535) -> None:
+        if _recvmmsg is None:
+            raise OSError("recvmmsg is not available on this platform")
+        self.sock = sock
+        self.batch_size = max(int(batch_size), 1)
+        self.bufsize = max(int(bufsize), 1)
+
+        self._ring = bytearray(self.batch_size * self.bufsize)
+        self._view = memoryview(self._ring)
+        self._ring_c = (ctypes.c_char * len(self._ring)).from_buffer(self._ring)
+        self._names = (ctypes.c_char * (SOCKADDR_STORAGE_SIZE * self.batch_size))()
+        self._iovecs = (IOVec * self.batch_size)()
+        self._msgs = (MMsgHdr * self.batch_size)()
+
+        self._msgs_buf = memoryview(self._msgs).cast("B")
+        self._names_buf = memoryview(self._names).cast("B")
+        self._stride = ctypes.sizeof(MMsgHdr)
+        self._len_offset = MMsgHdr.msg_len.offset
+        self._namelen_offset = MsgHdr.msg_namelen.offset
+        self._addr_cache: dict[bytes, tuple | None] = {}
+        self._last_count = self.batch_size
+
+        ring_base = ctypes.addressof(self._ring_c)
+        names_base = ctypes.addressof(self._names)
+        for i in range(self.batch_size):
+            self._iovecs[i].iov_base = ring_base + i * self.bufsize
+            self._iovecs[i].iov_len = self.bufsize
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_name = names_base + i * SOCKADDR_STORAGE_SIZE
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+
+    def receive(self) -> list[tuple[memoryview, tuple]]:
+        msgs_buf = self._msgs_buf
+        stride = self._stride
+        # recvmmsg overwrites msg_namelen, so only the slots used last time need resetting.
+        for i in range(self._last_count):
+            struct.pack_into("I", msgs_buf, i * stride + self._namelen_offset, SOCKADDR_STORAGE_SIZE)
+
+        count = _recvmmsg(self.sock.fileno(), self._msgs, self.batch_size, MSG_DONTWAIT, None)
+        if count < 0:
+            self._last_count = 0
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(err, f"recvmmsg failed: {errno.errorcode.get(err, err)}")
+        self._last_count = count
+
+        datagrams = []
+        names_buf = self._names_buf
+        addr_cache = self._addr_cache
+        bufsize = self.bufsize
+        for i in range(count):
+            (size,) = struct.unpack_from("I", msgs_buf, i * stride + self._len_offset)
+            # Only family, port and address bytes matter; cache the parsed tuple per sender.
+            name_offset = i * SOCKADDR_STORAGE_SIZE
+            name = bytes(names_buf[name_offset : name_offset + 24])
+            addr = addr_cache.get(name)
+            if addr is None:
+                addr = _parse_sockaddr(name)
+                if len(addr_cache) >= 1024:
+                    addr_cache.clear()
+                addr_cache[name] = addr
+            offset = i * bufsize
+            datagrams.append((self._view[offset : offset + size], addr))
+        return datagrams
+
+
+def make_batch_receiver(sock, batch_size: int = 32, bufsize: int = 65535):
+    """Return a recvmmsg receiver when the platform supports it, else a recv_into ring receiver."""
+    if recvmmsg_available():
+        try:
+            return RecvmmsgReceiver(sock, batch_size=batch_size, bufsize=bufsize)
+        except OSError:
+            pass
+    return RecvIntoReceiver(sock, batch_size=batch_size, bufsize=bufsize)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import socket
+import struct
+import sys
+from typing import Sequence
+
+from mudp.batch_receiver import IOVec, MMsgHdr
+
+UIO_MAXIOV = 1024
+
+
+def _load_sendmmsg():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        func = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.POINTER(MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    func.restype = ctypes.c_int
+    return func
+
+
+_sendmmsg = _load_sendmmsg()
+
+
+def sendmmsg_available() -> bool:
+    return _sendmmsg is not None
+
+
+def _pack_sockaddr_in(addr: tuple[str, int]) -> bytes | None:
+    try:
+        packed_host = socket.inet_aton(addr[0])
+    except (OSError, TypeError):
+        return None
+    return struct.pack("=H", socket.AF_INET) + struct.pack("!H", int(addr[1])) + packed_host + bytes(8)
+
+
+def _wait_writable(fd: int) -> None:
+    # The socket is non-blocking while a UDPPacketStream runs on it; wait instead of failing.
+    select.select([], [fd], [])
+
+
+def _sendmmsg_chunk(fd: int, datagrams: Sequence[bytes], sockaddr) -> int:
+    count = len(datagrams)
+    iovecs = (IOVec * count)()
+    msgs = (MMsgHdr * count)()
+    name = ctypes.cast(sockaddr, ctypes.c_void_p)
+    for i, raw in enumerate(datagrams):
+        iovecs[i].iov_base = ctypes.cast(ctypes.c_char_p(raw), ctypes.c_void_p)
+        iovecs[i].iov_len = len(raw)
+        hdr = msgs[i].msg_hdr
+        hdr.msg_name = name
+        hdr.msg_namelen = len(sockaddr)
+        hdr.msg_iov = ctypes.pointer(iovecs[i])
+        hdr.msg_iovlen = 1
+
+    base = ctypes.addressof(msgs)
+    sent = 0
+    while sent < count:
+        first = ctypes.cast(base + sent * ctypes.sizeof(MMsgHdr), ctypes.POINTER(MMsgHdr))
+        result = _sendmmsg(fd, first, count - sent, 0)
+        if result < 0:
+            err = ctypes.get_errno()
+            if err == errno.EINTR:
+                continue
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+                _wait_writable(fd)
+                continue
+            raise OSError(err, f"sendmmsg failed: {os.strerror(err)}")
+        sent += result
+    return sent
+
+
+def send_datagrams(sock: socket.socket, datagrams: Sequence[bytes], addr: tuple[str, int]) -> int:
+    """
+    Send every datagram to addr. On Linux with an IPv4 address this takes one sendmmsg()
+    call per UIO_MAXIOV datagrams; elsewhere it falls back to one sendto() each.
+    Returns the number of datagrams sent.
+    """
+    datagrams = [bytes(raw) for raw in datagrams]
+    sockaddr = _pack_sockaddr_in(addr) if _sendmmsg is not None else None
+    if sockaddr is None:
+        for raw in datagrams:
+            while True:
+                try:
+                    sock.sendto(raw, addr)
+                    break
+                except BlockingIOError:
+                    _wait_writable(sock.fileno())
+        return len(datagrams)
+
+    buffer = ctypes.create_string_buffer(sockaddr, len(sockaddr))
+    fd = sock.fileno()
+    sent = 0
+    for start in range(0, len(datagrams), UIO_MAXIOV):
+        sent += _sendmmsg_chunk(fd, datagrams[start : start + UIO_MAXIOV], buffer)
+    return sent
@@ -0,0 +1,461 @@
+"""
+Micro-benchmarks for the RX, TX, crypto and reliability hot paths, on synthetic packets.
+
+    mudp bench                          # table on stdout
+    mudp bench --json results.json      # also write machine-readable results
+    mudp bench --compare results.json --max-regression 20
+
+Every case reports the best per-operation time over --repeats runs, so results from
+different commits (and the JSON baseline given to --compare) can be checked for
+regressions. No sockets are opened; retransmissions go out on a LoopbackConnection.
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from itertools import cycle
+import json
+import platform
+import sys
+import time
+from typing import Any, Callable, Iterator, Optional
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2, telemetry_pb2
+from pubsub import pub
+
+from mudp.context import MeshContext
+from mudp.dedupe import DedupeCache
+from mudp.dispatch import RX_ACK, RX_DECODED, RX_PACKET, RX_ROUTING, RX_TEXT, RX_UNIQUE_PACKET, port_topic
+from mudp.encryption import decrypt_packet, encrypt_packet
+from mudp.loopback import LoopbackNetwork
+from mudp.node import Node
+from mudp.reliability import PendingAckRegistry, build_routing_ack_data
+from mudp.rx_message_handler import UDPPacketStream, decode_and_optionally_parse
+from mudp.tx_message_handler import build_data, build_mesh_packet, generate_mesh_packet
+
+CHANNEL = "LongFast"
+KEY = "1PG7OiApB1nwvP+rz05pAQ=="
+GROUP = ("224.0.0.69", 4403)
+FROM_ID = 0x12345678
+TO_ID = 0x0000ABCD
+
+DEFAULT_ITERATIONS = 20000
+DEFAULT_REPEATS = 5
+DEDUPE_SIZES = (256, 4096, 65536)
+PENDING_COUNTS = (100, 1000, 10000)
+
+
+@dataclass
+class BenchResult:
+    name: str
+    params: dict[str, Any]
+    iterations: int
+    ns_per_op: float
+    ops_per_sec: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.ops_per_sec = 1e9 / self.ns_per_op if self.ns_per_op > 0 else float("inf")
+
+    @property
+    def key(self) -> str:
+        return _case_key(self.name, self.params)
+
+
+def _case_key(name: str, params: dict[str, Any]) -> str:
+    """name plus its parameters, unique within one run."""
+    if not params:
+        return name
+    return name + "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+
+
+@dataclass
+class _Case:
+    name: str
+    params: dict[str, Any]
+    run: Callable[[int, int], BenchResult]
+
+
+def _best_ns(func: Callable[[], Any], iterations: int, repeats: int) -> float:
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / iterations
+
+
+def _timed(name: str, params: dict[str, Any], setup: Callable[[], Callable[[], Any]]) -> _Case:
+    """A case timing the callable returned by setup(), called once per iteration."""
+
+    def run(iterations: int, repeats: int) -> BenchResult:
+        return BenchResult(name, params, iterations, _best_ns(setup(), iterations, repeats))
+
+    return _Case(name, params, run)
+
+
+# --- synthetic packets -------------------------------------------------------------------
+
+
+def _position_data() -> mesh_pb2.Data:
+    position = mesh_pb2.Position(latitude_i=455000000, longitude_i=-1226000000, altitude=50, time=1700000000)
+    return build_data(position, portnums_pb2.PortNum.POSITION_APP)
+
+
+def _payloads() -> dict[str, mesh_pb2.Data]:
+    user = mesh_pb2.User(id="!12345678", long_name="Bench Node", short_name="BN", hw_model=255)
+    telemetry = telemetry_pb2.Telemetry(time=1700000000)
+    telemetry.device_metrics.battery_level = 90
+    telemetry.device_metrics.voltage = 4.1
+    waypoint = mesh_pb2.Waypoint(id=1, latitude_i=455000000, longitude_i=-1226000000, name="bench", expire=0)
+    return {
+        "text": build_data(b"hello mesh, this is a benchmark", portnums_pb2.PortNum.TEXT_MESSAGE_APP),
+        "position": _position_data(),
+        "nodeinfo": build_data(user, portnums_pb2.PortNum.NODEINFO_APP),
+        "telemetry": build_data(telemetry, portnums_pb2.PortNum.TELEMETRY_APP),
+        "waypoint": build_data(waypoint, portnums_pb2.PortNum.WAYPOINT_APP),
+    }
+
+
+def _envelope(packet_id: int = 1) -> mesh_pb2.MeshPacket:
+    packet = mesh_pb2.MeshPacket(id=packet_id, to=TO_ID, hop_limit=3, hop_start=3)
+    setattr(packet, "from", FROM_ID)
+    return packet
+
+
+def _plain_packet(data: mesh_pb2.Data) -> mesh_pb2.MeshPacket:
+    packet = _envelope()
+    packet.decoded.CopyFrom(data)
+    return packet
+
+
+def _encrypted_packet(data: mesh_pb2.Data) -> mesh_pb2.MeshPacket:
+    packet = _envelope()
+    packet.encrypted = encrypt_packet(CHANNEL, KEY, packet, data)
+    return packet
+
+
+def _ack_packet() -> mesh_pb2.MeshPacket:
+    return _plain_packet(build_routing_ack_data(request_id=0x7FFFFFFF))
+
+
+def _loopback_context(**node_fields) -> MeshContext:
+    connection = LoopbackNetwork().connection()
+    connection.host, connection.port = GROUP
+    return MeshContext(node=Node(node_id="!12345678", **node_fields), connection=connection)
+
+
+# --- cases -------------------------------------------------------------------------------
+
+
+def _decode_cases() -> Iterator[_Case]:
+    data = _position_data()
+    variants = [
+        ("plain", None, _plain_packet(data)),
+        ("encrypted", None, _encrypted_packet(data)),
+        ("encrypted", KEY, _encrypted_packet(data)),
+    ]
+    for packet_kind, key, packet in variants:
+        raw = packet.SerializeToString()
+        for parse_payload in (False, True):
+            if packet_kind == "encrypted" and key is None and parse_payload:
+                continue  # nothing to parse without the key
+
+            def setup(raw=raw, key=key, parse_payload=parse_payload):
+                return lambda: decode_and_optionally_parse(raw, key, parse_payload=parse_payload)
+
+            params = {"packet": packet_kind, "key": key is not None, "parse_payload": parse_payload}
+            yield _timed("rx.decode", params, setup)
+
+
+def _handle_cases() -> Iterator[_Case]:
+    data = _payloads()["text"]
+    raws = []
+    for packet_id in range(1, 4097):
+        packet = _envelope(packet_id)
+        packet.encrypted = encrypt_packet(CHANNEL, KEY, packet, data)
+        raws.append(packet.SerializeToString())
+
+    for instrument in (False, True):
+
+        def setup(instrument=instrument):
+            stream = UDPPacketStream(*GROUP, key=KEY, parse_payload=False, instrument=instrument, context=_loopback_context())
+            datagrams = cycle(raws)
+            handled = [0]
+
+            def handle() -> None:
+                # Every datagram takes the unique (decrypting) path; forget them once per cycle.
+                handled[0] += 1
+                if handled[0] % len(raws) == 0:
+                    stream.dedupe.clear()
+                stream._handle_datagram(next(datagrams), GROUP)
+
+            return handle
+
+        yield _timed("rx.handle_datagram", {"instrument": instrument}, setup)
+
+
+def _dedupe_cases() -> Iterator[_Case]:
+    for size in DEDUPE_SIZES:
+
+        def miss(size=size):
+            cache = DedupeCache(max_entries=size)
+            for sequence in range(size):
+                cache.seen((FROM_ID, sequence))
+            keys = iter(range(size, 1 << 62))
+            # Every key is new, so each call also evicts the oldest entry.
+            return lambda: cache.seen((FROM_ID, next(keys)))
+
+        def hit(size=size):
+            cache = DedupeCache(max_entries=size)
+            for sequence in range(size):
+                cache.seen((FROM_ID, sequence))
+            keys = cycle([(FROM_ID, sequence) for sequence in range(size - 1, -1, -max(size // 64, 1))])
+            return lambda: cache.seen(next(keys))
+
+        yield _timed("dedupe.miss", {"max_entries": size}, miss)
+        yield _timed("dedupe.hit", {"max_entries": size}, hit)
+
+
+def _on_packet(packet, addr=None) -> None:
+    pass
+
+
+def _on_decoded(packet, portnum, addr=None) -> None:
+    pass
+
+
+def _on_routing(packet, routing, addr=None, pending=None) -> None:
+    pass
+
+
+_ALL_TOPICS = [
+    (_on_packet, RX_PACKET),
+    (_on_packet, RX_UNIQUE_PACKET),
+    (_on_decoded, RX_DECODED),
+    (_on_packet, RX_TEXT),
+    (_on_packet, port_topic(portnums_pb2.PortNum.TEXT_MESSAGE_APP)),
+    (_on_packet, port_topic(portnums_pb2.PortNum.ROUTING_APP)),
+    (_on_routing, RX_ROUTING),
+    (_on_routing, RX_ACK),
+]
+
+
+def _set_subscribers(subscribed: bool) -> None:
+    for listener, topic in _ALL_TOPICS:
+        if subscribed:
+            pub.subscribe(listener, topic)
+        else:
+            pub.unsubscribe(listener, topic)
+
+
+def _dispatch_cases() -> Iterator[_Case]:
+    packets = {"text": _plain_packet(_payloads()["text"]), "ack": _ack_packet()}
+    for subscribers in ("none", "all"):
+        for packet_kind, packet in packets.items():
+
+            def run(iterations: int, repeats: int, packet=packet, subscribers=subscribers, packet_kind=packet_kind):
+                stream = UDPPacketStream(*GROUP, parse_payload=False, context=_loopback_context())
+                if subscribers == "all":
+                    _set_subscribers(True)
+                try:
+                    ns = _best_ns(lambda: stream._publish_unique_topics(packet, GROUP), iterations, repeats)
+                finally:
+                    if subscribers == "all":
+                        _set_subscribers(False)
+                return BenchResult("rx.dispatch", {"packet": packet_kind, "subscribers": subscribers}, iterations, ns)
+
+            yield _Case("rx.dispatch", {"packet": packet_kind, "subscribers": subscribers}, run)
+
+
+def _build_cases() -> Iterator[_Case]:
+    for portnum_name, data in _payloads().items():
+        for name, build in (("tx.build_mesh_packet", build_mesh_packet), ("tx.generate_mesh_packet", generate_mesh_packet)):
+
+            def setup(data=data, build=build):
+                context = _loopback_context(channel=CHANNEL, key=KEY)
+                return lambda: build(data, to=TO_ID, context=context)
+
+            yield _timed(name, {"portnum": portnum_name}, setup)
+
+
+def _crypto_cases() -> Iterator[_Case]:
+    data = _payloads()["text"]
+    packet = _encrypted_packet(data)
+
+    yield _timed("crypto.encrypt", {}, lambda: lambda: encrypt_packet(CHANNEL, KEY, packet, data))
+    yield _timed("crypto.decrypt", {}, lambda: lambda: decrypt_packet(packet, KEY))
+
+
+def _registry(pending_count: int) -> PendingAckRegistry:
+    registry = PendingAckRegistry(connection=_loopback_context().connection)
+    registry._ensure_worker = lambda: None
+    raw = b"x" * 64
+    now = time.time()
+    for packet_id in range(1, pending_count + 1):
+        registry.track(packet_id, TO_ID, now, raw, GROUP)
+    return registry
+
+
+def _process_due_cases() -> Iterator[_Case]:
+    for pending_count in PENDING_COUNTS:
+        params = {"pending": pending_count}
+
+        def idle(pending_count=pending_count):
+            registry = _registry(pending_count)
+            return lambda: registry.process_due()
+
+        def retransmit(iterations: int, repeats: int, pending_count=pending_count, params=params) -> BenchResult:
+            # One pass that retransmits everything, reported per pending packet.
+            passes = max(min(iterations // pending_count, 20), 1)
+            best = None
+            for _ in range(repeats):
+                registries = [_registry(pending_count) for _ in range(passes)]
+                due = max(pending.next_retry_monotonic for pending in registries[0]._pending.values())
+                start = time.perf_counter_ns()
+                for registry in registries:
+                    registry.process_due(now=due)
+                elapsed = time.perf_counter_ns() - start
+                best = elapsed if best is None else min(best, elapsed)
+            operations = passes * pending_count
+            return BenchResult("reliability.process_due.retransmit", params, operations, best / operations)
+
+        yield _timed("reliability.process_due.idle", params, idle)
+        yield _Case("reliability.process_due.retransmit", params, retransmit)
+
+
+CASE_GROUPS: dict[str, Callable[[], Iterator[_Case]]] = {
+    "rx.decode": _decode_cases,
+    "rx.handle_datagram": _handle_cases,
+    "dedupe": _dedupe_cases,
+    "rx.dispatch": _dispatch_cases,
+    "tx.build": _build_cases,
+    "crypto": _crypto_cases,
+    "reliability": _process_due_cases,
+}
+
+
+def iter_cases(patterns: Optional[list[str]] = None) -> Iterator[_Case]:
+    """Every benchmark case, or those whose name contains one of patterns."""
+    for cases in CASE_GROUPS.values():
+        for case in cases():
+            if not patterns or any(pattern in case.name for pattern in patterns):
+                yield case
+
+
+def run_benchmarks(
+    patterns: Optional[list[str]] = None,
+    iterations: int = DEFAULT_ITERATIONS,
+    repeats: int = DEFAULT_REPEATS,
+    progress: Optional[Callable[[BenchResult], None]] = None,
+) -> list[BenchResult]:
+    results = []
+    for case in iter_cases(patterns):
+        result = case.run(max(int(iterations), 1), max(int(repeats), 1))
+        results.append(result)
+        if progress is not None:
+            progress(result)
+    return results
+
+
+def environment() -> dict[str, Any]:
+    """Interpreter, platform and package versions the results were measured on."""
+    from importlib import metadata
+
+    from google.protobuf.internal import api_implementation
+
+    def version(package: str) -> Optional[str]:
+        try:
+            return metadata.version(package)
+        except metadata.PackageNotFoundError:
+            return None
+
+    return {
+        "mudp": version("mudp"),
+        "protobuf": version("protobuf"),
+        "protobuf_backend": api_implementation.Type(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def results_document(results: list[BenchResult], iterations: int, repeats: int) -> dict[str, Any]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": {"iterations": iterations, "repeats": repeats},
+        "results": [dict(asdict(result), key=result.key) for result in results],
+    }
+
+
+def _format(result: BenchResult, baseline: Optional[dict[str, float]]) -> str:
+    line = f"{result.key:<72} {result.ns_per_op:>12,.0f} ns/op {result.ops_per_sec:>14,.0f} ops/s"
+    if baseline is not None and result.key in baseline:
+        line += f"  {result.ns_per_op / baseline[result.key]:6.2f}x"
+    return line
+
+
+def _load_baseline(path: str) -> dict[str, float]:
+    with open(path, encoding="utf-8") as handle:
+        document = json.load(handle)
+    return {entry["key"]: float(entry["ns_per_op"]) for entry in document["results"]}
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="mudp bench", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="calls per timed run")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="timed runs per case; the best is kept")
+    parser.add_argument("--filter", action="append", help="only run cases whose name contains this (repeatable)")
+    parser.add_argument("--list", action="store_true", help="list case names and exit")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON to PATH ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH", help="JSON results to compare against (ratio column)")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        metavar="PCT",
+        help="with --compare, exit 1 if any case is more than PCT percent slower than the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for case in iter_cases(args.filter):
+            print(_case_key(case.name, case.params))
+        return 0
+
+    baseline = _load_baseline(args.compare) if args.compare else None
+    out = sys.stderr if args.json == "-" else sys.stdout
+    results = run_benchmarks(
+        args.filter,
+        args.iterations,
+        args.repeats,
+        progress=lambda result: print(_format(result, baseline), file=out, flush=True),
+    )
+
+    if args.json:
+        document = results_document(results, args.iterations, args.repeats)
+        if args.json == "-":
+            json.dump(document, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            with open(args.json, "w", encoding="utf-8") as handle:
+                json.dump(document, handle, indent=2)
+                handle.write("\n")
+
+    if baseline is not None and args.max_regression is not None:
+        limit = 1.0 + args.max_regression / 100.0
+        regressed = [r.key for r in results if r.key in baseline and r.ns_per_op > baseline[r.key] * limit]
+        for key in regressed:
+            print(f"regression: {key}", file=sys.stderr)
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
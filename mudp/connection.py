@@ -1,6 +1,31 @@
+from __future__ import annotations
+
 import os
+import select
 import socket
 import sys
+from typing import Any, Optional, Protocol
+
+
+class Transport(Protocol):
+    """
+    What the send path, PendingAckRegistry and UDPPacketStream need from a connection.
+
+    host and port are the group packets are addressed to, set by setup_multicast().
+    socket is the underlying OS socket when there is one; it enables select(), batched
+    receive and sendmmsg(). Transports without one are read through recvfrom(), which
+    raises TimeoutError when nothing arrives within timeout seconds.
+    """
+
+    host: Optional[str]
+    port: Optional[int]
+    socket: Optional[socket.socket]
+
+    def setup_multicast(self, group: str, port: int, bind_mode: Optional[str] = None) -> None: ...
+
+    def recvfrom(self, bufsize: int = 4096, timeout: Optional[float] = None) -> tuple[bytes, Any]: ...
+
+    def sendto(self, data: bytes, addr) -> None: ...
 
 
 class Connection:
@@ -48,9 +73,13 @@ class Connection:
         self.socket = sock
         self.sock = sock
 
-    def recvfrom(self, bufsize: int = 4096):
+    def recvfrom(self, bufsize: int = 4096, timeout: float | None = None):
         if not self.socket:
             raise RuntimeError("Socket is not initialized.")
+        if timeout is not None:
+            ready, _, _ = select.select([self.socket], [], [], timeout)
+            if not ready:
+                raise TimeoutError("No datagram received within the timeout.")
         return self.socket.recvfrom(bufsize)
 
     def sendto(self, data: bytes, addr):
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+from mudp.connection import Connection, Transport
+from mudp.dedupe import DedupeCache
+from mudp.flow_control import SendWindow, send_window
+from mudp.node import Node
+from mudp.packet_id import PacketIdAllocator, packet_ids
+from mudp.reliability import PendingAckRegistry, pending_acks
+from mudp.singleton import conn, node
+
+
+@dataclass
+class MeshContext:
+    """
+    Everything one node needs to send and receive, so a process can host many of them: the
+    connection it uses (a Connection or another Transport such as a LoopbackConnection), its
+    identity and channel key (node), its pending-ACK registry and send window, its packet id
+    allocator and a receive dedupe cache.
+
+    Pass it as context= to the send functions, UDPPacketStream or AsyncPacketStream. Without
+    one they use the module-level conn, node, pending_acks and send_window, which together
+    make up default_context(). Fields left out get fresh instances; the registry retransmits
+    on the context's connection.
+
+    virtual_node() gives further identities that share this context's connection, registry,
+    packet ids and dedupe cache, so hundreds of simulated nodes can run on one socket and one
+    receiving stream.
+    """
+
+    node: Node = field(default_factory=Node)
+    connection: Transport = field(default_factory=Connection)
+    pending_acks: Optional[PendingAckRegistry] = None
+    send_window: Optional[SendWindow] = None
+    packet_ids: PacketIdAllocator = field(default_factory=PacketIdAllocator)
+    dedupe: Optional[DedupeCache] = field(default_factory=DedupeCache)
+
+    def __post_init__(self) -> None:
+        if self.pending_acks is None:
+            self.pending_acks = PendingAckRegistry(connection=self.connection)
+        if self.send_window is None:
+            self.send_window = SendWindow(registry=self.pending_acks)
+
+    def virtual_node(self, node: Node) -> "MeshContext":
+        """A context for another identity on the same connection, with its own send window."""
+        window = SendWindow(self.send_window.max_in_flight, self.send_window.max_queued, registry=self.pending_acks)
+        return replace(self, node=node, send_window=window)
+
+
+_default_context = MeshContext(
+    node=node,
+    connection=conn,
+    pending_acks=pending_acks,
+    send_window=send_window,
+    packet_ids=packet_ids,
+    # Streams created without a context keep their own dedupe caches.
+    dedupe=None,
+)
+
+
+def default_context() -> MeshContext:
+    """The context made of the module-level singletons used when no context is given."""
+    return _default_context
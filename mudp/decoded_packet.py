@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Any
+
+from google.protobuf.message import DecodeError
+from meshtastic import protocols
+from meshtastic.protobuf import mesh_pb2
+
+_UNPARSED = object()
+
+
+def payload_protobuf_factory(portnum: int):
+    handler = protocols.get(portnum) if portnum is not None else None
+    if handler is None:
+        return None
+    return handler.protobufFactory
+
+
+def flatten_payload_text(pb) -> str:
+    return str(pb).replace("\n", " ").replace("\r", " ").strip()
+
+
+class DecodedPacket:
+    """
+    Wraps a received MeshPacket and decodes its port payload on demand.
+
+    Attribute access falls through to the wrapped packet, so existing code that reads
+    packet.id, packet.decoded.payload or calls packet.HasField(...) keeps working, and
+    packet.decoded.payload stays the original wire bytes. The typed payload protobuf is
+    parsed on first access to .payload and cached; .text renders the flattened one-line
+    form that parse_payload=True used to write into decoded.payload. channel_key is the
+    KeyRing channel that decrypted the packet, if any.
+    """
+
+    __slots__ = ("packet", "channel_key", "_payload", "_text")
+
+    def __init__(self, packet: mesh_pb2.MeshPacket, channel_key=None) -> None:
+        object.__setattr__(self, "packet", packet)
+        object.__setattr__(self, "channel_key", channel_key)
+        object.__setattr__(self, "_payload", _UNPARSED)
+        object.__setattr__(self, "_text", None)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.packet, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in DecodedPacket.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.packet, name, value)
+
+    def __str__(self) -> str:
+        return str(self.packet)
+
+    def __repr__(self) -> str:
+        return f"DecodedPacket(id={self.packet.id}, from={getattr(self.packet, 'from')}, portnum={self.portnum})"
+
+    @property
+    def portnum(self) -> int | None:
+        if not self.packet.HasField("decoded"):
+            return None
+        return self.packet.decoded.portnum
+
+    @property
+    def payload(self):
+        """The port payload parsed into its typed protobuf, or None if unavailable."""
+        if self._payload is _UNPARSED:
+            object.__setattr__(self, "_payload", self._parse_payload())
+        return self._payload
+
+    def _parse_payload(self):
+        if not self.packet.HasField("decoded"):
+            return None
+        factory = payload_protobuf_factory(self.packet.decoded.portnum)
+        if factory is None:
+            return None
+        pb = factory()
+        try:
+            pb.ParseFromString(self.packet.decoded.payload)
+        except DecodeError:
+            return None
+        return pb
+
+    @property
+    def text(self) -> str | None:
+        """One-line text rendering of the payload, computed on first access."""
+        if self._text is None and self.packet.HasField("decoded"):
+            pb = self.payload
+            if pb is not None:
+                text = flatten_payload_text(pb)
+            else:
+                text = self.packet.decoded.payload.decode("utf-8", "replace")
+            object.__setattr__(self, "_text", text)
+        return self._text
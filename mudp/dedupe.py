@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Optional
+
+DEFAULT_DEDUPE_TTL_SEC = 60.0
+DEFAULT_DEDUPE_MAX_ENTRIES = 4096
+
+DedupeKey = tuple[int, int]
+
+
+class DedupeCache:
+    """
+    Recently seen (from, id) packet keys, plus the first copy's decoded packet and channel
+    so later copies can reuse them. Entries expire ttl_sec after they were last seen (0
+    keeps them until evicted) and the oldest are evicted beyond max_entries.
+
+    Thread-safe, so several streams can share one, e.g. through a MeshContext. hits and
+    misses count seen() lookups of real keys.
+    """
+
+    def __init__(self, ttl_sec: float = DEFAULT_DEDUPE_TTL_SEC, max_entries: int = DEFAULT_DEDUPE_MAX_ENTRIES) -> None:
+        self.ttl_sec = max(float(ttl_sec), 0.0)
+        self.max_entries = max(int(max_entries), 1)
+        self._lock = threading.Lock()
+        self._seen: OrderedDict[DedupeKey, float] = OrderedDict()
+        self._decoded: dict[DedupeKey, Any] = {}
+        self._channels: dict[DedupeKey, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def seen(self, key: Optional[DedupeKey], now: Optional[float] = None) -> bool:
+        """Record key and return whether it was already seen within the TTL."""
+        if key is None:
+            return False
+        check_time = time.monotonic() if now is None else float(now)
+        with self._lock:
+            return self._check_and_mark(key, check_time)
+
+    def _check_and_mark(self, key: DedupeKey, check_time: float) -> bool:
+        self._prune(check_time)
+
+        seen_at = self._seen.get(key)
+        if seen_at is not None:
+            if self.ttl_sec == 0 or (check_time - seen_at) <= self.ttl_sec:
+                self._seen.move_to_end(key)
+                self._seen[key] = check_time
+                self.hits += 1
+                return True
+            self._seen.pop(key, None)
+            self._forget(key)
+
+        self.misses += 1
+        self._seen[key] = check_time
+        self._prune(check_time)
+        return False
+
+    def _prune(self, now: float) -> None:
+        if self.ttl_sec > 0:
+            expiry_cutoff = now - self.ttl_sec
+            while self._seen:
+                _, seen_at = next(iter(self._seen.items()))
+                if seen_at > expiry_cutoff:
+                    break
+                key, _ = self._seen.popitem(last=False)
+                self._forget(key)
+
+        while len(self._seen) > self.max_entries:
+            key, _ = self._seen.popitem(last=False)
+            self._forget(key)
+
+    def _forget(self, key: DedupeKey) -> None:
+        self._decoded.pop(key, None)
+        self._channels.pop(key, None)
+
+    def remember(self, key: DedupeKey, packet: Any, channel: Any = None) -> None:
+        """Keep the first copy's decoded packet (and channel) while key is still tracked."""
+        with self._lock:
+            if key not in self._seen:
+                return
+            self._decoded[key] = packet
+            if channel is not None:
+                self._channels[key] = channel
+
+    def decoded(self, key: DedupeKey) -> Any:
+        return self._decoded.get(key)
+
+    def channel(self, key: DedupeKey) -> Any:
+        return self._channels.get(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._seen.clear()
+            self._decoded.clear()
+            self._channels.clear()
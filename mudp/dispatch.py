@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from pubsub import pub
+
+RX_RAW = "mesh.rx.raw"
+RX_DECODE_ERROR = "mesh.rx.decode_error"
+RX_PACKET = "mesh.rx.packet"
+RX_UNIQUE_PACKET = "mesh.rx.unique_packet"
+RX_DUPLICATE = "mesh.rx.duplicate"
+RX_DECODED = "mesh.rx.decoded"
+RX_TEXT = "mesh.rx.text"
+RX_ROUTING = "mesh.rx.routing"
+RX_ACK = "mesh.rx.ack"
+RX_NAK = "mesh.rx.nak"
+RX_LISTENER_ERROR = "mesh.rx.listener_error"
+RX_STATS = "mesh.rx.stats"
+
+_PORT_TOPICS: dict[int, str] = {}
+
+
+def port_topic(portnum: int) -> str:
+    """Return the interned 'mesh.rx.port.<portnum>' topic name."""
+    topic = _PORT_TOPICS.get(portnum)
+    if topic is None:
+        topic = _PORT_TOPICS.setdefault(portnum, f"mesh.rx.port.{int(portnum)}")
+    return topic
+
+
+class _TopicRoute:
+    """The existing topics a message on one topic name would reach (itself and its ancestors)."""
+
+    __slots__ = ("topics", "deepest", "missing_child")
+
+    def __init__(self, name: str) -> None:
+        topic_mgr = pub.getDefaultTopicMgr()
+        parts = name.split(".")
+        deepest = topic_mgr.getRootAllTopics()
+        missing_child = None
+        for i in range(len(parts)):
+            topic = topic_mgr.getTopic(".".join(parts[: i + 1]), okIfNone=True)
+            if topic is None:
+                missing_child = parts[i]
+                break
+            deepest = topic
+
+        topics = []
+        topic = deepest
+        while topic is not None:
+            topics.append(topic)
+            topic = topic.getParent()
+
+        self.topics = tuple(topics)
+        self.deepest = deepest
+        self.missing_child = missing_child
+
+    def is_stale(self) -> bool:
+        return self.missing_child is not None and self.deepest.hasSubtopic(self.missing_child)
+
+    def has_listeners(self) -> bool:
+        for topic in self.topics:
+            if topic.hasListeners():
+                return True
+        return False
+
+
+class TopicDispatcher:
+    """
+    Answers "would pub.sendMessage(topic) reach any listener?" without going through
+    sendMessage. pubsub delivers to listeners of parent topics as well, so a topic counts
+    as active if it or any ancestor (including the root) has listeners. Topic objects are
+    cached per name; a name whose topic did not exist yet is re-resolved as soon as it is
+    created by a subscribe or send.
+    """
+
+    def __init__(self) -> None:
+        self._routes: dict[str, _TopicRoute] = {}
+
+    def has_listeners(self, topic: str) -> bool:
+        route = self._routes.get(topic)
+        if route is None or route.is_stale():
+            route = self._routes[topic] = _TopicRoute(topic)
+        return route.has_listeners()
+
+    def reset(self) -> None:
+        """Drop cached topic objects, e.g. after pub.getDefaultTopicMgr().delTopic()."""
+        self._routes.clear()
+
+
+dispatcher = TopicDispatcher()
+
+
+def always_has_listeners(topic: str) -> bool:
+    return True
@@ -1,10 +1,22 @@
+from __future__ import annotations
+
 import base64
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 from meshtastic.protobuf import mesh_pb2
 
 
 MESHTASTIC_ONE_BYTE_PSK_PREFIX = bytes.fromhex("d4f1bb3a20290759f0bcffabcf4e69")
+CIPHER_CACHE_MAX_ENTRIES = 64
+
+_BACKEND = default_backend()
+
+logger = logging.getLogger(__name__)
 
 
 def normalize_psk(key: str) -> str:
@@ -19,6 +31,87 @@ def normalize_psk(key: str) -> str:
     return base64.b64encode(MESHTASTIC_ONE_BYTE_PSK_PREFIX + raw_key).decode("ascii")
 
 
+@dataclass
+class CipherKey:
+    """Prepared material for one PSK: normalized key, AES algorithm and channel hashes."""
+
+    psk: str
+    key_bytes: bytes
+    algorithm: algorithms.AES | None
+    key_hash: int
+    channel_hashes: dict[str, int] = field(default_factory=dict)
+
+    def require_algorithm(self) -> algorithms.AES:
+        if self.algorithm is None:
+            raise ValueError(f"Invalid key size ({len(self.key_bytes) * 8}) for AES.")
+        return self.algorithm
+
+    def channel_hash(self, name: str) -> int:
+        result = self.channel_hashes.get(name)
+        if result is None:
+            result = xor_hash(bytes(name, "utf-8")) ^ self.key_hash
+            self.channel_hashes[name] = result
+        return result
+
+
+class CipherKeyCache:
+    """Bounded LRU cache of CipherKey objects keyed by the PSK string as supplied."""
+
+    def __init__(self, max_entries: int = CIPHER_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max(int(max_entries), 1)
+        self._lock = Lock()
+        self._entries: OrderedDict[str, CipherKey] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> CipherKey:
+        """Return prepared material for key, raising if the key is not valid base64."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = _prepare_cipher_key(key)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key: str | None = None) -> None:
+        """Drop one key, or every cached key when called without arguments."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+def _prepare_cipher_key(key: str) -> CipherKey:
+    psk = normalize_psk(key)
+    key_bytes = base64.b64decode(psk.encode("ascii"))
+    hash_key_bytes = base64.b64decode(psk.replace("-", "+").replace("_", "/").encode("utf-8"))
+    try:
+        algorithm = algorithms.AES(key_bytes)
+    except ValueError:
+        algorithm = None
+    return CipherKey(psk=psk, key_bytes=key_bytes, algorithm=algorithm, key_hash=xor_hash(hash_key_bytes))
+
+
+cipher_cache = CipherKeyCache()
+
+
+def invalidate_cipher_cache(key: str | None = None) -> None:
+    cipher_cache.invalidate(key)
+
+
+def _packet_nonce(mp: mesh_pb2.MeshPacket) -> bytes:
+    return getattr(mp, "id").to_bytes(8, "little") + getattr(mp, "from").to_bytes(8, "little")
+
+
 def decrypt_packet(mp: mesh_pb2.MeshPacket, key: str, *, silent: bool = False) -> mesh_pb2.Data | None:
     """
     Decrypt the encrypted message payload and return the decoded Data object.
@@ -30,18 +123,11 @@ def decrypt_packet(mp: mesh_pb2.MeshPacket, key: str, *, silent: bool = False) -
     Returns:
         A decoded mesh_pb2.Data object or None on failure.
     """
-    key = normalize_psk(key)
-
     try:
-        key_bytes = base64.b64decode(key.encode("ascii"))
-
-        # Build the nonce from message ID and sender
-        nonce_packet_id = getattr(mp, "id").to_bytes(8, "little")
-        nonce_from_node = getattr(mp, "from").to_bytes(8, "little")
-        nonce = nonce_packet_id + nonce_from_node
+        algorithm = cipher_cache.get(key).require_algorithm()
 
-        # Decrypt the encrypted payload
-        cipher = Cipher(algorithms.AES(key_bytes), modes.CTR(nonce), backend=default_backend())
+        # Decrypt the encrypted payload; the nonce is the message ID followed by the sender
+        cipher = Cipher(algorithm, modes.CTR(_packet_nonce(mp)), backend=_BACKEND)
         decryptor = cipher.decryptor()
         decrypted_bytes = decryptor.update(getattr(mp, "encrypted")) + decryptor.finalize()
 
@@ -51,12 +137,11 @@ def decrypt_packet(mp: mesh_pb2.MeshPacket, key: str, *, silent: bool = False) -
             data.ParseFromString(decrypted_bytes)
             return data
         except Exception as e:
-            # print(f"Failed to parse Data protobuf: {e}")
             return None
 
     except Exception as e:
         if not silent:
-            print(f"Failed to decrypt: {e}")
+            logger.warning("Failed to decrypt: %s", e)
         return None
 
 
@@ -73,26 +158,18 @@ def encrypt_packet(channel: str, key: str, mp: mesh_pb2.MeshPacket, encoded_mess
     Returns:
         The encrypted message bytes or None on failure.
     """
-    key = normalize_psk(key)
-
     try:
-        mp.channel = generate_hash(channel, key)
-        key_bytes = base64.b64decode(key.encode("ascii"))
-
-        nonce_packet_id = getattr(mp, "id").to_bytes(8, "little")
-        nonce_from_node = getattr(mp, "from").to_bytes(8, "little")
+        prepared = cipher_cache.get(key)
+        mp.channel = prepared.channel_hash(channel)
 
-        # Put both parts into a single byte array.
-        nonce = nonce_packet_id + nonce_from_node
-
-        cipher = Cipher(algorithms.AES(key_bytes), modes.CTR(nonce), backend=default_backend())
+        cipher = Cipher(prepared.require_algorithm(), modes.CTR(_packet_nonce(mp)), backend=_BACKEND)
         encryptor = cipher.encryptor()
         encrypted_bytes = encryptor.update(encoded_message.SerializeToString()) + encryptor.finalize()
 
         return encrypted_bytes
 
     except Exception as e:
-        print(f"Failed to encrypt: {e}")
+        logger.warning("Failed to encrypt: %s", e)
         return None
 
 
@@ -106,10 +183,4 @@ def xor_hash(data: bytes) -> int:
 
 def generate_hash(name: str, key: str) -> int:
     """generate the channel number by hashing the channel name and psk"""
-    key = normalize_psk(key)
-    replaced_key = key.replace("-", "+").replace("_", "/")
-    key_bytes = base64.b64decode(replaced_key.encode("utf-8"))
-    h_name = xor_hash(bytes(name, "utf-8"))
-    h_key = xor_hash(key_bytes)
-    result: int = h_name ^ h_key
-    return result
+    return cipher_cache.get(key).channel_hash(name)
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from threading import Condition
+import time
+from typing import Callable
+
+from meshtastic import mesh_pb2
+from mudp.reliability import AckHandle, PendingAck, PendingAckRegistry, ack_destination, pending_acks
+
+DEFAULT_MAX_IN_FLIGHT = 0
+DEFAULT_MAX_QUEUED = 256
+
+
+class SendWindowFull(Exception):
+    """A reliable send was refused because its destination's send queue is full."""
+
+
+class SendWindowTimeout(TimeoutError):
+    """No in-flight slot opened for a reliable send within its timeout."""
+
+
+@dataclass
+class WindowStats:
+    destination: int
+    in_flight: int
+    queued: int
+    queue_high_water: int
+    sent: int
+    deferred: int
+    rejected: int
+    timed_out: int
+
+
+@dataclass
+class _Queued:
+    pending: PendingAck
+    raw_bytes: bytes
+    sendto: Callable[[bytes, tuple], None]
+    addr: tuple
+    handle: AckHandle
+
+
+class _DestinationWindow:
+    __slots__ = ("in_flight", "queue", "queue_high_water", "sent", "deferred", "rejected", "timed_out")
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.queue: deque[_Queued] = deque()
+        self.queue_high_water = 0
+        self.sent = 0
+        self.deferred = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+
+class SendWindow:
+    """
+    Per-destination flow control for want_ack traffic, sitting in front of the
+    PendingAckRegistry.
+
+    At most max_in_flight tracked packets are outstanding to a destination at once (the
+    default 0 disables the limit). Further sends queue up, max_queued per destination, and go out
+    in order as earlier ones are ACKed, NAKed, given up on or cancelled. Unreliable packets
+    (broadcasts, no want_ack) are sent straight through.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        registry: PendingAckRegistry | None = None,
+    ) -> None:
+        self.max_in_flight = max(int(max_in_flight), 0)
+        self.max_queued = max(int(max_queued), 0)
+        self.registry = pending_acks if registry is None else registry
+        self._cond = Condition()
+        self._windows: dict[int, _DestinationWindow] = {}
+
+    def set_limits(self, max_in_flight: int | None = None, max_queued: int | None = None) -> None:
+        """Change the limits; a larger window releases queued packets right away."""
+        with self._cond:
+            if max_in_flight is not None:
+                self.max_in_flight = max(int(max_in_flight), 0)
+            if max_queued is not None:
+                self.max_queued = max(int(max_queued), 0)
+            released = [item for destination in list(self._windows) for item in self._take_ready(destination)]
+            self._cond.notify_all()
+        for item in released:
+            self._transmit(item)
+
+    def _has_room(self, window: _DestinationWindow) -> bool:
+        return not self.max_in_flight or window.in_flight < self.max_in_flight
+
+    def send(
+        self,
+        packet: mesh_pb2.MeshPacket,
+        raw_bytes: bytes,
+        sendto: Callable[[bytes, tuple], None],
+        addr: tuple,
+        timeout: float | None = None,
+        release_sendto: Callable[[bytes, tuple], None] | None = None,
+    ) -> AckHandle | None:
+        """
+        Transmit packet now or queue it behind its destination's in-flight window.
+
+        With a timeout, wait up to that many seconds for a free slot instead of queueing,
+        then raise SendWindowTimeout. Raises SendWindowFull when the queue is full.
+        Returns the packet's AckHandle, or None for packets that are not tracked.
+
+        A queued packet is released by whichever thread settles an earlier one (usually the
+        RX thread), so it is sent with release_sendto when given, which must not block.
+        """
+        destination = ack_destination(packet, self.registry.connection)
+        if destination is None:
+            sendto(raw_bytes, addr)
+            return None
+
+        with self._cond:
+            window = self._windows.setdefault(destination, _DestinationWindow())
+            if not self._has_room(window) and timeout is not None:
+                if not self._cond.wait_for(lambda: self._has_room(window) and not window.queue, timeout):
+                    window.timed_out += 1
+                    raise SendWindowTimeout(f"No send slot for !{destination:08x} within {timeout}s")
+                # The window may have emptied and been dropped while we waited.
+                window = self._windows.setdefault(destination, window)
+            if self._has_room(window) and not window.queue:
+                window.in_flight += 1
+                window.sent += 1
+                item = self._new_item(packet, destination, raw_bytes, sendto, addr)
+            elif len(window.queue) >= self.max_queued:
+                window.rejected += 1
+                raise SendWindowFull(f"Send queue for !{destination:08x} is full ({self.max_queued} packets)")
+            else:
+                item = self._new_item(packet, destination, raw_bytes, release_sendto or sendto, addr)
+                window.queue.append(item)
+                window.deferred += 1
+                window.queue_high_water = max(window.queue_high_water, len(window.queue))
+                return item.handle
+
+        self._transmit(item)
+        return item.handle
+
+    def _new_item(
+        self,
+        packet: mesh_pb2.MeshPacket,
+        destination: int,
+        raw_bytes: bytes,
+        sendto: Callable[[bytes, tuple], None],
+        addr: tuple,
+    ) -> _Queued:
+        pending = self.registry.new_pending(int(packet.id), destination, time.time(), raw_bytes, addr)
+        return _Queued(pending, raw_bytes, sendto, addr, AckHandle(pending, self.registry))
+
+    def _take_ready(self, destination: int) -> list[_Queued]:
+        window = self._windows[destination]
+        ready = []
+        while window.queue and self._has_room(window):
+            item = window.queue.popleft()
+            if item.pending.future.cancelled():
+                continue
+            window.in_flight += 1
+            window.sent += 1
+            ready.append(item)
+        return ready
+
+    def _transmit(self, item: _Queued) -> None:
+        destination = item.pending.destination
+        self.registry.start(item.pending)
+        item.pending.future.add_done_callback(lambda _: self._release(destination))
+        try:
+            item.sendto(item.raw_bytes, item.addr)
+        except Exception as error:
+            self.registry.fail(item.pending, error)
+
+    def _release(self, destination: int) -> None:
+        with self._cond:
+            window = self._windows[destination]
+            window.in_flight -= 1
+            released = self._take_ready(destination)
+            if not window.in_flight and not window.queue:
+                del self._windows[destination]
+            self._cond.notify_all()
+        for item in released:
+            self._transmit(item)
+
+    def stats(self, destination: int | None = None) -> dict[int, WindowStats] | WindowStats | None:
+        """
+        Window and queue counters per destination, or for one destination. A destination
+        with nothing in flight or queued is forgotten, counters included, and reports None.
+        """
+        with self._cond:
+            if destination is not None:
+                window = self._windows.get(int(destination))
+                return None if window is None else self._stats(int(destination), window)
+            return {dest: self._stats(dest, window) for dest, window in self._windows.items()}
+
+    @staticmethod
+    def _stats(destination: int, window: _DestinationWindow) -> WindowStats:
+        return WindowStats(
+            destination=destination,
+            in_flight=window.in_flight,
+            queued=len(window.queue),
+            queue_high_water=window.queue_high_water,
+            sent=window.sent,
+            deferred=window.deferred,
+            rejected=window.rejected,
+            timed_out=window.timed_out,
+        )
+
+
+send_window = SendWindow()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from threading import Lock
+from typing import Iterable, Iterator
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+from mudp.encryption import decrypt_packet, generate_hash
+
+
+@dataclass(frozen=True)
+class ChannelKey:
+    name: str
+    key: str
+    hash: int
+
+
+class KeyRing:
+    """
+    A set of (channel name, PSK) pairs indexed by the 8-bit channel hash carried in
+    MeshPacket.channel, so each encrypted packet is only trial-decrypted with the keys
+    whose hash matches.
+    """
+
+    def __init__(self, channels: Iterable[tuple[str, str]] = ()) -> None:
+        self._lock = Lock()
+        self._channels: dict[str, ChannelKey] = {}
+        self._by_hash: dict[int, tuple[ChannelKey, ...]] = {}
+        self._pairs: tuple[tuple[str, str], ...] = ()
+        for name, key in channels:
+            self.add(name, key)
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def __iter__(self) -> Iterator[ChannelKey]:
+        return iter(list(self._channels.values()))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._channels
+
+    def add(self, name: str, key: str) -> ChannelKey:
+        """Register (or replace) a channel. Raises if the key is not valid base64."""
+        channel = ChannelKey(name=name, key=key, hash=generate_hash(name, key))
+        with self._lock:
+            self._channels[name] = channel
+            self._reindex()
+        return channel
+
+    def remove(self, name: str) -> ChannelKey | None:
+        with self._lock:
+            channel = self._channels.pop(name, None)
+            self._reindex()
+        return channel
+
+    def get(self, name: str) -> ChannelKey | None:
+        return self._channels.get(name)
+
+    def pairs(self) -> tuple[tuple[str, str], ...]:
+        """The registered (name, key) pairs, e.g. to rebuild the ring in another process."""
+        return self._pairs
+
+    def candidates(self, channel_hash: int) -> tuple[ChannelKey, ...]:
+        return self._by_hash.get(int(channel_hash), ())
+
+    def _reindex(self) -> None:
+        by_hash: dict[int, list[ChannelKey]] = {}
+        for channel in self._channels.values():
+            by_hash.setdefault(channel.hash, []).append(channel)
+        self._by_hash = {channel_hash: tuple(channels) for channel_hash, channels in by_hash.items()}
+        self._pairs = tuple((channel.name, channel.key) for channel in self._channels.values())
+
+    def decrypt(self, mp: mesh_pb2.MeshPacket) -> tuple[mesh_pb2.Data, ChannelKey] | None:
+        """
+        Decrypt mp with the keys registered for its channel hash. When hashes collide,
+        the first candidate whose plaintext parses as a Data message with a known portnum wins.
+        """
+        for channel in self.candidates(mp.channel):
+            data = decrypt_packet(mp, channel.key, silent=True)
+            if data is not None and data.portnum != portnums_pb2.PortNum.UNKNOWN_APP:
+                return data, channel
+        return None
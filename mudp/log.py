@@ -0,0 +1,32 @@
+import logging
+from typing import Optional, TextIO
+
+LOGGER_NAME = "mudp"
+QUIET_LEVEL = logging.CRITICAL + 1
+
+logger = logging.getLogger(LOGGER_NAME)
+_level_before_quiet = logging.NOTSET
+
+
+def set_quiet(quiet: bool = True) -> None:
+    """Silence every mudp log record, errors included (set_quiet(False) restores the previous level)."""
+    global _level_before_quiet
+    if quiet:
+        if logger.level != QUIET_LEVEL:
+            _level_before_quiet = logger.level
+        logger.setLevel(QUIET_LEVEL)
+    elif logger.level == QUIET_LEVEL:
+        logger.setLevel(_level_before_quiet)
+
+
+def enable_console_logging(level: int = logging.INFO, stream: Optional[TextIO] = None) -> logging.Handler:
+    """
+    Print mudp log records to stream (stderr by default) at level and above, roughly the
+    old print() output: sent packets at INFO, their raw bytes at DEBUG. Returns the handler
+    so it can be removed again.
+    """
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
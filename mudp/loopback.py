@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import heapq
+from itertools import count
+import random
+from threading import Condition, Lock
+import time
+from typing import Optional
+
+DEFAULT_MAX_QUEUED = 65536
+DEFAULT_REORDER_DELAY_SEC = 0.005
+
+
+class LoopbackNetwork:
+    """
+    An in-process stand-in for the multicast network, for tests and benchmarks that must
+    not depend on sockets or network permissions.
+
+    Every datagram sent by a LoopbackConnection on this network is delivered to each
+    connection that joined the group it was addressed to, the sender included (like
+    IP_MULTICAST_LOOP). On the way it can be impaired, independently per receiver:
+
+    - loss: probability the copy is dropped.
+    - duplicate: probability a second copy is delivered as well.
+    - reorder: probability the copy is held back reorder_delay_sec, so datagrams sent
+      within that time overtake it.
+    - latency_sec plus up to jitter_sec of uniform random delay before it can be read.
+
+    The impairment decisions come from random.Random(seed), so a seeded network applied to
+    the same send sequence drops, duplicates and reorders the same datagrams every run.
+    Impairments can be changed at any time. Each connection queues at most max_queued
+    datagrams, like a socket receive buffer; further copies are dropped and counted as
+    overflowed.
+    """
+
+    def __init__(
+        self,
+        *,
+        loss: float = 0.0,
+        duplicate: float = 0.0,
+        reorder: float = 0.0,
+        latency_sec: float = 0.0,
+        jitter_sec: float = 0.0,
+        reorder_delay_sec: float = DEFAULT_REORDER_DELAY_SEC,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.loss = float(loss)
+        self.duplicate = float(duplicate)
+        self.reorder = float(reorder)
+        self.latency_sec = max(float(latency_sec), 0.0)
+        self.jitter_sec = max(float(jitter_sec), 0.0)
+        self.reorder_delay_sec = max(float(reorder_delay_sec), 0.0)
+        self.max_queued = max(int(max_queued), 1)
+        self._random = random.Random(seed)
+        self._lock = Lock()
+        self._groups: dict[tuple[str, int], list[LoopbackConnection]] = {}
+        self._addresses = count(1)
+        self._stats = {"sent": 0, "delivered": 0, "dropped": 0, "duplicated": 0, "reordered": 0, "overflowed": 0}
+
+    def connection(self, group: Optional[str] = None, port: Optional[int] = None) -> "LoopbackConnection":
+        """A new connection on this network, joined to group:port when both are given."""
+        connection = LoopbackConnection(self)
+        if group is not None and port is not None:
+            connection.setup_multicast(group, port)
+        return connection
+
+    def stats(self) -> dict[str, int]:
+        """Datagrams sent, copies delivered, dropped, duplicated, reordered and overflowed."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _next_address(self) -> tuple[str, int]:
+        return ("loopback", next(self._addresses))
+
+    def _join(self, connection: "LoopbackConnection", group: tuple[str, int]) -> None:
+        with self._lock:
+            members = self._groups.setdefault(group, [])
+            if connection not in members:
+                members.append(connection)
+
+    def _leave(self, connection: "LoopbackConnection", group: tuple[str, int]) -> None:
+        with self._lock:
+            members = self._groups.get(group)
+            if members and connection in members:
+                members.remove(connection)
+                if not members:
+                    del self._groups[group]
+
+    def _send(self, data: bytes, source: tuple[str, int], group: tuple[str, int]) -> None:
+        now = time.monotonic()
+        stats = self._stats
+        deliveries = []
+        with self._lock:
+            stats["sent"] += 1
+            members = self._groups.get(group)
+            if not members:
+                return
+            impaired = self.loss > 0 or self.duplicate > 0 or self.reorder > 0 or self.jitter_sec > 0
+            for member in members:
+                if not impaired:
+                    deliveries.append((member, now + self.latency_sec))
+                    continue
+                if self.loss > 0 and self._random.random() < self.loss:
+                    stats["dropped"] += 1
+                    continue
+                deliveries.append((member, now + self._delay()))
+                if self.duplicate > 0 and self._random.random() < self.duplicate:
+                    stats["duplicated"] += 1
+                    deliveries.append((member, now + self._delay()))
+        delivered = overflowed = 0
+        for member, due in deliveries:
+            if member._enqueue(data, source, due):
+                delivered += 1
+            else:
+                overflowed += 1
+        with self._lock:
+            stats["delivered"] += delivered
+            stats["overflowed"] += overflowed
+
+    def _delay(self) -> float:
+        delay = self.latency_sec
+        if self.jitter_sec > 0:
+            delay += self._random.uniform(0.0, self.jitter_sec)
+        if self.reorder > 0 and self._random.random() < self.reorder:
+            self._stats["reordered"] += 1
+            delay += self.reorder_delay_sec
+        return delay
+
+
+class LoopbackConnection:
+    """
+    A Transport on a LoopbackNetwork. It has no OS socket, so UDPPacketStream reads it
+    through recvfrom(timeout=...). Datagrams are addressed to the joined group, like
+    Connection, and received with the sender's ("loopback", n) address.
+    """
+
+    def __init__(self, network: LoopbackNetwork) -> None:
+        self.network = network
+        self.socket = None
+        self.sock = None
+        self.host: Optional[str] = None
+        self.port: Optional[int] = None
+        self.address = network._next_address()
+        self._group: Optional[tuple[str, int]] = None
+        self._ready = Condition(Lock())
+        self._inbox: list[tuple[float, int, bytes, tuple[str, int]]] = []
+        self._seq = count()
+
+    def queued(self) -> int:
+        """Datagrams waiting to be read, including ones whose delivery time has not come."""
+        return len(self._inbox)
+
+    def setup_multicast(self, group: str, port: int, bind_mode: Optional[str] = None) -> None:
+        """Join group:port on the network, leaving any previously joined group."""
+        target = (group, int(port))
+        if self._group is not None and self._group != target:
+            self.network._leave(self, self._group)
+        self.host, self.port = target
+        self._group = target
+        self.network._join(self, target)
+
+    def close(self) -> None:
+        """Leave the network and discard queued datagrams."""
+        if self._group is not None:
+            self.network._leave(self, self._group)
+            self._group = None
+        with self._ready:
+            self._inbox.clear()
+            self._ready.notify_all()
+
+    def sendto(self, data: bytes, addr) -> None:
+        self.network._send(bytes(data), self.address, (addr[0], int(addr[1])))
+
+    def _enqueue(self, data: bytes, source: tuple[str, int], due: float) -> bool:
+        with self._ready:
+            if len(self._inbox) >= self.network.max_queued:
+                return False
+            heapq.heappush(self._inbox, (due, next(self._seq), data, source))
+            self._ready.notify()
+        return True
+
+    def recvfrom(self, bufsize: int = 4096, timeout: Optional[float] = None) -> tuple[bytes, tuple[str, int]]:
+        """
+        The next datagram whose delivery time has come, truncated to bufsize. Blocks until
+        there is one; raises TimeoutError after timeout seconds (0 polls). A connection that
+        is closed or has not joined a group receives nothing, so it only waits out the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + max(float(timeout), 0.0)
+        inbox = self._inbox
+        with self._ready:
+            while True:
+                if self._group is None and deadline is None:
+                    raise RuntimeError("Loopback connection has not joined a group.")
+                now = time.monotonic()
+                wait = None
+                if inbox and self._group is not None:
+                    if inbox[0][0] <= now:
+                        _, _, data, source = heapq.heappop(inbox)
+                        return data[:bufsize], source
+                    wait = inbox[0][0] - now
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError("No datagram received within the timeout.")
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._ready.wait(wait)
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Mapping, Optional
+
+from google.protobuf.message import Message
+
+
+class MessageBuilder:
+    """
+    Builds one protobuf message type from keyword arguments. The set of accepted field names
+    is computed once from the descriptor; unknown names and None values are ignored.
+    """
+
+    __slots__ = ("message_type", "fields")
+
+    def __init__(self, message_type: type[Message], exclude: Iterable[str] = ()) -> None:
+        self.message_type = message_type
+        self.fields = frozenset(message_type.DESCRIPTOR.fields_by_name).difference(exclude)
+
+    def values(self, kwargs: Mapping[str, Any]) -> dict[str, Any]:
+        """The items of kwargs that name a field of message_type and are not None."""
+        fields = self.fields
+        return {k: v for k, v in kwargs.items() if v is not None and k in fields}
+
+    def build(self, kwargs: Mapping[str, Any], defaults: Optional[Mapping[str, Any]] = None) -> Message:
+        """A new message from defaults overridden by the matching items of kwargs."""
+        values = self.values(kwargs)
+        if defaults:
+            values = {**defaults, **values}
+        return self.message_type(**values)
+
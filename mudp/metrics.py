@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import os
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from mudp.dedupe import DedupeCache
+from mudp.log import logger
+from mudp.reliability import RTT_BUCKETS_SEC, PendingAckRegistry
+from mudp.rx_stats import BUCKET_BOUNDS_NS
+
+if TYPE_CHECKING:
+    from mudp.context import MeshContext
+    from mudp.rx_message_handler import UDPPacketStream
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_METRICS_PORT = 9464
+
+Labels = dict[str, str]
+Sample = tuple[str, Labels, Union[int, float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: Union[int, float]) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_le(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+class _Family:
+    """One metric family: its metadata and samples, rendered in either text format."""
+
+    def __init__(self, name: str, kind: str, help_text: str) -> None:
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.samples: list[Sample] = []
+
+    def add(self, value: Union[int, float], labels: Labels, suffix: str = "") -> None:
+        self.samples.append((suffix, labels, value))
+
+    def add_histogram(self, labels: Labels, bounds: Any, counts: list[int], total: float) -> None:
+        """Add one histogram series; counts are per bucket, the last one above every bound."""
+        cumulative = 0
+        for bound, bucket in zip(list(bounds) + [math.inf], counts):
+            cumulative += bucket
+            self.add(cumulative, {**labels, "le": _format_le(bound)}, "_bucket")
+        self.add(cumulative, labels, "_count")
+        self.add(total, labels, "_sum")
+
+    def render(self, openmetrics: bool) -> list[str]:
+        # Prometheus 0.0.4 names a counter family after its _total sample, OpenMetrics without it.
+        family = self.name + "_total" if self.kind == "counter" and not openmetrics else self.name
+        lines = [f"# HELP {family} {self.help}", f"# TYPE {family} {self.kind}"]
+        for suffix, labels, value in self.samples:
+            if self.kind == "counter":
+                suffix = "_total"
+            label_text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+            label_text = "{" + label_text + "}" if label_text else ""
+            lines.append(f"{self.name}{suffix}{label_text} {_format_value(value)}")
+        return lines
+
+
+class MetricsExporter:
+    """
+    Prometheus/OpenMetrics text exposition of mudp's metrics, either served over HTTP
+    (serve()) or written to a file for node_exporter's textfile collector (write_textfile()).
+
+    Register what to export with add_stream(), add_context(), add_dedupe() or add_registry();
+    a stream brings its dedupe cache and pending-ACK registry along. Each source is labelled
+    with name=. RX counters and stage latencies need a stream created with instrument=True.
+
+    Nothing here touches the packet path: RX stats live in per-thread shards that are merged
+    when scraped, and dedupe and registry counters are updated under the locks those objects
+    already take.
+    """
+
+    def __init__(self, namespace: str = "mudp") -> None:
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._streams: list[tuple[str, UDPPacketStream]] = []
+        self._dedupes: list[tuple[str, DedupeCache]] = []
+        self._registries: list[tuple[str, PendingAckRegistry]] = []
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._server_thread: Optional[threading.Thread] = None
+        self._textfile_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _add_source(sources: list, name: str, source: Any) -> None:
+        if any(existing is source for _, existing in sources):
+            return
+        if any(existing_name == name for existing_name, _ in sources):
+            raise ValueError(f"metrics source name {name!r} is already in use")
+        sources.append((name, source))
+
+    def add_stream(self, stream: UDPPacketStream, name: str = "default") -> None:
+        with self._lock:
+            self._add_source(self._streams, name, stream)
+        self.add_dedupe(stream.dedupe, name)
+        self.add_registry(stream.pending_acks, name)
+
+    def add_context(self, context: MeshContext, name: str = "default") -> None:
+        if context.dedupe is not None:
+            self.add_dedupe(context.dedupe, name)
+        self.add_registry(context.pending_acks, name)
+
+    def add_dedupe(self, cache: DedupeCache, name: str = "default") -> None:
+        with self._lock:
+            self._add_source(self._dedupes, name, cache)
+
+    def add_registry(self, registry: PendingAckRegistry, name: str = "default") -> None:
+        with self._lock:
+            self._add_source(self._registries, name, registry)
+
+    def collect(self) -> list[_Family]:
+        with self._lock:
+            streams = list(self._streams)
+            dedupes = list(self._dedupes)
+            registries = list(self._registries)
+        prefix = self.namespace + "_" if self.namespace else ""
+
+        def family(name: str, kind: str, help_text: str) -> _Family:
+            return _Family(prefix + name, kind, help_text)
+
+        rx_packets = family("rx_packets", "counter", "Datagrams received.")
+        rx_errors = family("rx_decode_errors", "counter", "Datagrams that failed to parse or decode.")
+        rx_duplicates = family("rx_duplicates", "counter", "Packets dropped as duplicates.")
+        rx_unique = family("rx_unique_packets", "counter", "Unique packets published, by port.")
+        rx_stages = family("rx_stage_seconds", "histogram", "Time spent in each receive stage.")
+        bounds_sec = [bound / 1e9 for bound in BUCKET_BOUNDS_NS]
+        for name, stream in streams:
+            snapshot = stream.stats_snapshot()
+            if snapshot is None:
+                continue
+            labels = {"name": name}
+            rx_packets.add(snapshot.received, labels)
+            rx_errors.add(snapshot.decode_errors, labels)
+            rx_duplicates.add(snapshot.duplicates, labels)
+            for port, count in sorted(snapshot.ports.items()):
+                rx_unique.add(count, {**labels, "port": port})
+            for stage, histogram in snapshot.stages.items():
+                rx_stages.add_histogram({**labels, "stage": stage}, bounds_sec, histogram.buckets, histogram.total_ns / 1e9)
+
+        dedupe_entries = family("dedupe_entries", "gauge", "Keys held by the dedupe cache.")
+        dedupe_lookups = family("dedupe_lookups", "counter", "Dedupe cache lookups, by result.")
+        dedupe_ratio = family("dedupe_hit_ratio", "gauge", "Share of dedupe lookups that found a duplicate.")
+        for name, cache in dedupes:
+            labels = {"name": name}
+            hits, misses = cache.hits, cache.misses
+            dedupe_entries.add(len(cache), labels)
+            dedupe_lookups.add(hits, {**labels, "result": "hit"})
+            dedupe_lookups.add(misses, {**labels, "result": "miss"})
+            dedupe_ratio.add(hits / (hits + misses) if hits + misses else 0.0, labels)
+
+        pending = family("pending_acks", "gauge", "Packets waiting for an ACK.")
+        retransmits = family("retransmits", "counter", "Retransmissions of unacknowledged packets.")
+        failures = family("max_retransmit_failures", "counter", "Packets given up on after the last retry.")
+        rtt = family("ack_rtt_seconds", "histogram", "Round-trip time of ACKed first transmissions.")
+        for name, registry in registries:
+            labels = {"name": name}
+            stats = registry.stats()
+            pending.add(stats.pending, labels)
+            retransmits.add(stats.retransmits, labels)
+            failures.add(stats.failures, labels)
+            rtt.add_histogram(labels, RTT_BUCKETS_SEC, stats.rtt_buckets, stats.rtt_sum_sec)
+
+        return [
+            rx_packets,
+            rx_errors,
+            rx_duplicates,
+            rx_unique,
+            rx_stages,
+            dedupe_entries,
+            dedupe_lookups,
+            dedupe_ratio,
+            pending,
+            retransmits,
+            failures,
+            rtt,
+        ]
+
+    def render(self, openmetrics: bool = True) -> str:
+        """The current metrics as OpenMetrics text, or Prometheus 0.0.4 text if openmetrics=False."""
+        lines: list[str] = []
+        for metric in self.collect():
+            if metric.samples:
+                lines.extend(metric.render(openmetrics))
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str, openmetrics: bool = False) -> None:
+        """
+        Write the metrics to path atomically (temp file and rename), in the Prometheus text
+        format node_exporter's textfile collector reads unless openmetrics=True.
+        """
+        text = self.render(openmetrics)
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".mudp-metrics-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                handle.write(text)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def start_textfile(self, path: str, interval_sec: float = 15.0) -> None:
+        """Rewrite path every interval_sec on a background thread until stop()."""
+        self._stop.clear()
+        self.write_textfile(path)
+        self._textfile_thread = threading.Thread(
+            target=self._textfile_loop, args=(path, float(interval_sec)), name="mudp-metrics-textfile", daemon=True
+        )
+        self._textfile_thread.start()
+
+    def _textfile_loop(self, path: str, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.write_textfile(path)
+            except OSError as e:
+                logger.warning("Could not write metrics to %s: %s", path, e)
+
+    def serve(self, host: str = "127.0.0.1", port: int = DEFAULT_METRICS_PORT) -> tuple[str, int]:
+        """
+        Serve the metrics over HTTP on a background thread until stop(). OpenMetrics is sent to
+        scrapers that accept it, Prometheus text otherwise. Returns the bound address (pass
+        port=0 for any free port).
+        """
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+                body = exporter.render(openmetrics).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug("metrics: " + format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._server_thread = threading.Thread(target=self._server.serve_forever, name="mudp-metrics", daemon=True)
+        self._server_thread.start()
+        return self._server.server_address[:2]
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._server_thread is not None:
+            self._server_thread.join(timeout=2.0)
+            self._server_thread = None
+        if self._textfile_thread is not None:
+            self._textfile_thread.join(timeout=2.0)
+            self._textfile_thread = None
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import random
+from threading import Lock, local
+import time
+
+DEFAULT_REUSE_WINDOW_SEC = 60.0
+COUNTER_BITS = 10
+PREFIX_DRAW_ATTEMPTS = 64
+
+
+class _Block:
+    __slots__ = ("base", "next", "end", "expires")
+
+    def __init__(self, prefix: int, counter_bits: int, expires: float) -> None:
+        self.base = prefix << counter_bits
+        self.next = 0
+        self.end = 1 << counter_bits
+        self.expires = expires
+
+
+class PacketIdAllocator:
+    """
+    Hands out 32-bit packet ids that are unique for at least reuse_window_sec, from any
+    number of threads.
+
+    Like the firmware, an id is a random prefix in the upper bits and a counter in the lower
+    counter_bits. Each thread takes a whole block (one prefix, 2**counter_bits ids) at a time
+    and counts through it without locking; the shared lock and the random draw are only hit
+    once per block. A block is retired once it is used up or reuse_window_sec after it was
+    handed out, and its prefix is not drawn again until every id from it is older than
+    reuse_window_sec, so no id repeats within a listener's dedupe TTL as long as
+    reuse_window_sec is at least that long. Ids from separate processes are only kept
+    apart by their random prefixes.
+    """
+
+    def __init__(self, reuse_window_sec: float = DEFAULT_REUSE_WINDOW_SEC, counter_bits: int = COUNTER_BITS) -> None:
+        if not 0 < counter_bits < 32:
+            raise ValueError(f"counter_bits must be between 1 and 31, got {counter_bits!r}")
+        self.reuse_window_sec = max(float(reuse_window_sec), 0.0)
+        self.counter_bits = counter_bits
+        self._prefix_bits = 32 - counter_bits
+        self._lock = Lock()
+        self._local = local()
+        self._random = random.Random()
+        # prefix -> monotonic time it may be handed out again, oldest first
+        self._retired: OrderedDict[int, float] = OrderedDict()
+
+    def next_id(self) -> int:
+        block = getattr(self._local, "block", None)
+        if block is None or block.next >= block.end or time.monotonic() >= block.expires:
+            block = self._local.block = self._new_block()
+        packet_id = block.base | block.next
+        block.next += 1
+        return packet_id
+
+    def _new_block(self) -> _Block:
+        with self._lock:
+            now = time.monotonic()
+            retired = self._retired
+            while retired:
+                prefix, reusable_at = next(iter(retired.items()))
+                if reusable_at > now:
+                    break
+                del retired[prefix]
+            for _ in range(PREFIX_DRAW_ATTEMPTS):
+                # Prefix 0 would make id 0, which means "no id" on the mesh.
+                prefix = self._random.randrange(1, 1 << self._prefix_bits)
+                if prefix not in retired:
+                    break
+            else:
+                raise RuntimeError("No free packet id prefix; lower the send rate or reuse_window_sec")
+            # Ids from this block are issued until expires and must not repeat for a further window.
+            expires = now + self.reuse_window_sec
+            retired[prefix] = expires + self.reuse_window_sec
+        return _Block(prefix, self.counter_bits, expires)
+
+    def reserved_prefixes(self) -> int:
+        """How many prefixes are currently blocked from reuse (in use or cooling down)."""
+        with self._lock:
+            return len(self._retired)
+
+
+packet_ids = PacketIdAllocator()
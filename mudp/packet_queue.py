@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from threading import Condition
+from typing import Any
+
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+BLOCK = "block"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+@dataclass
+class QueueStats:
+    depth: int
+    max_size: int
+    high_water: int
+    enqueued: int
+    dequeued: int
+    dropped: int
+    blocked: int
+    policy: str
+
+
+class BoundedPacketQueue:
+    """
+    FIFO handoff between the socket-draining thread and the processing worker(s).
+
+    When full, DROP_OLDEST evicts the oldest queued item to make room, DROP_NEWEST
+    discards the incoming item, and BLOCK makes put() wait for space (which pushes
+    back onto the kernel socket buffer instead). Every drop is counted.
+    """
+
+    def __init__(self, max_size: int = 1024, policy: str = DROP_OLDEST) -> None:
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"policy must be one of {OVERFLOW_POLICIES}, got {policy!r}")
+        self.max_size = max(int(max_size), 1)
+        self.policy = policy
+        self._items: deque[Any] = deque()
+        self._cond = Condition()
+        self._closed = False
+        self._high_water = 0
+        self._enqueued = 0
+        self._dequeued = 0
+        self._dropped = 0
+        self._blocked = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item: Any) -> bool:
+        """Queue item, returning False if it (or nothing, once closed) was dropped."""
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._items) >= self.max_size:
+                if self.policy == DROP_NEWEST:
+                    self._dropped += 1
+                    return False
+                if self.policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self._dropped += 1
+                else:
+                    self._blocked += 1
+                    while len(self._items) >= self.max_size and not self._closed:
+                        self._cond.wait(0.2)
+                    if self._closed:
+                        return False
+
+            self._items.append(item)
+            self._enqueued += 1
+            if len(self._items) > self._high_water:
+                self._high_water = len(self._items)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: float | None = None) -> Any | None:
+        """Return the next item, or None once the queue is closed and empty or on timeout."""
+        with self._cond:
+            while not self._items:
+                if self._closed:
+                    return None
+                if not self._cond.wait(timeout) and timeout is not None:
+                    return None
+            item = self._items.popleft()
+            self._dequeued += 1
+            self._cond.notify_all()
+            return item
+
+    def close(self) -> None:
+        """Wake every waiter; get() drains what is left, then returns None."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def clear(self) -> None:
+        with self._cond:
+            self._items.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> QueueStats:
+        with self._cond:
+            return QueueStats(
+                depth=len(self._items),
+                max_size=self.max_size,
+                high_water=self._high_water,
+                enqueued=self._enqueued,
+                dequeued=self._dequeued,
+                dropped=self._dropped,
+                blocked=self._blocked,
+                policy=self.policy,
+            )
@@ -1,21 +1,41 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from threading import Event, Lock, Thread
+import asyncio
+from bisect import bisect_left
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+import heapq
+from itertools import count
+from threading import Condition, Lock, Thread
 import time
+from typing import TYPE_CHECKING, Any, Callable
 
 from meshtastic import BROADCAST_NUM, mesh_pb2, portnums_pb2
+from mudp.airtime import UDP_AIRTIME_PER_BYTE_MSEC, UDP_MIN_PACKET_AIRTIME_MSEC, packet_airtime_msec
+from mudp.connection import Transport
 from mudp.singleton import conn, node
+from mudp.tx_scheduler import packet_priority, scheduled_sendto
 from pubsub import pub
 
+if TYPE_CHECKING:
+    from mudp.context import MeshContext
+
 NUM_RELIABLE_RETX = 3
-RETRY_POLL_INTERVAL_SEC = 0.05
 UDP_SLOT_TIME_MSEC = 40
 UDP_PROCESSING_TIME_MSEC = 500
 UDP_CWMIN = 3
 UDP_CWMAX = 8
-UDP_MIN_PACKET_AIRTIME_MSEC = 80
-UDP_AIRTIME_PER_BYTE_MSEC = 8
+RTO_ALPHA = 0.125
+RTO_BETA = 0.25
+RTO_K = 4
+RTO_MIN_SEC = 0.25
+RTO_MAX_SEC = 60.0
+RTO_BACKOFF = 2.0
+RETRY_PRIORITY = mesh_pb2.MeshPacket.Priority.RELIABLE
+# Deprecated: retries are scheduled on a timer heap and nothing polls anymore. Kept so imports keep working.
+RETRY_POLL_INTERVAL_SEC = 0.05
+# Upper bounds of the ACK round-trip histogram buckets; a last bucket counts slower ACKs.
+RTT_BUCKETS_SEC = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
 
 
 def parse_node_id(node_id: str | int) -> int:
@@ -51,12 +71,13 @@ def compute_reply_hop_limit(packet: mesh_pb2.MeshPacket, default_hop_limit: int
     return configured
 
 
-def should_ack_with_want_ack(packet: mesh_pb2.MeshPacket) -> bool:
+def should_ack_with_want_ack(packet: mesh_pb2.MeshPacket, context: MeshContext | None = None) -> bool:
+    local_node = node if context is None else context.node
     return bool(
         getattr(packet, "want_ack", False)
         and is_direct_message(packet)
         and is_text_message(packet)
-        and int(getattr(packet, "to", BROADCAST_NUM)) == parse_node_id(node.node_id)
+        and int(getattr(packet, "to", BROADCAST_NUM)) == parse_node_id(local_node.node_id)
     )
 
 
@@ -89,7 +110,11 @@ def parse_routing(packet: mesh_pb2.MeshPacket) -> mesh_pb2.Routing | None:
 
 
 def is_ack(packet: mesh_pb2.MeshPacket) -> bool:
-    routing = parse_routing(packet)
+    return routing_is_ack(packet, parse_routing(packet))
+
+
+def routing_is_ack(packet: mesh_pb2.MeshPacket, routing: mesh_pb2.Routing | None) -> bool:
+    """is_ack() for a Routing payload the caller has already parsed."""
     if routing is None or not packet.HasField("decoded") or not packet.decoded.request_id:
         return False
 
@@ -105,7 +130,11 @@ def is_ack(packet: mesh_pb2.MeshPacket) -> bool:
 
 
 def is_nak(packet: mesh_pb2.MeshPacket) -> bool:
-    routing = parse_routing(packet)
+    return routing_is_nak(packet, parse_routing(packet))
+
+
+def routing_is_nak(packet: mesh_pb2.MeshPacket, routing: mesh_pb2.Routing | None) -> bool:
+    """is_nak() for a Routing payload the caller has already parsed."""
     if routing is None or not packet.HasField("decoded") or not packet.decoded.request_id:
         return False
     return bool(
@@ -114,7 +143,7 @@ def is_nak(packet: mesh_pb2.MeshPacket) -> bool:
 
 
 def compute_retransmission_delay_msec(raw_size: int) -> int:
-    packet_airtime = max(UDP_MIN_PACKET_AIRTIME_MSEC, int(raw_size) * UDP_AIRTIME_PER_BYTE_MSEC)
+    packet_airtime = packet_airtime_msec(raw_size)
     contention = (
         (2 ** UDP_CWMIN)
         + (2 * UDP_CWMAX)
@@ -132,27 +161,267 @@ class PendingAck:
     retries_left: int
     next_retry_monotonic: float
     addr: tuple[str, int]
+    sent_monotonic: float = 0.0
+    future: Future = field(default_factory=Future, repr=False, compare=False)
+
+    @property
+    def retries(self) -> int:
+        """Retransmissions sent so far."""
+        return NUM_RELIABLE_RETX - 1 - self.retries_left
+
+
+@dataclass
+class RttStats:
+    """Smoothed ACK round-trip time for one destination, kept as in RFC 6298."""
+
+    destination: int
+    srtt_sec: float
+    rttvar_sec: float
+    rto_sec: float
+    samples: int = 1
+    last_sample_sec: float = 0.0
+
+    def add_sample(self, rtt_sec: float) -> None:
+        self.rttvar_sec = (1 - RTO_BETA) * self.rttvar_sec + RTO_BETA * abs(self.srtt_sec - rtt_sec)
+        self.srtt_sec = (1 - RTO_ALPHA) * self.srtt_sec + RTO_ALPHA * rtt_sec
+        self.rto_sec = _clamp_rto(self.srtt_sec + RTO_K * self.rttvar_sec)
+        self.samples += 1
+        self.last_sample_sec = rtt_sec
+
+    @classmethod
+    def first_sample(cls, destination: int, rtt_sec: float) -> "RttStats":
+        return cls(
+            destination=destination,
+            srtt_sec=rtt_sec,
+            rttvar_sec=rtt_sec / 2,
+            rto_sec=_clamp_rto(rtt_sec + RTO_K * rtt_sec / 2),
+            last_sample_sec=rtt_sec,
+        )
+
+
+@dataclass
+class RegistryStats:
+    """
+    Pending count, lifetime retransmission and MAX_RETRANSMIT failure counts, and a histogram
+    of timed ACK round trips (rtt_buckets[i] counts RTTs up to RTT_BUCKETS_SEC[i], the last
+    entry the slower ones).
+    """
+
+    pending: int
+    retransmits: int
+    failures: int
+    rtt_buckets: list[int]
+    rtt_sum_sec: float
+    rtt_count: int
+
+
+def _clamp_rto(rto_sec: float) -> float:
+    return min(max(rto_sec, RTO_MIN_SEC), RTO_MAX_SEC)
+
+
+@dataclass
+class AckResult:
+    """Outcome of a tracked send: the ACK or NAK that answered it."""
+
+    packet_id: int
+    acked: bool
+    error_reason: int
+    retries: int
+    rtt_sec: float
+    packet: Any = None
+    routing: mesh_pb2.Routing | None = None
+
+
+class DeliveryError(Exception):
+    """Raised by an AckHandle when retransmits are exhausted without an ACK or NAK."""
+
+    def __init__(self, pending: PendingAck, error_reason: int = mesh_pb2.Routing.Error.MAX_RETRANSMIT) -> None:
+        super().__init__(f"No ACK for packet {pending.packet_id} after {pending.retries} retransmits")
+        self.pending = pending
+        self.error_reason = error_reason
+
+
+class AckHandle:
+    """
+    Handle for a reliable send, returned by the send functions when want_ack is set on a
+    direct packet. It resolves with an AckResult when an ACK or NAK arrives (check .acked)
+    and raises DeliveryError once retransmits run out. Block with result(timeout), or
+    await the handle from a coroutine.
+    """
+
+    __slots__ = ("pending", "_registry")
+
+    def __init__(self, pending: PendingAck, registry: "PendingAckRegistry") -> None:
+        self.pending = pending
+        self._registry = registry
+
+    @property
+    def packet_id(self) -> int:
+        return self.pending.packet_id
+
+    @property
+    def future(self) -> Future:
+        return self.pending.future
+
+    @property
+    def retries(self) -> int:
+        return self.pending.retries
+
+    @property
+    def rtt_sec(self) -> float | None:
+        """Seconds from the first transmission to the ACK/NAK, once one has arrived."""
+        if not self.future.done() or self.future.cancelled() or self.future.exception() is not None:
+            return None
+        return self.future.result().rtt_sec
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: float | None = None) -> AckResult:
+        return self.future.result(timeout)
+
+    def add_done_callback(self, callback: Callable[[Future], None]) -> None:
+        self.future.add_done_callback(callback)
+
+    def cancel(self) -> bool:
+        """Stop retransmitting and cancel the handle."""
+        self._registry.discard(self.pending)
+        return self.future.cancel()
+
+    def asyncio_future(self, loop: asyncio.AbstractEventLoop | None = None) -> asyncio.Future:
+        return asyncio.wrap_future(self.future, loop=loop)
+
+    def __await__(self):
+        return self.asyncio_future().__await__()
+
+    def __repr__(self) -> str:
+        return f"AckHandle(packet_id={self.packet_id}, retries={self.retries}, done={self.done()})"
 
 
 class PendingAckRegistry:
-    def __init__(self) -> None:
+    """
+    Outstanding want_ack packets, retransmitted from a single worker thread.
+
+    Retry deadlines live in a min-heap keyed on next_retry_monotonic. The worker sleeps
+    until the earliest deadline (or until an earlier one is added) and exits once nothing
+    is pending. Resolved entries are not removed from the heap. They are skipped when they
+    reach the top, and the heap is rebuilt when they outnumber the live entries.
+
+    Retry timeouts adapt to each destination. A destination starts on the size-based
+    compute_retransmission_delay_msec delay. After its first timed ACK it switches to a
+    TCP-style RTO (smoothed RTT plus 4x RTT variance), doubled on every retransmission.
+
+    Retransmissions go out on connection, or on the module-level conn when it is None.
+    """
+
+    def __init__(self, connection: Transport | None = None) -> None:
+        self.connection = connection
         self._lock = Lock()
+        self._wake = Condition(self._lock)
         self._pending: dict[int, PendingAck] = {}
-        self._wake = Event()
+        self._heap: list[tuple[float, int, PendingAck]] = []
+        self._seq = count()
         self._worker: Thread | None = None
+        self._rtt: dict[int, RttStats] = {}
+        self._retransmits = 0
+        self._failures = 0
+        self._rtt_buckets = [0] * (len(RTT_BUCKETS_SEC) + 1)
+        self._rtt_sum_sec = 0.0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _connection(self) -> Transport:
+        return self.connection if self.connection is not None else conn
 
     def _ensure_worker(self) -> None:
         with self._lock:
-            if self._worker and self._worker.is_alive():
+            if self._worker is not None or not self._pending:
                 return
             self._worker = Thread(target=self._run, name="mudp-retry-loop", daemon=True)
             self._worker.start()
 
     def _run(self) -> None:
         while True:
+            with self._lock:
+                deadline = self._next_deadline()
+                if deadline is None:
+                    self._worker = None
+                    return
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._wake.wait(delay)
+                    continue
             self.process_due()
-            self._wake.wait(RETRY_POLL_INTERVAL_SEC)
-            self._wake.clear()
+
+    def _is_live(self, deadline: float, pending: PendingAck) -> bool:
+        return self._pending.get(pending.packet_id) is pending and pending.next_retry_monotonic == deadline
+
+    def _schedule(self, pending: PendingAck) -> None:
+        entry = (pending.next_retry_monotonic, next(self._seq), pending)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wake.notify()
+
+    def _next_deadline(self) -> float | None:
+        heap = self._heap
+        while heap and not self._is_live(heap[0][0], heap[0][2]):
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def retry_delay_sec(self, destination: int, raw_size: int, attempt: int = 0) -> float:
+        """
+        Time to wait before retransmission number attempt + 1 to destination. Once an ACK
+        from destination has been timed, this is its RTO doubled per earlier attempt;
+        until then it is compute_retransmission_delay_msec(raw_size).
+        """
+        stats = self._rtt.get(int(destination))
+        if stats is None:
+            return compute_retransmission_delay_msec(raw_size) / 1000.0
+        return min(stats.rto_sec * (RTO_BACKOFF ** attempt), RTO_MAX_SEC)
+
+    def _record_rtt(self, destination: int, rtt_sec: float) -> None:
+        self._rtt_buckets[bisect_left(RTT_BUCKETS_SEC, rtt_sec)] += 1
+        self._rtt_sum_sec += rtt_sec
+        stats = self._rtt.get(destination)
+        if stats is None:
+            self._rtt[destination] = RttStats.first_sample(destination, rtt_sec)
+        else:
+            stats.add_sample(rtt_sec)
+
+    def rtt_stats(self, destination: int | str) -> RttStats | None:
+        """A copy of the RTT estimate for destination, or None before its first timed ACK."""
+        with self._lock:
+            stats = self._rtt.get(parse_node_id(destination))
+            return None if stats is None else RttStats(**vars(stats))
+
+    def all_rtt_stats(self) -> dict[int, RttStats]:
+        with self._lock:
+            return {destination: RttStats(**vars(stats)) for destination, stats in self._rtt.items()}
+
+    def stats(self) -> RegistryStats:
+        with self._lock:
+            return RegistryStats(
+                pending=len(self._pending),
+                retransmits=self._retransmits,
+                failures=self._failures,
+                rtt_buckets=list(self._rtt_buckets),
+                rtt_sum_sec=self._rtt_sum_sec,
+                rtt_count=sum(self._rtt_buckets),
+            )
+
+    def reset_rtt(self, destination: int | str | None = None) -> None:
+        """Forget RTT estimates (for one destination, or all), falling back to the cold-start delay."""
+        with self._lock:
+            if destination is None:
+                self._rtt.clear()
+            else:
+                self._rtt.pop(parse_node_id(destination), None)
+
+    def _compact(self) -> None:
+        if len(self._heap) > 2 * len(self._pending) + 64:
+            self._heap = [entry for entry in self._heap if self._is_live(entry[0], entry[2])]
+            heapq.heapify(self._heap)
 
     def track(
         self,
@@ -161,25 +430,89 @@ class PendingAckRegistry:
         created_at: float,
         raw_bytes: bytes,
         addr: tuple[str, int],
-    ) -> None:
+    ) -> AckHandle:
+        return self.start(self.new_pending(packet_id, destination, created_at, raw_bytes, addr))
+
+    def new_pending(
+        self,
+        packet_id: int,
+        destination: int,
+        created_at: float,
+        raw_bytes: bytes,
+        addr: tuple[str, int],
+    ) -> PendingAck:
+        """A PendingAck that is not tracked yet; start() it when the packet is transmitted."""
+        return PendingAck(
+            packet_id=int(packet_id),
+            destination=int(destination),
+            created_at=float(created_at),
+            raw_bytes=bytes(raw_bytes),
+            retries_left=NUM_RELIABLE_RETX - 1,
+            next_retry_monotonic=0.0,
+            addr=addr,
+        )
+
+    def start(self, pending: PendingAck) -> AckHandle:
+        """Begin the retry timer for pending, sent now."""
         now = time.monotonic()
-        delay_sec = compute_retransmission_delay_msec(len(raw_bytes)) / 1000.0
+        pending.sent_monotonic = now
+        pending.next_retry_monotonic = now + self.retry_delay_sec(pending.destination, len(pending.raw_bytes))
         with self._lock:
-            self._pending[int(packet_id)] = PendingAck(
-                packet_id=int(packet_id),
-                destination=int(destination),
-                created_at=float(created_at),
-                raw_bytes=bytes(raw_bytes),
-                retries_left=NUM_RELIABLE_RETX - 1,
-                next_retry_monotonic=now + delay_sec,
-                addr=addr,
-            )
+            replaced = self._pending.get(pending.packet_id)
+            self._pending[pending.packet_id] = pending
+            self._schedule(pending)
+        if replaced is not None and replaced is not pending:
+            replaced.future.cancel()
         self._ensure_worker()
-        self._wake.set()
+        return AckHandle(pending, self)
 
-    def resolve(self, request_id: int) -> PendingAck | None:
+    def resolve(
+        self,
+        request_id: int,
+        packet: Any = None,
+        routing: mesh_pb2.Routing | None = None,
+    ) -> PendingAck | None:
+        """Stop tracking request_id. With a routing reply, its AckHandle resolves to an AckResult."""
+        rtt_sec = 0.0
+        with self._lock:
+            pending = self._pending.pop(int(request_id), None)
+            self._compact()
+            if pending is not None and routing is not None:
+                rtt_sec = time.monotonic() - pending.sent_monotonic
+                # Karn's rule: a reply to a retransmitted packet can't be matched to one send.
+                if pending.retries == 0:
+                    self._record_rtt(pending.destination, rtt_sec)
+        if pending is None:
+            return None
+        if routing is None:
+            pending.future.cancel()
+            return pending
+        error_reason = int(routing.error_reason) if routing.WhichOneof("variant") == "error_reason" else 0
+        _settle(
+            pending.future,
+            result=AckResult(
+                packet_id=pending.packet_id,
+                acked=error_reason == mesh_pb2.Routing.Error.NONE,
+                error_reason=error_reason,
+                retries=pending.retries,
+                rtt_sec=rtt_sec,
+                packet=packet,
+                routing=routing,
+            ),
+        )
+        return pending
+
+    def discard(self, pending: PendingAck) -> None:
+        """Stop tracking pending, unless its packet id has since been reused by a newer send."""
         with self._lock:
-            return self._pending.pop(int(request_id), None)
+            if self._pending.get(pending.packet_id) is pending:
+                del self._pending[pending.packet_id]
+                self._compact()
+
+    def fail(self, pending: PendingAck, error: BaseException) -> None:
+        """Stop tracking pending and fail its handle with error, e.g. when its send failed."""
+        self.discard(pending)
+        _settle(pending.future, error=error)
 
     def get(self, request_id: int) -> PendingAck | None:
         with self._lock:
@@ -187,8 +520,12 @@ class PendingAckRegistry:
 
     def clear(self) -> None:
         with self._lock:
+            pending = list(self._pending.values())
             self._pending.clear()
-        self._wake.set()
+            self._heap.clear()
+            self._wake.notify()
+        for entry in pending:
+            entry.future.cancel()
 
     def process_due(self, now: float | None = None) -> None:
         check_time = time.monotonic() if now is None else float(now)
@@ -196,27 +533,33 @@ class PendingAckRegistry:
         failures: list[PendingAck] = []
 
         with self._lock:
-            for packet_id, pending in list(self._pending.items()):
-                if pending.next_retry_monotonic > check_time:
+            heap = self._heap
+            while heap and heap[0][0] <= check_time:
+                deadline, _, pending = heapq.heappop(heap)
+                if not self._is_live(deadline, pending):
                     continue
                 if pending.retries_left <= 0:
-                    self._pending.pop(packet_id, None)
+                    self._pending.pop(pending.packet_id, None)
                     failures.append(pending)
                     continue
                 pending.retries_left -= 1
-                pending.next_retry_monotonic = check_time + (
-                    compute_retransmission_delay_msec(len(pending.raw_bytes)) / 1000.0
+                pending.next_retry_monotonic = check_time + self.retry_delay_sec(
+                    pending.destination, len(pending.raw_bytes), pending.retries
                 )
+                self._schedule(pending)
                 retries.append(pending)
+            self._retransmits += len(retries)
+            self._failures += len(failures)
 
         for pending in retries:
             try:
-                conn.sendto(pending.raw_bytes, pending.addr)
+                scheduled_sendto(self._connection().sendto, RETRY_PRIORITY, blocking=False)(pending.raw_bytes, pending.addr)
                 pub.sendMessage("mesh.tx.retry", pending=pending)
             except Exception as error:
                 pub.sendMessage("mesh.tx.retry_error", pending=pending, error=error)
 
         for pending in failures:
+            _settle(pending.future, error=DeliveryError(pending))
             pub.sendMessage(
                 "mesh.tx.max_retransmit",
                 pending=pending,
@@ -224,23 +567,46 @@ class PendingAckRegistry:
             )
 
 
+def _settle(future: Future, *, result: Any = None, error: BaseException | None = None) -> None:
+    # The future may already be cancelled by its owner; that must not break the RX thread.
+    if not future.set_running_or_notify_cancel():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
 pending_acks = PendingAckRegistry()
 
 
-def register_pending_ack(packet: mesh_pb2.MeshPacket, raw_bytes: bytes) -> None:
+def ack_destination(packet: mesh_pb2.MeshPacket, connection: Transport | None = None) -> int | None:
+    """The destination whose ACK packet is tracked for, or None if it is not retried."""
     if not getattr(packet, "want_ack", False):
-        return
+        return None
     destination = int(getattr(packet, "to", BROADCAST_NUM))
     if destination == BROADCAST_NUM:
-        return
-    if not conn.host or not conn.port:
-        return
-    pending_acks.track(
+        return None
+    connection = conn if connection is None else connection
+    if not connection.host or not connection.port:
+        return None
+    return destination
+
+
+def register_pending_ack(
+    packet: mesh_pb2.MeshPacket, raw_bytes: bytes, context: MeshContext | None = None
+) -> AckHandle | None:
+    registry = pending_acks if context is None else context.pending_acks
+    connection = registry._connection()
+    destination = ack_destination(packet, connection)
+    if destination is None:
+        return None
+    return registry.track(
         packet_id=int(packet.id),
         destination=destination,
         created_at=time.time(),
         raw_bytes=raw_bytes,
-        addr=(str(conn.host), int(conn.port)),
+        addr=(str(connection.host), int(connection.port)),
     )
 
 
@@ -251,6 +617,7 @@ def send_ack(
     want_ack: bool | None = None,
     hop_limit: int | None = None,
     packet_id: int | None = None,
+    context: MeshContext | None = None,
 ) -> mesh_pb2.MeshPacket:
     from mudp.tx_message_handler import build_mesh_packet
 
@@ -263,16 +630,29 @@ def send_ack(
             error_reason=error_reason,
         ),
         to=int(getattr(request_packet, "from")),
-        want_ack=should_ack_with_want_ack(request_packet) if want_ack is None else bool(want_ack),
+        want_ack=should_ack_with_want_ack(request_packet, context) if want_ack is None else bool(want_ack),
         hop_limit=resolved_hop_limit,
         hop_start=resolved_hop_limit,
         packet_id=packet_id,
+        context=context,
     )
     packet.priority = mesh_pb2.MeshPacket.Priority.ACK
     return packet
 
 
-def publish_ack(packet: mesh_pb2.MeshPacket) -> None:
+def publish_ack(packet: mesh_pb2.MeshPacket, context: MeshContext | None = None) -> AckHandle | None:
+    # ACKs bypass the send window so a peer's ACK never waits behind our own unacked data.
+    connection = conn if context is None else context.connection
     raw_bytes = packet.SerializeToString()
-    register_pending_ack(packet, raw_bytes)
-    conn.sendto(raw_bytes, (conn.host, conn.port))
+    handle = register_pending_ack(packet, raw_bytes, context)
+    sendto = scheduled_sendto(
+        connection.sendto, packet_priority(packet), portnums_pb2.PortNum.ROUTING_APP, blocking=False
+    )
+    try:
+        sendto(raw_bytes, (connection.host, connection.port))
+    except Exception as error:
+        if handle is not None:
+            registry = pending_acks if context is None else context.pending_acks
+            registry.fail(handle.pending, error)
+        raise
+    return handle
@@ -1,49 +1,169 @@
-from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import time
 from typing import Optional
 
 import threading
 import select
+import socket
+from google.protobuf.internal import api_implementation
 from google.protobuf.message import DecodeError
 from pubsub import pub
 
-from meshtastic import protocols
 from meshtastic.protobuf import portnums_pb2, mesh_pb2
-from mudp.reliability import is_ack, is_nak, parse_routing, pending_acks
+from mudp.connection import Transport
+from mudp.context import MeshContext
+from mudp.dedupe import DEFAULT_DEDUPE_MAX_ENTRIES, DEFAULT_DEDUPE_TTL_SEC, DedupeCache
+from mudp.reliability import PendingAckRegistry, parse_routing, pending_acks, routing_is_ack, routing_is_nak
 from mudp.singleton import conn
 from mudp.encryption import decrypt_packet
-
-
-def _decode_and_optionally_parse(
-    raw: bytes, key: Optional[bytes] = None, *, parse_payload: bool = True
-) -> Optional[mesh_pb2.MeshPacket]:
+from mudp.keyring import ChannelKey, KeyRing
+from mudp.decoded_packet import DecodedPacket, flatten_payload_text, payload_protobuf_factory
+from mudp.batch_receiver import make_batch_receiver
+from mudp.packet_queue import DROP_OLDEST, OVERFLOW_POLICIES, BoundedPacketQueue, QueueStats
+from mudp.rx_stats import (
+    STAGE_DECRYPT,
+    STAGE_DEDUPE,
+    STAGE_DISPATCH,
+    STAGE_PARSE,
+    STAGE_PAYLOAD,
+    STAGE_RECV,
+    RxShard,
+    RxStats,
+    RxStatsSnapshot,
+)
+from mudp.wire import PacketHeader, peek_from, scan_header
+from mudp.dispatch import (
+    RX_ACK,
+    RX_DECODE_ERROR,
+    RX_DECODED,
+    RX_DUPLICATE,
+    RX_LISTENER_ERROR,
+    RX_NAK,
+    RX_PACKET,
+    RX_RAW,
+    RX_ROUTING,
+    RX_STATS,
+    RX_TEXT,
+    RX_UNIQUE_PACKET,
+    always_has_listeners,
+    dispatcher,
+    port_topic,
+)
+
+RECV_MODES = ("single", "batch")
+DECODE_EXECUTORS = ("thread", "process")
+DEFAULT_QUEUE_SIZE = 1024
+PAYLOAD_LAZY = "lazy"
+DUPLICATE_VIEWS = ("decoded", "header")
+
+# upb and the C++ backend parse a MeshPacket envelope faster than a Python wire scan,
+# so the header scanner only runs ahead of the parse on the pure-Python backend.
+_SCAN_BEFORE_PARSE = api_implementation.Type() == "python"
+# Extra topic kwargs when publish_channel is off; shared so the hot path allocates nothing.
+_NO_CHANNEL_KWARGS: dict = {}
+
+
+def _parse_envelope(raw: bytes) -> Optional[mesh_pb2.MeshPacket]:
     try:
         mp = mesh_pb2.MeshPacket()
         mp.ParseFromString(raw)
-
-        if mp.HasField("encrypted") and not mp.HasField("decoded"):
-            decoded = decrypt_packet(mp, key, silent=True)
-            if decoded is not None:
-                mp.decoded.CopyFrom(decoded)
-            # else: keep the encrypted packet as-is
-
-        if parse_payload and mp.HasField("decoded"):
-            portnum = mp.decoded.portnum
-            handler = protocols.get(portnum) if portnum is not None else None
-            if handler is not None and handler.protobufFactory is not None:
-                pb = handler.protobufFactory()
-                try:
-                    pb.ParseFromString(mp.decoded.payload)
-                    pb_str = str(pb).replace("\n", " ").replace("\r", " ").strip()
-                    mp.decoded.payload = pb_str.encode("utf-8")
-                except DecodeError:
-                    pass
-
         return mp
     except DecodeError:
         return None
 
 
+def _decode_payload(
+    mp: mesh_pb2.MeshPacket,
+    key: Optional[bytes] = None,
+    *,
+    parse_payload: bool = True,
+    keyring: Optional[KeyRing] = None,
+    shard: Optional[RxShard] = None,
+) -> Optional[ChannelKey]:
+    """
+    Decrypt and optionally parse mp in place, returning the key ring channel that matched.
+    With a stats shard, the decrypt and payload parse times are recorded in it.
+    """
+    channel = None
+    if mp.HasField("encrypted") and not mp.HasField("decoded"):
+        if shard is not None:
+            started = time.perf_counter_ns()
+        decoded = None
+        if keyring is not None:
+            match = keyring.decrypt(mp)
+            if match is not None:
+                decoded, channel = match
+        if decoded is None and key is not None:
+            decoded = decrypt_packet(mp, key, silent=True)
+        if decoded is not None:
+            mp.decoded.CopyFrom(decoded)
+        # else: keep the encrypted packet as-is
+        if shard is not None:
+            shard.lap(STAGE_DECRYPT, started)
+
+    if parse_payload and mp.HasField("decoded"):
+        factory = payload_protobuf_factory(mp.decoded.portnum)
+        if factory is not None:
+            if shard is not None:
+                started = time.perf_counter_ns()
+            pb = factory()
+            try:
+                pb.ParseFromString(mp.decoded.payload)
+                mp.decoded.payload = flatten_payload_text(pb).encode("utf-8")
+            except DecodeError:
+                pass
+            if shard is not None:
+                shard.lap(STAGE_PAYLOAD, started)
+
+    return channel
+
+
+def decode_and_optionally_parse(
+    raw: bytes,
+    key: Optional[bytes] = None,
+    *,
+    parse_payload: bool = True,
+    keyring: Optional[KeyRing] = None,
+) -> Optional[mesh_pb2.MeshPacket]:
+    """Parse and decrypt one datagram outside a stream, or None if it is not a MeshPacket."""
+    mp = _parse_envelope(raw)
+    if mp is None:
+        return None
+    _decode_payload(mp, key, parse_payload=parse_payload, keyring=keyring)
+    return mp
+
+
+# Older code imports the private name.
+_decode_and_optionally_parse = decode_and_optionally_parse
+
+
+_subprocess_keyrings: dict[tuple[tuple[str, str], ...], KeyRing] = {}
+
+
+def _decode_in_subprocess(
+    raw: bytes,
+    key,
+    channels: tuple[tuple[str, str], ...],
+    parse_payload: bool,
+) -> tuple[bytes, Optional[str]]:
+    """Process-pool entry point: decrypt and parse raw, returning the serialized result."""
+    keyring = None
+    if channels:
+        keyring = _subprocess_keyrings.get(channels)
+        if keyring is None:
+            keyring = _subprocess_keyrings[channels] = KeyRing(channels)
+    mp = _parse_envelope(raw)
+    channel = _decode_payload(mp, key, parse_payload=parse_payload, keyring=keyring)
+    return mp.SerializeToString(), channel.name if channel is not None else None
+
+
+def _process_pool_context():
+    # The pool starts its processes lazily, after the receive and shard threads exist.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
 class UDPPacketStream:
     """
     Background listener that publishes:
@@ -54,6 +174,49 @@ class UDPPacketStream:
       - 'mesh.rx.duplicate'(packet, addr)
       - 'mesh.rx.decoded'(packet, portnum, addr)  # unique packets only
       - 'mesh.rx.port.<portnum>'(packet, addr)  # per-port topic for unique packets only
+
+    Duplicates are classified from the (from, id) header before any decryption or payload
+    parsing. With duplicate_view="decoded" (default) duplicates are published as the wire
+    packet carrying a cached copy of the first copy's decoded payload; duplicate_view="header"
+    publishes a lightweight PacketHeader instead. publish_duplicate_packets=False keeps
+    duplicates off 'mesh.rx.packet' entirely.
+
+    Pass keyring=KeyRing([(channel_name, psk), ...]) to listen on several channels at once;
+    packets are only trial-decrypted with the keys whose channel hash matches, and
+    channel_for(packet) returns the channel that decrypted a packet while it is in the dedupe
+    cache. publish_channel=True also sends that channel's name (or None) as channel= on every
+    packet topic; every listener on those topics must then accept channel=None, as pubsub
+    refuses arguments a topic's listeners do not take.
+
+    parse_payload=True rewrites decoded.payload into a one-line text rendering of the port
+    protobuf (compatibility mode). parse_payload="lazy" leaves the wire payload untouched
+    and publishes DecodedPacket wrappers that parse the typed protobuf on first access.
+
+    With skip_unsubscribed_topics=True (default) a topic is only built and sent when it, or
+    one of its parent topics, has a listener. ACK/NAK resolution of pending_acks still runs
+    for every unique routing packet.
+
+    queue_size > 0 moves decode, dedupe and every subscriber callback onto a separate
+    processing thread, fed through a bounded queue whose overflow_policy is "drop-oldest",
+    "drop-newest" or "block"; queue_stats() reports depth, drops and the high-water mark.
+    rcvbuf raises SO_RCVBUF on the multicast socket so bursts are absorbed by the kernel.
+
+    decode_workers=N shards processing across N worker threads by the sender's node number,
+    so packets from one node are still published in arrival order. With
+    decode_executor="process" each shard offloads decryption and payload parsing to a
+    process pool (started with forkserver, or spawn where that is unavailable, since forking
+    a process that already runs threads can deadlock); "thread" (default) decodes on the
+    shard thread itself, which scales on free-threaded builds.
+
+    recv_mode="batch" drains every ready datagram per wakeup using recvmmsg (Linux) or a
+    recv_into ring buffer, and hands each datagram to the pipeline as a memoryview slice
+    (mesh.rx.raw listeners still get bytes they can keep).
+
+    instrument=True keeps per-thread counters (received, decode errors, duplicates, unique,
+    per port) and latency histograms for the recv, parse, dedupe, decrypt, payload and
+    dispatch stages; stats_snapshot() merges them. stats_interval_sec also publishes a
+    snapshot on mesh.rx.stats at that interval (and implies instrument). Without either
+    the pipeline only pays a few None checks per packet.
     """
 
     def __init__(
@@ -62,32 +225,106 @@ class UDPPacketStream:
         mcast_port: int,
         key: Optional[bytes] = None,
         recv_buf: int = 65535,
-        parse_payload: bool = True,
+        parse_payload: bool | str = True,
         select_timeout: float = 0.2,
-        dedupe_ttl_sec: float = 60.0,
-        dedupe_max_entries: int = 4096,
+        dedupe_ttl_sec: Optional[float] = None,
+        dedupe_max_entries: Optional[int] = None,
+        recv_mode: str = "single",
+        recv_batch_size: int = 32,
+        duplicate_view: str = "decoded",
+        publish_duplicate_packets: bool = True,
+        keyring: Optional[KeyRing] = None,
+        skip_unsubscribed_topics: bool = True,
+        queue_size: int = 0,
+        overflow_policy: str = DROP_OLDEST,
+        rcvbuf: Optional[int] = None,
+        decode_workers: int = 0,
+        decode_executor: str = "thread",
+        context: Optional[MeshContext] = None,
+        instrument: bool = False,
+        stats_interval_sec: Optional[float] = None,
+        publish_channel: bool = False,
     ) -> None:
+        if recv_mode not in RECV_MODES:
+            raise ValueError(f"recv_mode must be one of {RECV_MODES}, got {recv_mode!r}")
+        if parse_payload not in (True, False, PAYLOAD_LAZY):
+            raise ValueError(f"parse_payload must be True, False or {PAYLOAD_LAZY!r}, got {parse_payload!r}")
+        if duplicate_view not in DUPLICATE_VIEWS:
+            raise ValueError(f"duplicate_view must be one of {DUPLICATE_VIEWS}, got {duplicate_view!r}")
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}, got {overflow_policy!r}")
+        if decode_executor not in DECODE_EXECUTORS:
+            raise ValueError(f"decode_executor must be one of {DECODE_EXECUTORS}, got {decode_executor!r}")
+
         self.mcast_grp = mcast_grp
         self.mcast_port = mcast_port
         self.key = key
+        self.keyring = keyring
         self.recv_buf = recv_buf
         self.parse_payload = parse_payload
+        self._lazy_payload = parse_payload == PAYLOAD_LAZY
+        self._eager_payload = parse_payload is True
         self.select_timeout = select_timeout
-        self.dedupe_ttl_sec = max(float(dedupe_ttl_sec), 0.0)
-        self.dedupe_max_entries = max(int(dedupe_max_entries), 1)
+        self.context = context
+        if context is not None and context.dedupe is not None:
+            if dedupe_ttl_sec is not None or dedupe_max_entries is not None:
+                raise ValueError("dedupe_ttl_sec and dedupe_max_entries cannot be combined with a context's dedupe cache")
+            self.dedupe = context.dedupe
+        else:
+            self.dedupe = DedupeCache(
+                DEFAULT_DEDUPE_TTL_SEC if dedupe_ttl_sec is None else dedupe_ttl_sec,
+                DEFAULT_DEDUPE_MAX_ENTRIES if dedupe_max_entries is None else dedupe_max_entries,
+            )
+        self.recv_mode = recv_mode
+        self.recv_batch_size = max(int(recv_batch_size), 1)
+        self.duplicate_view = duplicate_view
+        self.publish_duplicate_packets = bool(publish_duplicate_packets)
+        self.skip_unsubscribed_topics = bool(skip_unsubscribed_topics)
+        self._has_listeners = dispatcher.has_listeners if self.skip_unsubscribed_topics else always_has_listeners
+        self.publish_channel = bool(publish_channel)
+        self.queue_size = max(int(queue_size), 0)
+        self.overflow_policy = overflow_policy
+        self.rcvbuf = rcvbuf
+        self.decode_workers = max(int(decode_workers), 0)
+        self.decode_executor = decode_executor
+        self.stats_interval_sec = stats_interval_sec
+        self._stats = RxStats() if instrument or stats_interval_sec else None
 
         self._stop = threading.Event()
         self._thread: Optional[threading.Thread] = None
+        self._stats_thread: Optional[threading.Thread] = None
+        self._workers: list[threading.Thread] = []
+        self._queues: list[BoundedPacketQueue] = []
+        self._process_pool: Optional[ProcessPoolExecutor] = None
         self._sock = None
-        self._seen_packets: OrderedDict[tuple[int, int], float] = OrderedDict()
+        self._receiver = None
+
+    @property
+    def dedupe_ttl_sec(self) -> float:
+        return self.dedupe.ttl_sec
+
+    @property
+    def dedupe_max_entries(self) -> int:
+        return self.dedupe.max_entries
+
+    @property
+    def connection(self) -> Transport:
+        return self.context.connection if self.context is not None else conn
+
+    @property
+    def pending_acks(self) -> PendingAckRegistry:
+        return self.context.pending_acks if self.context is not None else pending_acks
 
     def start(self) -> None:
         if self._thread and self._thread.is_alive():
             return
-        conn.setup_multicast(self.mcast_grp, self.mcast_port)
+        connection = self.connection
+        # A context's connection may already be open and shared with other streams or senders.
+        if self.context is None or connection.socket is None:
+            connection.setup_multicast(self.mcast_grp, self.mcast_port)
 
         # Try to grab underlying socket and make it non-blocking
-        self._sock = getattr(conn, "sock", None) or getattr(conn, "socket", None)
+        self._sock = getattr(connection, "sock", None) or getattr(connection, "socket", None)
         if self._sock is not None:
             try:
                 self._sock.setblocking(False)
@@ -96,15 +333,122 @@ class UDPPacketStream:
                     self._sock.settimeout(0.0)
                 except Exception:
                     pass
+            if self.rcvbuf:
+                self._set_rcvbuf(int(self.rcvbuf))
+
+        self._receiver = None
+        if self.recv_mode == "batch" and self._sock is not None:
+            self._receiver = make_batch_receiver(self._sock, batch_size=self.recv_batch_size, bufsize=self.recv_buf)
 
         self._stop.clear()
+        self._start_workers()
         self._thread = threading.Thread(target=self._run, name="UDPPacketStream", daemon=True)
         self._thread.start()
+        if self._stats is not None and self.stats_interval_sec:
+            self._stats_thread = threading.Thread(target=self._publish_stats_loop, name="UDPPacketStream-stats", daemon=True)
+            self._stats_thread.start()
 
     def stop(self, join: bool = True) -> None:
         self._stop.set()
+        for queue in self._queues:
+            queue.close()
         if join and self._thread and self._thread.is_alive():
             self._thread.join(timeout=2.0)
+        if join and self._stats_thread and self._stats_thread.is_alive():
+            self._stats_thread.join(timeout=2.0)
+        self._stop_workers(join)
+
+    def stats_snapshot(self) -> Optional[RxStatsSnapshot]:
+        """Counters and stage latency merged across threads, or None when not instrumented."""
+        if self._stats is None:
+            return None
+        return self._stats.snapshot()
+
+    def _publish_stats_loop(self) -> None:
+        interval = float(self.stats_interval_sec)
+        while not self._stop.wait(interval):
+            try:
+                pub.sendMessage(RX_STATS, stats=self._stats.snapshot())
+            except Exception as e:
+                pub.sendMessage(RX_LISTENER_ERROR, error=e)
+
+    def _start_workers(self) -> None:
+        shards = self.decode_workers or (1 if self.queue_size else 0)
+        if not shards:
+            return
+        queue_size = self.queue_size or DEFAULT_QUEUE_SIZE
+        self._queues = [BoundedPacketQueue(queue_size, self.overflow_policy) for _ in range(shards)]
+        if self.decode_executor == "process":
+            self._process_pool = ProcessPoolExecutor(max_workers=shards, mp_context=_process_pool_context())
+        self._workers = []
+        for index, queue in enumerate(self._queues):
+            worker = threading.Thread(
+                target=self._process_queue,
+                args=(queue,),
+                name=f"UDPPacketStream-worker-{index}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _stop_workers(self, join: bool = True) -> None:
+        for queue in self._queues:
+            queue.close()
+        if join:
+            for worker in self._workers:
+                if worker.is_alive():
+                    worker.join(timeout=2.0)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=join, cancel_futures=True)
+            self._process_pool = None
+
+    def _set_rcvbuf(self, size: int) -> None:
+        try:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+        except OSError as e:
+            pub.sendMessage(RX_LISTENER_ERROR, error=e)
+
+    def rcvbuf_size(self) -> Optional[int]:
+        """The socket's effective SO_RCVBUF (Linux reports double the requested size)."""
+        if self._sock is None:
+            return None
+        return self._sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+    def queue_stats(self) -> Optional[QueueStats]:
+        """Queue counters, summed across decode worker shards (high_water is the largest shard's)."""
+        if not self._queues:
+            return None
+        stats = [queue.stats() for queue in self._queues]
+        return QueueStats(
+            depth=sum(s.depth for s in stats),
+            max_size=sum(s.max_size for s in stats),
+            high_water=max(s.high_water for s in stats),
+            enqueued=sum(s.enqueued for s in stats),
+            dequeued=sum(s.dequeued for s in stats),
+            dropped=sum(s.dropped for s in stats),
+            blocked=sum(s.blocked for s in stats),
+            policy=self.overflow_policy,
+        )
+
+    def _deliver(self, raw, addr) -> None:
+        queues = self._queues
+        if not queues:
+            self._handle_datagram(raw, addr)
+            return
+        # Every packet from one sender lands on the same shard, which keeps its order.
+        queue = queues[0] if len(queues) == 1 else queues[peek_from(raw) % len(queues)]
+        # Batch receivers hand out views into a reused ring, so queued datagrams are copied.
+        queue.put((bytes(raw), addr))
+
+    def _process_queue(self, queue: BoundedPacketQueue) -> None:
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            try:
+                self._handle_datagram(*item)
+            except Exception as e:
+                pub.sendMessage(RX_LISTENER_ERROR, error=e)
 
     def _packet_dedupe_key(self, packet: mesh_pb2.MeshPacket) -> tuple[int, int] | None:
         from_id = int(getattr(packet, "from", 0) or 0)
@@ -113,17 +457,12 @@ class UDPPacketStream:
             return None
         return (from_id, packet_id)
 
-    def _prune_seen_packets(self, now: float) -> None:
-        if self.dedupe_ttl_sec > 0:
-            expiry_cutoff = now - self.dedupe_ttl_sec
-            while self._seen_packets:
-                _, seen_at = next(iter(self._seen_packets.items()))
-                if seen_at > expiry_cutoff:
-                    break
-                self._seen_packets.popitem(last=False)
-
-        while len(self._seen_packets) > self.dedupe_max_entries:
-            self._seen_packets.popitem(last=False)
+    def channel_for(self, packet) -> Optional[ChannelKey]:
+        """Return the key ring channel that decrypted packet (or any copy of it), if known."""
+        key = packet.dedupe_key if isinstance(packet, PacketHeader) else self._packet_dedupe_key(packet)
+        if key is None:
+            return None
+        return self.dedupe.channel(key)
 
     def _is_duplicate_packet(
         self,
@@ -131,71 +470,206 @@ class UDPPacketStream:
         *,
         now: float | None = None,
     ) -> bool:
-        key = self._packet_dedupe_key(packet)
-        if key is None:
-            return False
+        return self._is_duplicate_key(self._packet_dedupe_key(packet), now=now)
 
-        check_time = time.monotonic() if now is None else float(now)
-        self._prune_seen_packets(check_time)
-
-        seen_at = self._seen_packets.get(key)
-        if seen_at is not None:
-            if self.dedupe_ttl_sec == 0 or (check_time - seen_at) <= self.dedupe_ttl_sec:
-                self._seen_packets.move_to_end(key)
-                self._seen_packets[key] = check_time
-                return True
-            self._seen_packets.pop(key, None)
+    def _is_duplicate_key(
+        self,
+        key: tuple[int, int] | None,
+        *,
+        now: float | None = None,
+    ) -> bool:
+        return self.dedupe.seen(key, now)
 
-        self._seen_packets[key] = check_time
-        self._prune_seen_packets(check_time)
-        return False
+    def _channel_kwargs(self, channel: Optional[ChannelKey]) -> dict:
+        if not self.publish_channel:
+            return _NO_CHANNEL_KWARGS
+        return {"channel": channel.name if channel is not None else None}
 
-    def _publish_unique_topics(self, packet: mesh_pb2.MeshPacket, addr) -> None:
-        pub.sendMessage("mesh.rx.unique_packet", packet=packet, addr=addr)
+    def _publish_unique_topics(self, packet: mesh_pb2.MeshPacket, addr, channel: Optional[ChannelKey] = None) -> None:
+        has_listeners = self._has_listeners
+        extra = self._channel_kwargs(channel)
+        if has_listeners(RX_UNIQUE_PACKET):
+            pub.sendMessage(RX_UNIQUE_PACKET, packet=packet, addr=addr, **extra)
 
         if not packet.HasField("decoded"):
             return
 
         portnum = packet.decoded.portnum
-        pub.sendMessage("mesh.rx.decoded", packet=packet, portnum=portnum, addr=addr)
-        pub.sendMessage(f"mesh.rx.port.{portnum}", packet=packet, addr=addr)
+        if has_listeners(RX_DECODED):
+            pub.sendMessage(RX_DECODED, packet=packet, portnum=portnum, addr=addr, **extra)
+        topic = port_topic(portnum)
+        if has_listeners(topic):
+            pub.sendMessage(topic, packet=packet, addr=addr, **extra)
         if portnum == portnums_pb2.PortNum.TEXT_MESSAGE_APP:
-            pub.sendMessage("mesh.rx.text", packet=packet, addr=addr)
+            if has_listeners(RX_TEXT):
+                pub.sendMessage(RX_TEXT, packet=packet, addr=addr, **extra)
             return
 
         if portnum != portnums_pb2.PortNum.ROUTING_APP:
             return
 
-        routing = parse_routing(packet)
+        # Parse the Routing payload once; lazy DecodedPackets already cache it.
+        routing = packet.payload if isinstance(packet, DecodedPacket) else parse_routing(packet)
         if routing is None:
             return
 
-        pub.sendMessage("mesh.rx.routing", packet=packet, routing=routing, addr=addr)
-        if is_ack(packet):
-            pending = pending_acks.resolve(packet.decoded.request_id)
-            pub.sendMessage("mesh.rx.ack", packet=packet, routing=routing, addr=addr, pending=pending)
-        elif is_nak(packet):
-            pending = pending_acks.resolve(packet.decoded.request_id)
-            pub.sendMessage("mesh.rx.nak", packet=packet, routing=routing, addr=addr, pending=pending)
-
-    def _handle_datagram(self, raw: bytes, addr) -> None:
-        pub.sendMessage("mesh.rx.raw", data=raw, addr=addr)
-
-        packet = _decode_and_optionally_parse(raw, self.key, parse_payload=self.parse_payload)
-        if packet is None:
-            pub.sendMessage("mesh.rx.decode_error", addr=addr)
-            return
+        if has_listeners(RX_ROUTING):
+            pub.sendMessage(RX_ROUTING, packet=packet, routing=routing, addr=addr, **extra)
+        if routing_is_ack(packet, routing):
+            pending = self.pending_acks.resolve(packet.decoded.request_id, packet=packet, routing=routing)
+            if has_listeners(RX_ACK):
+                pub.sendMessage(RX_ACK, packet=packet, routing=routing, addr=addr, pending=pending, **extra)
+        elif routing_is_nak(packet, routing):
+            pending = self.pending_acks.resolve(packet.decoded.request_id, packet=packet, routing=routing)
+            if has_listeners(RX_NAK):
+                pub.sendMessage(RX_NAK, packet=packet, routing=routing, addr=addr, pending=pending, **extra)
+
+    def _stamp_rx_fields(self, packet: mesh_pb2.MeshPacket) -> None:
         if not getattr(packet, "rx_time", 0):
             packet.rx_time = int(time.time())
         if not getattr(packet, "transport_mechanism", 0):
             packet.transport_mechanism = mesh_pb2.MeshPacket.TransportMechanism.TRANSPORT_MULTICAST_UDP
 
-        pub.sendMessage("mesh.rx.packet", packet=packet, addr=addr)
-        if self._is_duplicate_packet(packet):
-            pub.sendMessage("mesh.rx.duplicate", packet=packet, addr=addr)
+    def _publish_duplicate(
+        self,
+        raw: bytes,
+        addr,
+        key: tuple[int, int],
+        packet: Optional[mesh_pb2.MeshPacket],
+        header: Optional[PacketHeader],
+    ) -> None:
+        publish_packet = self.publish_duplicate_packets and self._has_listeners(RX_PACKET)
+        publish_duplicate = self._has_listeners(RX_DUPLICATE)
+        if not publish_packet and not publish_duplicate:
             return
 
-        self._publish_unique_topics(packet, addr)
+        channel = None
+        if self.duplicate_view == "header":
+            view = header if header is not None else PacketHeader.from_packet(packet)
+            if self.publish_channel:
+                channel = self.dedupe.channel(key)
+        else:
+            view = packet if packet is not None else _parse_envelope(raw)
+            if view is None:
+                self._publish_decode_error(addr)
+                return
+            cached = self.dedupe.decoded(key)
+            if cached is not None:
+                # Reuse the first copy's decrypted/parsed payload; keep this copy's own header.
+                view.decoded.CopyFrom(cached.decoded)
+                channel = self.dedupe.channel(key)
+            else:
+                channel = _decode_payload(view, self.key, parse_payload=self._eager_payload, keyring=self.keyring)
+            self._stamp_rx_fields(view)
+            if self._lazy_payload:
+                view = DecodedPacket(view, channel)
+
+        extra = self._channel_kwargs(channel)
+        if publish_packet:
+            pub.sendMessage(RX_PACKET, packet=view, addr=addr, **extra)
+        if publish_duplicate:
+            pub.sendMessage(RX_DUPLICATE, packet=view, addr=addr, **extra)
+
+    def _decode_unique(self, packet: mesh_pb2.MeshPacket, raw, shard: Optional[RxShard] = None) -> Optional[ChannelKey]:
+        if self._process_pool is None:
+            return _decode_payload(packet, self.key, parse_payload=self._eager_payload, keyring=self.keyring, shard=shard)
+
+        # The whole round trip to the process pool counts as decrypt.
+        started = time.perf_counter_ns() if shard is not None else 0
+        channels = self.keyring.pairs() if self.keyring is not None else ()
+        future = self._process_pool.submit(_decode_in_subprocess, bytes(raw), self.key, channels, self._eager_payload)
+        serialized, channel_name = future.result()
+        packet.ParseFromString(serialized)
+        if shard is not None:
+            shard.lap(STAGE_DECRYPT, started)
+        if channel_name is None or self.keyring is None:
+            return None
+        return self.keyring.get(channel_name)
+
+    def _publish_decode_error(self, addr) -> None:
+        if self._stats is not None:
+            self._stats.shard().decode_errors += 1
+        if self._has_listeners(RX_DECODE_ERROR):
+            pub.sendMessage(RX_DECODE_ERROR, addr=addr)
+
+    def _handle_datagram(self, raw: bytes, addr) -> None:
+        shard = None if self._stats is None else self._stats.shard()
+        if shard is not None:
+            shard.received += 1
+            mark = time.perf_counter_ns()
+        if self._has_listeners(RX_RAW):
+            # In batch mode raw is a view into the reused receive ring; listeners may keep data.
+            pub.sendMessage(RX_RAW, data=bytes(raw), addr=addr)
+
+        packet = None
+        header = None
+        if _SCAN_BEFORE_PARSE:
+            header = scan_header(raw)
+            if header is None:
+                self._publish_decode_error(addr)
+                return
+            key = header.dedupe_key
+        else:
+            packet = _parse_envelope(raw)
+            if packet is None:
+                self._publish_decode_error(addr)
+                return
+            key = self._packet_dedupe_key(packet)
+        if shard is not None:
+            mark = shard.lap(STAGE_PARSE, mark)
+
+        duplicate = self._is_duplicate_key(key)
+        if shard is not None:
+            mark = shard.lap(STAGE_DEDUPE, mark)
+        if duplicate:
+            self._publish_duplicate(raw, addr, key, packet, header)
+            if shard is not None:
+                shard.duplicates += 1
+                shard.lap(STAGE_DISPATCH, mark)
+            return
+
+        if packet is None:
+            packet = _parse_envelope(raw)
+            if packet is None:
+                self._publish_decode_error(addr)
+                return
+            if shard is not None:
+                mark = shard.lap(STAGE_PARSE, mark)
+        channel = self._decode_unique(packet, raw, shard)
+        if shard is not None:
+            shard.unique += 1
+            shard.count_port(packet.decoded.portnum if packet.HasField("decoded") else None)
+            mark = time.perf_counter_ns()
+        self._stamp_rx_fields(packet)
+        if key is not None and packet.HasField("decoded"):
+            self.dedupe.remember(key, packet, channel)
+        if self._lazy_payload:
+            packet = DecodedPacket(packet, channel)
+
+        if self._has_listeners(RX_PACKET):
+            pub.sendMessage(RX_PACKET, packet=packet, addr=addr, **self._channel_kwargs(channel))
+        self._publish_unique_topics(packet, addr, channel)
+        if shard is not None:
+            shard.lap(STAGE_DISPATCH, mark)
+
+    def _drain_batches(self) -> int:
+        handled = 0
+        shard = None if self._stats is None else self._stats.shard()
+        while not self._stop.is_set():
+            if shard is not None:
+                started = time.perf_counter_ns()
+            datagrams = self._receiver.receive()
+            if not datagrams:
+                break
+            if shard is not None:
+                shard.lap(STAGE_RECV, started)
+            for raw, addr in datagrams:
+                try:
+                    self._deliver(raw, addr)
+                except Exception as e:
+                    pub.sendMessage(RX_LISTENER_ERROR, error=e)
+            handled += len(datagrams)
+        return handled
 
     def _run(self) -> None:
         while not self._stop.is_set():
@@ -204,10 +678,22 @@ class UDPPacketStream:
                     r, _, _ = select.select([self._sock], [], [], self.select_timeout)
                     if not r:
                         continue
-                    raw, _addr = self._sock.recvfrom(self.recv_buf)
+                    if self._receiver is not None:
+                        self._drain_batches()
+                        continue
+                    if self._stats is None:
+                        raw, _addr = self._sock.recvfrom(self.recv_buf)
+                    else:
+                        started = time.perf_counter_ns()
+                        raw, _addr = self._sock.recvfrom(self.recv_buf)
+                        self._stats.shard().lap(STAGE_RECV, started)
                 else:
-                    raw, _addr = conn.recvfrom(self.recv_buf)
+                    # Socketless transports (e.g. LoopbackConnection) wait in recvfrom itself.
+                    try:
+                        raw, _addr = self.connection.recvfrom(self.recv_buf, timeout=self.select_timeout)
+                    except TimeoutError:
+                        continue
 
-                self._handle_datagram(raw, _addr)
+                self._deliver(raw, _addr)
             except Exception as e:
-                pub.sendMessage("mesh.rx.listener_error", error=e)
+                pub.sendMessage(RX_LISTENER_ERROR, error=e)
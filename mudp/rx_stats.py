@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import math
+import threading
+import time
+from typing import Optional
+
+from meshtastic.protobuf import portnums_pb2
+
+STAGE_RECV = 0
+STAGE_PARSE = 1
+STAGE_DEDUPE = 2
+STAGE_DECRYPT = 3
+STAGE_PAYLOAD = 4
+STAGE_DISPATCH = 5
+STAGE_NAMES = ("recv", "parse", "dedupe", "decrypt", "payload", "dispatch")
+
+# Histogram buckets are powers of two: bucket i counts samples below 2**(MIN_BUCKET_BITS + i)
+# nanoseconds (256 ns up to ~1.07 s); the last bucket counts everything slower.
+MIN_BUCKET_BITS = 8
+MAX_BUCKET_BITS = 30
+BUCKET_BOUNDS_NS = tuple(1 << bits for bits in range(MIN_BUCKET_BITS, MAX_BUCKET_BITS + 1))
+BUCKET_COUNT = len(BUCKET_BOUNDS_NS) + 1
+
+NOT_DECODED = "ENCRYPTED"
+
+_perf_counter_ns = time.perf_counter_ns
+
+
+def bucket_index(ns: int) -> int:
+    """The histogram bucket a sample of ns nanoseconds falls in."""
+    index = ns.bit_length() - MIN_BUCKET_BITS
+    if index < 0:
+        return 0
+    return index if index < BUCKET_COUNT else BUCKET_COUNT - 1
+
+
+@dataclass
+class LatencyHistogram:
+    """
+    Merged samples of one timed stage. buckets[i] counts samples below BUCKET_BOUNDS_NS[i]
+    (and at least the previous bound); the final extra bucket counts slower ones.
+    """
+
+    count: int = 0
+    total_ns: int = 0
+    buckets: list[int] = field(default_factory=lambda: [0] * BUCKET_COUNT)
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count else 0.0
+
+    def percentile_ns(self, q: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the q-quantile (0..1): inf if that is the overflow
+        bucket, None without samples.
+        """
+        if not self.count:
+            return None
+        rank = max(q, 0.0) * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if bucket and seen >= rank:
+                return float(BUCKET_BOUNDS_NS[index]) if index < len(BUCKET_BOUNDS_NS) else math.inf
+        return None
+
+    def _add(self, counts: list[int], total_ns: int) -> None:
+        self.total_ns += total_ns
+        for index, bucket in enumerate(counts):
+            if bucket:
+                self.buckets[index] += bucket
+                self.count += bucket
+
+
+@dataclass
+class RxStatsSnapshot:
+    """Receive counters and per-stage latency, merged across every thread that handled packets."""
+
+    taken_at: float
+    received: int
+    decode_errors: int
+    duplicates: int
+    unique: int
+    ports: dict[str, int]
+    stages: dict[str, LatencyHistogram]
+
+
+class RxShard:
+    """One thread's counters. Only that thread writes them, so updates take no lock."""
+
+    __slots__ = ("received", "decode_errors", "duplicates", "unique", "ports", "histograms", "totals")
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.decode_errors = 0
+        self.duplicates = 0
+        self.unique = 0
+        self.ports: dict[Optional[int], int] = {}
+        self.histograms = [[0] * BUCKET_COUNT for _ in STAGE_NAMES]
+        self.totals = [0] * len(STAGE_NAMES)
+
+    def observe(self, stage: int, ns: int) -> None:
+        self.histograms[stage][bucket_index(ns)] += 1
+        self.totals[stage] += ns
+
+    def lap(self, stage: int, since_ns: int) -> int:
+        """Record the time since since_ns for stage and return the current time."""
+        now = _perf_counter_ns()
+        ns = now - since_ns
+        # bucket_index() inlined; this runs several times per packet.
+        index = ns.bit_length() - MIN_BUCKET_BITS
+        if index < 0:
+            index = 0
+        elif index >= BUCKET_COUNT:
+            index = BUCKET_COUNT - 1
+        self.histograms[stage][index] += 1
+        self.totals[stage] += ns
+        return now
+
+    def count_port(self, portnum: Optional[int]) -> None:
+        ports = self.ports
+        ports[portnum] = ports.get(portnum, 0) + 1
+
+
+def _port_name(portnum: Optional[int]) -> str:
+    if portnum is None:
+        return NOT_DECODED
+    try:
+        return portnums_pb2.PortNum.Name(portnum)
+    except ValueError:
+        return str(portnum)
+
+
+class RxStats:
+    """
+    Counters and stage latency histograms for one UDPPacketStream.
+
+    Each thread that handles packets (the receive thread and every decode worker) gets its
+    own shard and updates it without locking; snapshot() merges the shards. A snapshot
+    taken while packets are flowing may be off by the packets in flight.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: list[RxShard] = []
+
+    def shard(self) -> RxShard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = RxShard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def snapshot(self) -> RxStatsSnapshot:
+        with self._lock:
+            shards = list(self._shards)
+        received = decode_errors = duplicates = unique = 0
+        ports: dict[str, int] = {}
+        stages = {name: LatencyHistogram() for name in STAGE_NAMES}
+        for shard in shards:
+            received += shard.received
+            decode_errors += shard.decode_errors
+            duplicates += shard.duplicates
+            unique += shard.unique
+            for portnum, count in list(shard.ports.items()):
+                name = _port_name(portnum)
+                ports[name] = ports.get(name, 0) + count
+            for name, counts, total_ns in zip(STAGE_NAMES, shard.histograms, shard.totals):
+                stages[name]._add(list(counts), total_ns)
+        return RxStatsSnapshot(
+            taken_at=time.time(),
+            received=received,
+            decode_errors=decode_errors,
+            duplicates=duplicates,
+            unique=unique,
+            ports=ports,
+            stages=stages,
+        )
@@ -1,13 +1,48 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+import logging
 import random
+from threading import Lock
 import time
-from typing import Callable
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
 
+from google.protobuf.message import Message
 from meshtastic import portnums_pb2, mesh_pb2, telemetry_pb2, BROADCAST_NUM
+from mudp.airtime import AirtimeExceeded, active_airtime_limiter
+from mudp.context import MeshContext
+from mudp.batch_sender import send_datagrams
 from mudp.encryption import generate_hash, encrypt_packet
-from mudp.reliability import register_pending_ack
+from mudp.flow_control import send_window
+from mudp.message_builder import MessageBuilder
+from mudp.packet_id import packet_ids
+from mudp.reliability import AckHandle, parse_node_id
+from mudp.tx_scheduler import active_tx_scheduler, packet_priority, scheduled_sendto
 from mudp.singleton import conn, node
 
-message_id = random.getrandbits(32)
+logger = logging.getLogger(__name__)
+
+_PORTNUM_NAMES = {number: name for name, number in portnums_pb2.PortNum.items()}
+_LOGGED_KWARGS_SKIP = frozenset(("use_config", "to", "channel", "key", "context"))
+
+
+_transmitter: ContextVar[Optional[Callable[[bytes, tuple], None]]] = ContextVar("mudp_transmitter", default=None)
+_may_block: ContextVar[bool] = ContextVar("mudp_may_block", default=True)
+
+
+@contextmanager
+def transmit_via(sendto: Callable[[bytes, tuple], None], blocking: bool = True) -> Iterator[None]:
+    """
+    Route packets sent by send_* calls in this context through sendto instead of conn.sendto.
+    blocking=False keeps the airtime limiter from sleeping in this context (e.g. on an event loop).
+    """
+    token = _transmitter.set(sendto)
+    blocking_token = _may_block.set(blocking)
+    try:
+        yield
+    finally:
+        _may_block.reset(blocking_token)
+        _transmitter.reset(token)
 
 
 def _coerce_packet_enum(enum_type, value):
@@ -18,8 +53,37 @@ def _coerce_packet_enum(enum_type, value):
     return int(value)
 
 
+class EncodedPacket(NamedTuple):
+    """A built MeshPacket together with its wire bytes, serialized once."""
+
+    packet: mesh_pb2.MeshPacket
+    raw: bytes
+
+
+def encode_packet(payload) -> EncodedPacket:
+    """
+    Normalize what a payload function returned (EncodedPacket, MeshPacket or serialized
+    bytes) to an EncodedPacket. Only bare bytes, from custom payload functions, need a parse.
+    """
+    if isinstance(payload, EncodedPacket):
+        return payload
+    if isinstance(payload, mesh_pb2.MeshPacket):
+        return EncodedPacket(payload, payload.SerializeToString())
+    return EncodedPacket(mesh_pb2.MeshPacket.FromString(payload), payload)
+
+
+def create_packet(data, portnum: int, **kwargs) -> mesh_pb2.MeshPacket:
+    """Like create_payload, but returns the MeshPacket so the send path serializes it exactly once."""
+    return build_mesh_packet(build_data(data, portnum, **kwargs), **kwargs)
+
+
 def create_payload(data, portnum: int, **kwargs) -> bytes:
     """Generalized function to create a payload."""
+    return create_packet(data, portnum, **kwargs).SerializeToString()
+
+
+def build_data(data, portnum: int, **kwargs) -> mesh_pb2.Data:
+    """Wrap a payload (bytes or protobuf message) in a Data message for portnum."""
     encoded_message = mesh_pb2.Data()
     encoded_message.portnum = portnum
     encoded_message.payload = data.SerializeToString() if hasattr(data, "SerializeToString") else data
@@ -34,12 +98,14 @@ def create_payload(data, portnum: int, **kwargs) -> bytes:
     if emoji:
         encoded_message.emoji = int(emoji)
     encoded_message.bitfield = kwargs.get("bitfield", 1)
-    return generate_mesh_packet(encoded_message, **kwargs)
+    return encoded_message
 
 
 def build_mesh_packet(encoded_message: mesh_pb2.Data, **kwargs) -> mesh_pb2.MeshPacket:
-    """Generate a MeshPacket object."""
-    from_id_hex = kwargs.get("node_id", node.node_id)
+    """Generate a MeshPacket object, from context.node when a context= MeshContext is given."""
+    context = kwargs.get("context")
+    local_node = node if context is None else context.node
+    from_id_hex = kwargs.get("node_id", local_node.node_id)
     from_id = int(from_id_hex.replace("!", ""), 16)
     destination = kwargs.get("to", BROADCAST_NUM)
 
@@ -47,16 +113,17 @@ def build_mesh_packet(encoded_message: mesh_pb2.Data, **kwargs) -> mesh_pb2.Mesh
     if from_id in reserved_ids:
         raise ValueError(f"Node ID '{from_id}' is reserved and cannot be used. Please choose a different ID.")
 
-    global message_id
-    message_id = get_message_id(message_id)
-
     mesh_packet = mesh_pb2.MeshPacket()
     packet_id = kwargs.get("packet_id")
-    mesh_packet.id = message_id if packet_id is None else int(packet_id)
+    if packet_id is None:
+        mesh_packet.id = (packet_ids if context is None else context.packet_ids).next_id()
+    else:
+        mesh_packet.id = int(packet_id)
     setattr(mesh_packet, "from", from_id)
     mesh_packet.to = int(destination)
     mesh_packet.want_ack = kwargs.get("want_ack", False)
-    mesh_packet.channel = generate_hash(node.channel, node.key)
+    channel_hash = kwargs.get("channel_hash")
+    mesh_packet.channel = generate_hash(local_node.channel, local_node.key) if channel_hash is None else channel_hash
     hop_limit = kwargs.get("hop_limit", 3)
     hop_start = kwargs.get("hop_start", 3)
     if hop_limit > hop_start:
@@ -96,10 +163,10 @@ def build_mesh_packet(encoded_message: mesh_pb2.Data, **kwargs) -> mesh_pb2.Mesh
     if transport_mechanism is not None:
         mesh_packet.transport_mechanism = transport_mechanism
 
-    if node.key == "":
+    if local_node.key == "":
         mesh_packet.decoded.CopyFrom(encoded_message)
     else:
-        mesh_packet.encrypted = encrypt_packet(node.channel, node.key, mesh_packet, encoded_message)
+        mesh_packet.encrypted = encrypt_packet(local_node.channel, local_node.key, mesh_packet, encoded_message)
 
     return mesh_packet
 
@@ -110,68 +177,206 @@ def generate_mesh_packet(encoded_message: mesh_pb2.Data, **kwargs) -> bytes:
 
 
 def get_portnum_name(portnum: int) -> str:
-    for name, number in portnums_pb2.PortNum.items():
-        if number == portnum:
-            return name
-    return f"UNKNOWN_PORTNUM ({portnum})"
+    name = _PORTNUM_NAMES.get(portnum)
+    return name if name is not None else f"UNKNOWN_PORTNUM ({portnum})"
 
 
-def publish_message(payload_function: Callable, portnum: int, **kwargs) -> None:
-    """Send a message of any type, with logging."""
+def publish_message(payload_function: Callable, portnum: int, **kwargs) -> Optional[AckHandle]:
+    """
+    Send a message of any type, logging it at INFO (raw bytes at DEBUG). Returns an
+    AckHandle for direct want_ack packets, otherwise None. Raises AirtimeExceeded when the
+    airtime limiter refuses an untracked packet; a tracked one fails its handle instead.
 
-    try:
-        payload = payload_function(portnum=portnum, **kwargs)
-        if isinstance(payload, mesh_pb2.MeshPacket):
-            packet = payload
-            raw_payload = packet.SerializeToString()
-        else:
-            raw_payload = payload
-            packet = mesh_pb2.MeshPacket()
-            packet.ParseFromString(raw_payload)
+    payload_function(portnum=..., **kwargs) should return a MeshPacket (see create_packet) or
+    an EncodedPacket; serialized bytes are still accepted but have to be parsed back.
 
-        print(f"\n[TX] Portnum = {get_portnum_name(portnum)} ({portnum})")
+    With context=MeshContext(...) the packet is built for context.node and sent on
+    context.connection, otherwise on the module-level node and conn.
 
-        print(f"     To: {kwargs.get('to', 'BROADCAST_NUM')}")
-        for k, v in kwargs.items():
-            if k not in ("use_config", "to", "channel", "key") and v is not None:
-                print(f"     {k}: {v}")
+    Direct want_ack packets go through send_window, which may hold them back until earlier
+    packets to the same node are ACKed. Pass window_timeout=SECONDS to wait that long for a
+    free slot instead of queueing.
+    """
 
-        register_pending_ack(packet, raw_payload)
-        conn.sendto(raw_payload, (conn.host, conn.port))
+    window_timeout = kwargs.pop("window_timeout", None)
+    try:
+        packet, raw_payload = encode_packet(payload_function(portnum=portnum, **kwargs))
+
+        if logger.isEnabledFor(logging.INFO):
+            _log_tx(packet, portnum, kwargs)
+
+        context = kwargs.get("context")
+        connection, window = (conn, send_window) if context is None else (context.connection, context.send_window)
+        transmit, priority = _transmitter.get() or connection.sendto, packet_priority(packet, portnum)
+        sendto = scheduled_sendto(transmit, priority, portnum, _may_block.get())
+        handle = window.send(
+            packet,
+            raw_payload,
+            sendto,
+            (connection.host, connection.port),
+            timeout=window_timeout,
+            release_sendto=scheduled_sendto(transmit, priority, portnum, blocking=False),
+        )
 
-        print(f"\n[SENT] {raw_payload}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[SENT] %r", raw_payload)
+        return handle
 
+    except AirtimeExceeded:
+        # Returning None would look like a successful untracked send.
+        raise
     except Exception as e:
-        print(f"Error while sending message: {e}")
+        logger.error("Error while sending message: %s", e)
+        return None
+
 
+def _log_tx(packet: mesh_pb2.MeshPacket, portnum: int, kwargs: dict) -> None:
+    fields = "".join(
+        f"\n     {k}: {v}" for k, v in kwargs.items() if k not in _LOGGED_KWARGS_SKIP and v is not None
+    )
+    logger.info(
+        "[TX] Portnum = %s (%s) id=%d\n     To: %s%s",
+        get_portnum_name(portnum),
+        portnum,
+        packet.id,
+        kwargs.get("to", "BROADCAST_NUM"),
+        fields,
+    )
 
-def send_data(destination_id: str, payload: bytes, portnum: int = 256, want_ack: bool = False):
+
+def send_data(
+    destination_id: str,
+    payload: bytes,
+    portnum: int = 256,
+    want_ack: bool = False,
+    context: Optional[MeshContext] = None,
+) -> Optional[AckHandle]:
     """Send raw data to a specified destination node ID."""
-    publish_message(
-        create_payload, portnum=portnum, to=int(destination_id.replace("!", ""), 16), data=payload, want_ack=want_ack
+    return publish_message(
+        create_packet,
+        portnum=portnum,
+        to=int(destination_id.replace("!", ""), 16),
+        data=payload,
+        want_ack=want_ack,
+        context=context,
+    )
+
+
+class SentPacket(NamedTuple):
+    id: int
+    to: int
+    handle: Optional[AckHandle]
+
+
+class _DatagramBatch:
+    """sendto stand-in that collects datagrams for one send_datagrams() call; after flush() it sends directly."""
+
+    def __init__(self, sock, addr: tuple) -> None:
+        self.sock = sock
+        self.addr = addr
+        self.datagrams: list[bytes] = []
+        self.flushed = False
+
+    def __call__(self, raw_bytes: bytes, addr: tuple) -> None:
+        if self.flushed:
+            self.sock.sendto(raw_bytes, addr)
+        else:
+            self.datagrams.append(raw_bytes)
+
+    def flush(self) -> None:
+        self.flushed = True
+        if self.datagrams:
+            send_datagrams(self.sock, self.datagrams, self.addr)
+
+
+def send_many(messages: Iterable[dict], window_timeout: Optional[float] = None, **common) -> list[SentPacket]:
+    """
+    Build and send many packets in one go, e.g. to DM every node on a roster.
+
+    Each message is a dict of the keyword arguments a send function takes, plus either
+    message= (text) or payload= (bytes or protobuf) with portnum= (TEXT_MESSAGE_APP by
+    default). Keyword arguments given to send_many itself apply to every message. The
+    channel hash is computed once, and with a plain socket (no TX scheduler, airtime
+    limiter or transmit_via() override) everything goes out in one sendmmsg() batch.
+
+    Returns one SentPacket(id, to, handle) per message, in order; handle is an AckHandle
+    for direct want_ack packets. If the batch send fails, the error is raised and the
+    handles of the packets in it are failed with it.
+    """
+    context = common.get("context")
+    local_node, connection, window = (
+        (node, conn, send_window) if context is None else (context.node, context.connection, context.send_window)
     )
+    common.setdefault("channel_hash", generate_hash(local_node.channel, local_node.key))
+    addr = (connection.host, connection.port)
+    override = _transmitter.get()
+    batch = None
+    if override is None and connection.socket is not None and active_tx_scheduler() is None and active_airtime_limiter() is None:
+        batch = _DatagramBatch(connection.socket, addr)
+
+    results = []
+    try:
+        for message in messages:
+            kwargs = {**common, **message}
+            text = kwargs.pop("message", None)
+            payload = text.encode("utf-8") if text is not None else kwargs.pop("payload")
+            portnum = kwargs.pop("portnum", portnums_pb2.TEXT_MESSAGE_APP)
+            if isinstance(kwargs.get("to"), str):
+                kwargs["to"] = parse_node_id(kwargs["to"])
+            packet = build_mesh_packet(build_data(payload, portnum, **kwargs), **kwargs)
+            if batch is not None:
+                sendto = release_sendto = batch
+            else:
+                transmit, priority = override or connection.sendto, packet_priority(packet, portnum)
+                sendto = scheduled_sendto(transmit, priority, portnum, _may_block.get())
+                release_sendto = scheduled_sendto(transmit, priority, portnum, blocking=False)
+            handle = window.send(
+                packet, packet.SerializeToString(), sendto, addr, timeout=window_timeout, release_sendto=release_sendto
+            )
+            results.append(SentPacket(packet.id, packet.to, handle))
+    finally:
+        if batch is not None:
+            try:
+                batch.flush()
+            except Exception as error:
+                # Packets in the failed batch must not be retried as if they had gone out.
+                for result in results:
+                    if result.handle is not None and window.registry.get(result.id) is result.handle.pending:
+                        window.registry.fail(result.handle.pending, error)
+                raise
+    return results
+
+
+def send_text_many(message: str, destinations: Iterable[int | str], **kwargs) -> list[SentPacket]:
+    """Send the same text message to each destination (node numbers or "!hex" ids)."""
+    return send_many(({"message": message, "to": destination} for destination in destinations), **kwargs)
 
 
 def get_message_id(rolling_message_id: int, max_message_id: int = 4294967295) -> int:
-    """Increment the message ID with sequential wrapping and add a random upper bit component to prevent predictability."""
+    """
+    Increment the message ID with sequential wrapping and add a random upper bit component to prevent predictability.
+    Not thread-safe; packets are numbered by mudp.packet_id.packet_ids.
+    """
     rolling_message_id = (rolling_message_id + 1) % (max_message_id & 0x3FF + 1)
     random_bits = random.randint(0, (1 << 22) - 1) << 10
     message_id = rolling_message_id | random_bits
     return message_id
 
 
-def send_nodeinfo(**kwargs) -> None:
+def send_nodeinfo(**kwargs) -> Optional[AckHandle]:
     """Send node information including short/long names and hardware model."""
 
-    if node is None and "node_id" not in kwargs:
+    context = kwargs.get("context")
+    local_node = node if context is None else context.node
+    if local_node is None and "node_id" not in kwargs:
         raise ValueError("node_id is required if no node object is provided")
 
-    kwargs.setdefault("node_id", getattr(node, "node_id", ""))
-    kwargs.setdefault("long_name", getattr(node, "long_name", "Unknown"))
-    kwargs.setdefault("short_name", getattr(node, "short_name", "??"))
-    kwargs.setdefault("hw_model", getattr(node, "hw_model", 255))
-    kwargs.setdefault("role", getattr(node, "role", "CLIENT"))
-    kwargs.setdefault("public_key", getattr(node, "public_key", b""))
+    kwargs.setdefault("node_id", getattr(local_node, "node_id", ""))
+    kwargs.setdefault("long_name", getattr(local_node, "long_name", "Unknown"))
+    kwargs.setdefault("short_name", getattr(local_node, "short_name", "??"))
+    kwargs.setdefault("hw_model", getattr(local_node, "hw_model", 255))
+    kwargs.setdefault("role", getattr(local_node, "role", "CLIENT"))
+    kwargs.setdefault("public_key", getattr(local_node, "public_key", b""))
 
     if kwargs.get("public_key") == b"":
         kwargs["public_key"] = None
@@ -179,44 +384,40 @@ def send_nodeinfo(**kwargs) -> None:
     if kwargs.get("macaddr") == b"":
         kwargs["macaddr"] = None
 
-    def create_nodeinfo_payload(portnum: int, **fields) -> bytes:
-        nodeinfo = mesh_pb2.User(
-            hw_model=fields.pop("hw_model"),
-            id=fields.pop("node_id"),
-            long_name=fields.pop("long_name"),
-            short_name=fields.pop("short_name"),
-            public_key=fields.pop("public_key"),
-        )
-        for k, v in fields.items():
-            if v is not None and k in mesh_pb2.User.DESCRIPTOR.fields_by_name:
-                setattr(nodeinfo, k, v)
-        return create_payload(nodeinfo, portnum, **kwargs)
-
-    publish_message(
-        create_nodeinfo_payload,
+    return publish_message(
+        _nodeinfo_payload,
         portnum=portnums_pb2.NODEINFO_APP,
         **kwargs,
     )
 
 
-def send_text_message(message: str = None, **kwargs) -> None:
-    """Send a text message to the specified destination."""
+def _nodeinfo_payload(portnum: int, **kwargs) -> mesh_pb2.MeshPacket:
+    nodeinfo = _USER.build(
+        kwargs,
+        {
+            "hw_model": kwargs["hw_model"],
+            "id": kwargs["node_id"],
+            "long_name": kwargs["long_name"],
+            "short_name": kwargs["short_name"],
+            "public_key": kwargs["public_key"],
+        },
+    )
+    return create_packet(nodeinfo, portnum, **kwargs)
 
-    def create_text_payload(portnum: int, message: str = None, **kwargs):
-        data = message.encode("utf-8")
-        return create_payload(data, portnum, **kwargs)
 
-    publish_message(create_text_payload, portnums_pb2.TEXT_MESSAGE_APP, message=message, **kwargs)
+def send_text_message(message: str = None, **kwargs) -> Optional[AckHandle]:
+    """Send a text message to the specified destination."""
+    return publish_message(_text_payload, portnums_pb2.TEXT_MESSAGE_APP, message=message, **kwargs)
 
 
-def send_reply(message: str, reply_id: int, emoji: bool = False, **kwargs) -> None:
-    """Send a text reply referencing an earlier Meshtastic message ID."""
+def _text_payload(portnum: int, message: str = None, **kwargs) -> mesh_pb2.MeshPacket:
+    return create_packet(message.encode("utf-8"), portnum, **kwargs)
 
-    def create_reply_payload(portnum: int, message: str, **kwargs):
-        return create_payload(message.encode("utf-8"), portnum, **kwargs)
 
-    publish_message(
-        create_reply_payload,
+def send_reply(message: str, reply_id: int, emoji: bool = False, **kwargs) -> Optional[AckHandle]:
+    """Send a text reply referencing an earlier Meshtastic message ID."""
+    return publish_message(
+        _text_payload,
         portnums_pb2.TEXT_MESSAGE_APP,
         message=message,
         reply_id=reply_id,
@@ -225,99 +426,51 @@ def send_reply(message: str, reply_id: int, emoji: bool = False, **kwargs) -> No
     )
 
 
-def send_position(latitude: float = None, longitude: float = None, **kwargs) -> None:
+def send_position(latitude: float = None, longitude: float = None, **kwargs) -> Optional[AckHandle]:
     """Send current position with optional additional fields (e.g., ground_speed, fix_type, etc)."""
 
     kwargs.setdefault("location_source", "LOC_MANUAL")
-
-    def create_position_payload(portnum: int, **fields):
-        position_fields = {
-            "latitude_i": int(latitude * 1e7) if latitude is not None else None,
-            "longitude_i": int(longitude * 1e7) if longitude is not None else None,
-            "time": int(time.time()),
-        }
-
-        # Filter out None values and remove keys we've already handled
-        reserved_keys = {"latitude", "longitude"}
-        data = {
-            k: v
-            for k, v in fields.items()
-            if v is not None and k not in reserved_keys and k in mesh_pb2.Position.DESCRIPTOR.fields_by_name
-        }
-        position_fields.update(data)
-
-        return create_payload(mesh_pb2.Position(**position_fields), portnum, **kwargs)
-
-    publish_message(
-        create_position_payload, portnums_pb2.POSITION_APP, latitude=latitude, longitude=longitude, **kwargs
-    )
+    return publish_message(_position_payload, portnums_pb2.POSITION_APP, latitude=latitude, longitude=longitude, **kwargs)
 
 
-def send_device_telemetry(**kwargs) -> None:
-    """Send telemetry packet including battery, voltage, channel usage, and uptime."""
+def _position_payload(portnum: int, latitude: float = None, longitude: float = None, **kwargs) -> mesh_pb2.MeshPacket:
+    position = _POSITION.build(kwargs, {**_scaled_coordinates(latitude, longitude), "time": int(time.time())})
+    return create_packet(position, portnum, **kwargs)
 
-    def create_telemetry_payload(portnum: int, **_):
-        metrics_kwargs = {
-            k: v
-            for k, v in kwargs.items()
-            if v is not None and k in telemetry_pb2.DeviceMetrics.DESCRIPTOR.fields_by_name
-        }
-        metrics = telemetry_pb2.DeviceMetrics(**metrics_kwargs)
-        data = telemetry_pb2.Telemetry(time=int(time.time()), device_metrics=metrics)
-        return create_payload(data, portnum, **kwargs)
 
-    publish_message(create_telemetry_payload, portnums_pb2.TELEMETRY_APP, **kwargs)
+def _scaled_coordinates(latitude: Optional[float], longitude: Optional[float]) -> dict:
+    return {
+        "latitude_i": int(latitude * 1e7) if latitude is not None else None,
+        "longitude_i": int(longitude * 1e7) if longitude is not None else None,
+    }
 
 
-def send_power_metrics(**kwargs) -> None:
-    """Send power metrics including voltage and current for three channels."""
+def _telemetry_payload(metrics: str, portnum: int, **kwargs) -> mesh_pb2.MeshPacket:
+    data = telemetry_pb2.Telemetry(time=int(time.time()), **{metrics: _TELEMETRY[metrics].build(kwargs)})
+    return create_packet(data, portnum, **kwargs)
 
-    def create_power_metrics_payload(portnum: int, **_):
-        metrics_kwargs = {
-            k: v
-            for k, v in kwargs.items()
-            if v is not None and k in telemetry_pb2.PowerMetrics.DESCRIPTOR.fields_by_name
-        }
-        metrics = telemetry_pb2.PowerMetrics(**metrics_kwargs)
-        data = telemetry_pb2.Telemetry(time=int(time.time()), power_metrics=metrics)
-        return create_payload(data, portnum, **kwargs)
 
-    publish_message(create_power_metrics_payload, portnums_pb2.TELEMETRY_APP, **kwargs)
+def send_device_telemetry(**kwargs) -> Optional[AckHandle]:
+    """Send telemetry packet including battery, voltage, channel usage, and uptime."""
+    return publish_message(_device_metrics_payload, portnums_pb2.TELEMETRY_APP, **kwargs)
 
 
-def send_environment_metrics(**kwargs) -> None:
-    """Send environment metrics including temperature, humidity, pressure, and gas resistance."""
+def send_power_metrics(**kwargs) -> Optional[AckHandle]:
+    """Send power metrics including voltage and current for three channels."""
+    return publish_message(_power_metrics_payload, portnums_pb2.TELEMETRY_APP, **kwargs)
 
-    def create_environment_metrics_payload(portnum: int, **_):
-        metrics_kwargs = {
-            k: v
-            for k, v in kwargs.items()
-            if v is not None and k in telemetry_pb2.EnvironmentMetrics.DESCRIPTOR.fields_by_name
-        }
-        metrics = telemetry_pb2.EnvironmentMetrics(**metrics_kwargs)
-        data = telemetry_pb2.Telemetry(time=int(time.time()), environment_metrics=metrics)
-        return create_payload(data, portnum, **kwargs)
 
-    publish_message(create_environment_metrics_payload, portnums_pb2.TELEMETRY_APP, **kwargs)
+def send_environment_metrics(**kwargs) -> Optional[AckHandle]:
+    """Send environment metrics including temperature, humidity, pressure, and gas resistance."""
+    return publish_message(_environment_metrics_payload, portnums_pb2.TELEMETRY_APP, **kwargs)
 
 
-def send_health_metrics(**kwargs) -> None:
+def send_health_metrics(**kwargs) -> Optional[AckHandle]:
     """Send health metrics including heart rate, SpO2, and body temperature."""
+    return publish_message(_health_metrics_payload, portnums_pb2.TELEMETRY_APP, **kwargs)
 
-    def create_health_metrics_payload(portnum: int, **_):
-        metrics_kwargs = {
-            k: v
-            for k, v in kwargs.items()
-            if v is not None and k in telemetry_pb2.HealthMetrics.DESCRIPTOR.fields_by_name
-        }
-        metrics = telemetry_pb2.HealthMetrics(**metrics_kwargs)
-        data = telemetry_pb2.Telemetry(time=int(time.time()), health_metrics=metrics)
-        return create_payload(data, portnum, **kwargs)
-
-    publish_message(create_health_metrics_payload, portnums_pb2.TELEMETRY_APP, **kwargs)
 
-
-def send_waypoint(latitude: float = None, longitude: float = None, **kwargs) -> None:
+def send_waypoint(latitude: float = None, longitude: float = None, **kwargs) -> Optional[AckHandle]:
     """Send a waypoint with optional additional fields (e.g., name, description, icon, etc)."""
 
     if "locked_to" in kwargs:
@@ -328,21 +481,99 @@ def send_waypoint(latitude: float = None, longitude: float = None, **kwargs) ->
         else:
             kwargs.pop("locked_to")
 
-    def create_waypoint_payload(portnum: int, **fields):
-        waypoint_fields = {
-            "latitude_i": int(latitude * 1e7) if latitude is not None else None,
-            "longitude_i": int(longitude * 1e7) if longitude is not None else None,
-        }
-
-        # Filter out None values and remove keys we've already handled
-        reserved_keys = {"latitude", "longitude"}
-        data = {
-            k: v
-            for k, v in fields.items()
-            if v is not None and k not in reserved_keys and k in mesh_pb2.Waypoint.DESCRIPTOR.fields_by_name
-        }
-        waypoint_fields.update(data)
-
-        return create_payload(mesh_pb2.Waypoint(**waypoint_fields), portnum, **kwargs)
-
-    publish_message(create_waypoint_payload, portnums_pb2.WAYPOINT_APP, **kwargs)
+    return publish_message(_waypoint_payload, portnums_pb2.WAYPOINT_APP, latitude=latitude, longitude=longitude, **kwargs)
+
+
+def _waypoint_payload(portnum: int, latitude: float = None, longitude: float = None, **kwargs) -> mesh_pb2.MeshPacket:
+    return create_packet(_WAYPOINT.build(kwargs, _scaled_coordinates(latitude, longitude)), portnum, **kwargs)
+
+
+_USER = MessageBuilder(mesh_pb2.User, exclude=("hw_model", "long_name", "short_name", "public_key"))
+_POSITION = MessageBuilder(mesh_pb2.Position)
+_WAYPOINT = MessageBuilder(mesh_pb2.Waypoint)
+_TELEMETRY = {
+    "device_metrics": MessageBuilder(telemetry_pb2.DeviceMetrics),
+    "power_metrics": MessageBuilder(telemetry_pb2.PowerMetrics),
+    "environment_metrics": MessageBuilder(telemetry_pb2.EnvironmentMetrics),
+    "health_metrics": MessageBuilder(telemetry_pb2.HealthMetrics),
+}
+_device_metrics_payload = partial(_telemetry_payload, "device_metrics")
+_power_metrics_payload = partial(_telemetry_payload, "power_metrics")
+_environment_metrics_payload = partial(_telemetry_payload, "environment_metrics")
+_health_metrics_payload = partial(_telemetry_payload, "health_metrics")
+
+
+class PacketTemplate:
+    """
+    A payload message built once for periodic sends, e.g. a sensor reporting telemetry every
+    minute. send(**changes) updates only the named fields (and the message's time field when
+    stamp_time is set), then sends it through the normal send path with the keyword arguments
+    the template was created with. Field names are resolved against the message and then the
+    submessage given as fields (e.g. a Telemetry's device_metrics), which wins on clashes.
+    """
+
+    def __init__(
+        self,
+        message: Message,
+        portnum: int,
+        fields: Optional[Message] = None,
+        stamp_time: bool = True,
+        **send_kwargs,
+    ) -> None:
+        self.message = message
+        self.portnum = portnum
+        self.send_kwargs = send_kwargs
+        self.stamp_time = stamp_time and "time" in message.DESCRIPTOR.fields_by_name
+        self._lock = Lock()
+        self._targets = {name: message for name in message.DESCRIPTOR.fields_by_name}
+        if fields is not None:
+            self._targets.update((name, fields) for name in fields.DESCRIPTOR.fields_by_name)
+
+    def update(self, **changes) -> None:
+        """Change template fields without sending."""
+        with self._lock:
+            self._apply(changes)
+
+    def _apply(self, changes: dict) -> None:
+        for name, value in changes.items():
+            target = self._targets.get(name)
+            if target is None:
+                raise ValueError(f"{type(self.message).__name__} template has no field {name!r}")
+            if value is None:
+                target.ClearField(name)
+            else:
+                setattr(target, name, value)
+
+    def send(self, **changes) -> Optional[AckHandle]:
+        """Apply changes, stamp the time and send."""
+        with self._lock:
+            self._apply(changes)
+            if self.stamp_time:
+                self.message.time = int(time.time())
+            payload = self.message.SerializeToString()
+        return publish_message(partial(create_packet, payload), self.portnum, **self.send_kwargs)
+
+
+def telemetry_template(metrics: str = "device_metrics", **kwargs) -> PacketTemplate:
+    """
+    A PacketTemplate for periodic telemetry. metrics names the Telemetry variant
+    (device_metrics, power_metrics, environment_metrics or health_metrics). Keyword
+    arguments naming one of its fields are the initial readings; the rest are send options.
+
+        battery = telemetry_template(to=BROADCAST_NUM, battery_level=100)
+        battery.send(battery_level=97, uptime_seconds=3600)
+    """
+    builder = _TELEMETRY.get(metrics)
+    if builder is None:
+        raise ValueError(f"metrics must be one of {sorted(_TELEMETRY)}, got {metrics!r}")
+    message = telemetry_pb2.Telemetry(**{metrics: builder.build(kwargs)})
+    send_kwargs = {k: v for k, v in kwargs.items() if k not in builder.fields}
+    return PacketTemplate(message, portnums_pb2.TELEMETRY_APP, fields=getattr(message, metrics), **send_kwargs)
+
+
+def position_template(latitude: float = None, longitude: float = None, **kwargs) -> PacketTemplate:
+    """A PacketTemplate for periodic position reports; send() takes Position field names (latitude_i, ...)."""
+    kwargs.setdefault("location_source", "LOC_MANUAL")
+    message = _POSITION.build(kwargs, _scaled_coordinates(latitude, longitude))
+    send_kwargs = {k: v for k, v in kwargs.items() if k not in _POSITION.fields}
+    return PacketTemplate(message, portnums_pb2.POSITION_APP, **send_kwargs)
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from threading import Condition, Thread
+import time
+from typing import Callable, Optional, Protocol
+
+from meshtastic import mesh_pb2, portnums_pb2
+from mudp.airtime import active_airtime_limiter
+from pubsub import pub
+
+Priority = mesh_pb2.MeshPacket.Priority
+
+DEFAULT_STARVATION_SEC = 2.0
+DEFAULT_MAX_QUEUED = 4096
+TX_SEND_ERROR = "mesh.tx.send_error"
+
+
+class TxQueueFull(Exception):
+    """The TX scheduler already holds max_queued packets."""
+
+
+class Pacer(Protocol):
+    """Transmit budget consulted by TxScheduler before every send."""
+
+    def reserve(self, raw_size: int, priority: int, portnum: Optional[int] = None) -> float:
+        """
+        Return 0.0 and charge the budget if a raw_size packet (of portnum, when known) may go
+        out now, otherwise the number of seconds to wait before asking again (without
+        charging anything).
+        """
+        ...
+
+
+class FixedRatePacer:
+    """Allows at most packets_per_sec transmissions, evenly spaced."""
+
+    def __init__(self, packets_per_sec: float) -> None:
+        self.interval_sec = 1.0 / float(packets_per_sec)
+        self._next_send = 0.0
+
+    def reserve(self, raw_size: int, priority: int, portnum: Optional[int] = None) -> float:
+        now = time.monotonic()
+        if now < self._next_send:
+            return self._next_send - now
+        self._next_send = now + self.interval_sec
+        return 0.0
+
+
+def _priority_name(priority: int) -> str:
+    try:
+        return Priority.Name(priority)
+    except ValueError:
+        return str(priority)
+
+
+def packet_priority(packet: mesh_pb2.MeshPacket, portnum: Optional[int] = None) -> int:
+    """
+    The priority to schedule packet at. An explicit MeshPacket.priority wins. Unset
+    priorities follow the firmware: RELIABLE for want_ack packets, BACKGROUND for
+    telemetry and DEFAULT otherwise.
+    """
+    if packet.priority:
+        return int(packet.priority)
+    if packet.want_ack:
+        return Priority.RELIABLE
+    if portnum == portnums_pb2.PortNum.TELEMETRY_APP:
+        return Priority.BACKGROUND
+    return Priority.DEFAULT
+
+
+@dataclass
+class TxSchedulerStats:
+    queued: dict[str, int]
+    sent: int
+    dropped: int
+    errors: int
+    paced: int
+    promoted: int
+
+
+@dataclass
+class _Outgoing:
+    raw_bytes: bytes
+    sendto: Callable[[bytes, tuple], None]
+    addr: tuple
+    priority: int
+    portnum: Optional[int] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class TxScheduler:
+    """
+    Transmit thread with one FIFO per MeshPacket.Priority, always sending from the highest
+    non-empty priority first (ACK before RELIABLE before DEFAULT before BACKGROUND).
+
+    Starvation protection: a packet that has waited longer than starvation_sec is sent
+    before higher priorities, oldest first. An optional pacer (see Pacer) spaces sends out;
+    while it asks the thread to wait, newly queued higher-priority packets still overtake
+    the packet that was waiting.
+    """
+
+    def __init__(
+        self,
+        pacer: Optional[Pacer] = None,
+        starvation_sec: float = DEFAULT_STARVATION_SEC,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+    ) -> None:
+        self.pacer = pacer
+        self.starvation_sec = float(starvation_sec)
+        self.max_queued = max(int(max_queued), 1)
+        self._cond = Condition()
+        self._queues: dict[int, deque[_Outgoing]] = {}
+        self._size = 0
+        self._running = False
+        self._thread: Optional[Thread] = None
+        self._sent = 0
+        self._dropped = 0
+        self._errors = 0
+        self._paced = 0
+        self._promoted = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = Thread(target=self._run, name="mudp-tx-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, drain: bool = True, timeout: float | None = 5.0) -> None:
+        """Stop the thread, first sending what is queued unless drain is False."""
+        with self._cond:
+            if not drain:
+                self._dropped += self._size
+                self._queues.clear()
+                self._size = 0
+            self._running = False
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def submit(
+        self,
+        raw_bytes: bytes,
+        sendto: Callable[[bytes, tuple], None],
+        addr: tuple,
+        priority: int,
+        portnum: Optional[int] = None,
+    ) -> None:
+        with self._cond:
+            if self._size >= self.max_queued:
+                self._dropped += 1
+                raise TxQueueFull(f"TX scheduler queue is full ({self.max_queued} packets)")
+            queue = self._queues.get(priority)
+            if queue is None:
+                queue = self._queues[priority] = deque()
+            queue.append(_Outgoing(bytes(raw_bytes), sendto, addr, int(priority), portnum))
+            self._size += 1
+            self._cond.notify()
+
+    def sender(
+        self, sendto: Callable[[bytes, tuple], None], priority: int, portnum: Optional[int] = None
+    ) -> Callable[[bytes, tuple], None]:
+        """A sendto-compatible callable that queues at priority instead of sending."""
+
+        def scheduled_sendto(raw_bytes: bytes, addr: tuple) -> None:
+            self.submit(raw_bytes, sendto, addr, priority, portnum)
+
+        return scheduled_sendto
+
+    def _next_queue(self, now: float) -> tuple[deque[_Outgoing], bool]:
+        """The queue to send from next, and whether it was picked for starvation."""
+        best = None
+        oldest = None
+        for priority, queue in self._queues.items():
+            if not queue:
+                continue
+            if best is None or priority > best[0]:
+                best = (priority, queue)
+            head_age = now - queue[0].enqueued_at
+            if head_age > self.starvation_sec and (oldest is None or head_age > oldest[0]):
+                oldest = (head_age, queue)
+        if oldest is not None and oldest[1] is not best[1]:
+            return oldest[1], True
+        return best[1], False
+
+    def _run(self) -> None:
+        paced_item = None
+        while True:
+            with self._cond:
+                while not self._size and self._running:
+                    self._cond.wait()
+                if not self._size:
+                    return
+                queue, promoted = self._next_queue(time.monotonic())
+                if self.pacer is not None:
+                    head = queue[0]
+                    delay = self.pacer.reserve(len(head.raw_bytes), head.priority, head.portnum)
+                    if delay > 0:
+                        # The wait can end early (new submits, stop()); count each held packet once.
+                        if head is not paced_item:
+                            paced_item = head
+                            self._paced += 1
+                        self._cond.wait(delay)
+                        continue
+                item = queue.popleft()
+                self._size -= 1
+                self._promoted += promoted
+
+            try:
+                item.sendto(item.raw_bytes, item.addr)
+                self._sent += 1
+            except Exception as error:
+                self._errors += 1
+                pub.sendMessage(TX_SEND_ERROR, raw_bytes=item.raw_bytes, priority=item.priority, error=error)
+
+    def stats(self) -> TxSchedulerStats:
+        with self._cond:
+            return TxSchedulerStats(
+                queued={_priority_name(priority): len(queue) for priority, queue in self._queues.items() if queue},
+                sent=self._sent,
+                dropped=self._dropped,
+                errors=self._errors,
+                paced=self._paced,
+                promoted=self._promoted,
+            )
+
+
+_active: Optional[TxScheduler] = None
+
+
+def enable_tx_scheduler(scheduler: Optional[TxScheduler] = None, **kwargs) -> TxScheduler:
+    """Route every transmission (sends, ACKs, retries) through a started TxScheduler."""
+    global _active
+    if _active is not None:
+        _active.stop()
+    _active = scheduler if scheduler is not None else TxScheduler(**kwargs)
+    _active.start()
+    return _active
+
+
+def disable_tx_scheduler(drain: bool = True) -> None:
+    global _active
+    scheduler, _active = _active, None
+    if scheduler is not None:
+        scheduler.stop(drain=drain)
+
+
+def active_tx_scheduler() -> Optional[TxScheduler]:
+    return _active
+
+
+def scheduled_sendto(
+    sendto: Callable[[bytes, tuple], None],
+    priority: int,
+    portnum: Optional[int] = None,
+    blocking: bool = True,
+) -> Callable[[bytes, tuple], None]:
+    """
+    Wrap sendto for the active transmit shaping: charge the active AirtimeLimiter (at
+    send time) and queue on the active TxScheduler at priority. Returns sendto itself
+    when neither is enabled.
+
+    Pass blocking=False from threads that must not sleep for airtime (RX, retries, event
+    loops). Sends queued on the scheduler are charged on its thread, which may always wait.
+    """
+    scheduler = _active
+    limiter = active_airtime_limiter()
+    if limiter is not None:
+        sendto = limiter.wrap(sendto, portnum, priority, blocking=blocking or scheduler is not None)
+    return sendto if scheduler is None else scheduler.sender(sendto, priority, portnum)
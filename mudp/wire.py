@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from typing import NamedTuple
+
+# MeshPacket field numbers (meshtastic/mesh.proto)
+_FIELD_FROM = 1
+_FIELD_TO = 2
+_FIELD_CHANNEL = 3
+_FIELD_ID = 6
+_FIELD_HOP_LIMIT = 9
+
+_WIRE_VARINT = 0
+_WIRE_FIXED64 = 1
+_WIRE_LEN = 2
+_WIRE_FIXED32 = 5
+
+
+class PacketHeader(NamedTuple):
+    """Routing header fields pulled straight from serialized MeshPacket bytes."""
+
+    from_id: int
+    id: int
+    to: int
+    channel: int
+    hop_limit: int
+
+    @classmethod
+    def from_packet(cls, packet) -> "PacketHeader":
+        return cls(
+            int(getattr(packet, "from", 0) or 0),
+            int(packet.id),
+            int(packet.to),
+            int(packet.channel),
+            int(packet.hop_limit),
+        )
+
+    @property
+    def dedupe_key(self) -> tuple[int, int] | None:
+        if self.from_id <= 0 or self.id <= 0:
+            return None
+        return (self.from_id, self.id)
+
+
+def _read_varint(buf, pos: int, end: int) -> tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= end or shift > 63:
+            raise ValueError("truncated varint")
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def peek_from(raw) -> int:
+    """
+    Return the sender node number, reading it directly when 'from' is the first field
+    (as protobuf serializers emit it) and falling back to scan_header otherwise.
+    """
+    if len(raw) >= 5 and raw[0] == (_FIELD_FROM << 3 | _WIRE_FIXED32):
+        return raw[1] | (raw[2] << 8) | (raw[3] << 16) | (raw[4] << 24)
+    header = scan_header(raw)
+    return header.from_id if header is not None else 0
+
+
+def scan_header(raw) -> PacketHeader | None:
+    """
+    Scan the top level of a serialized MeshPacket for from/id/to/channel/hop_limit
+    without parsing, decrypting or copying the decoded/encrypted payloads.
+
+    Accepts bytes, bytearray or memoryview. Returns None if the bytes are not a
+    well-formed protobuf message.
+    """
+    end = len(raw)
+    pos = 0
+    from_id = packet_id = to = channel = hop_limit = 0
+    try:
+        while pos < end:
+            tag = raw[pos]
+            if tag < 0x80:
+                pos += 1
+            else:
+                tag, pos = _read_varint(raw, pos, end)
+            field = tag >> 3
+            wire_type = tag & 0x07
+            if field == 0:
+                return None
+
+            if wire_type == _WIRE_FIXED32:
+                if pos + 4 > end:
+                    return None
+                if field == _FIELD_FROM or field == _FIELD_TO or field == _FIELD_ID:
+                    value = raw[pos] | (raw[pos + 1] << 8) | (raw[pos + 2] << 16) | (raw[pos + 3] << 24)
+                    if field == _FIELD_FROM:
+                        from_id = value
+                    elif field == _FIELD_TO:
+                        to = value
+                    else:
+                        packet_id = value
+                pos += 4
+            elif wire_type == _WIRE_VARINT:
+                value, pos = _read_varint(raw, pos, end)
+                if field == _FIELD_CHANNEL:
+                    channel = value & 0xFFFFFFFF
+                elif field == _FIELD_HOP_LIMIT:
+                    hop_limit = value & 0xFFFFFFFF
+            elif wire_type == _WIRE_LEN:
+                length, pos = _read_varint(raw, pos, end)
+                pos += length
+                if pos > end:
+                    return None
+            elif wire_type == _WIRE_FIXED64:
+                pos += 8
+                if pos > end:
+                    return None
+            else:
+                return None
+    except ValueError:
+        return None
+
+    return PacketHeader(from_id, packet_id, to, channel, hop_limit)
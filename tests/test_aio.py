@@ -0,0 +1,180 @@
+import asyncio
+import socket
+import unittest
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp.aio import AsyncPacketStream
+from mudp.connection import Connection
+from mudp.context import MeshContext
+from mudp.node import Node
+
+
+def build_packet(*, packet_id: int, from_id: int = 1234, portnum: int = portnums_pb2.PortNum.TEXT_MESSAGE_APP) -> bytes:
+    packet = mesh_pb2.MeshPacket()
+    packet.id = packet_id
+    setattr(packet, "from", from_id)
+    packet.to = 4321
+    packet.decoded.portnum = portnum
+    packet.decoded.payload = b"hello"
+    return packet.SerializeToString()
+
+
+def loopback_connection() -> Connection:
+    connection = Connection()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    connection.socket = connection.sock = sock
+    connection.host, connection.port = sock.getsockname()
+    return connection
+
+
+class AsyncPacketStreamTests(unittest.TestCase):
+    def run_async(self, coro):
+        return asyncio.run(asyncio.wait_for(coro, 5.0))
+
+    def test_iterators_filter_unique_packets_from_the_socket(self) -> None:
+        async def scenario():
+            connection = loopback_connection()
+            async with AsyncPacketStream("224.0.0.69", 4403, connection=connection, parse_payload=False) as stream:
+                everything = stream.packets()
+                positions = stream.packets(portnum=portnums_pb2.PortNum.POSITION_APP)
+                from_peer = stream.packets(from_id="!00000007", with_addr=True)
+
+                sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                for raw in (
+                    build_packet(packet_id=1),
+                    build_packet(packet_id=1),
+                    build_packet(packet_id=2, portnum=portnums_pb2.PortNum.POSITION_APP),
+                    build_packet(packet_id=3, from_id=7),
+                ):
+                    sender.sendto(raw, (connection.host, connection.port))
+                sender.close()
+
+                ids = [(await everything.__anext__()).id for _ in range(3)]
+                position = await positions.__anext__()
+                peer_packet, addr = await from_peer.__anext__()
+            return ids, position, peer_packet, addr, everything
+
+        ids, position, peer_packet, addr, everything = self.run_async(scenario())
+
+        self.assertEqual(ids, [1, 2, 3])
+        self.assertEqual(position.id, 2)
+        self.assertEqual(peer_packet.id, 3)
+        self.assertEqual(addr[0], "127.0.0.1")
+        self.assertEqual(everything._queue.qsize(), 1)
+
+    def test_stop_ends_iteration(self) -> None:
+        async def scenario():
+            stream = AsyncPacketStream("224.0.0.69", 4403, connection=loopback_connection())
+            await stream.start()
+            received = []
+
+            async def consume():
+                async for packet in stream:
+                    received.append(packet)
+
+            consumer = asyncio.ensure_future(consume())
+            await asyncio.sleep(0)
+            stream.stop()
+            await consumer
+            return received
+
+        self.assertEqual(self.run_async(scenario()), [])
+
+    def test_slow_consumer_drops_oldest(self) -> None:
+        async def scenario():
+            stream = AsyncPacketStream("224.0.0.69", 4403, connection=loopback_connection(), parse_payload=False)
+            iterator = stream.packets(maxsize=2)
+            for packet_id in (1, 2, 3):
+                stream.stream._handle_datagram(build_packet(packet_id=packet_id), ("127.0.0.1", 4403))
+            first = await iterator.__anext__()
+            return first, iterator.dropped
+
+        first, dropped = self.run_async(scenario())
+
+        self.assertEqual(first.id, 2)
+        self.assertEqual(dropped, 1)
+
+    def test_send_text_message_goes_through_the_transport(self) -> None:
+        async def scenario():
+            connection = loopback_connection()
+            async with AsyncPacketStream("224.0.0.69", 4403, connection=connection, parse_payload=False) as stream:
+                texts = stream.packets(portnum=portnums_pb2.PortNum.TEXT_MESSAGE_APP)
+                with mock.patch("mudp.tx_message_handler.conn.sendto") as blocking_sendto:
+                    await stream.send_text_message("hi there")
+                packet = await texts.__anext__()
+            return packet, blocking_sendto
+
+        with mock.patch("mudp.tx_message_handler.node") as node:
+            node.node_id = "!00000abc"
+            node.channel = ""
+            node.key = ""
+            packet, blocking_sendto = self.run_async(scenario())
+
+        blocking_sendto.assert_not_called()
+        self.assertEqual(getattr(packet, "from"), 0xABC)
+        self.assertEqual(packet.decoded.payload, b"hi there")
+
+    def test_context_supplies_identity_connection_and_registry(self) -> None:
+        async def scenario():
+            context = MeshContext(node=Node(node_id="!00000def"), connection=loopback_connection())
+            async with AsyncPacketStream("224.0.0.69", 4403, context=context, parse_payload=False) as stream:
+                texts = stream.packets(portnum=portnums_pb2.PortNum.TEXT_MESSAGE_APP)
+                handle = await stream.send_text_message("hi", to=0x1234, want_ack=True)
+                packet = await texts.__anext__()
+                tracked = context.pending_acks.get(packet.id)
+                context.pending_acks.clear()
+            return packet, handle, tracked
+
+        packet, handle, tracked = self.run_async(scenario())
+
+        self.assertEqual(getattr(packet, "from"), 0xDEF)
+        self.assertIs(tracked, handle.pending)
+
+    def test_send_packet_retransmits_to_the_group(self) -> None:
+        async def scenario():
+            context = MeshContext(node=Node(node_id="!00000def"), connection=loopback_connection())
+            context.pending_acks._ensure_worker = lambda: None
+            async with AsyncPacketStream("224.0.0.69", 4403, context=context, parse_payload=False) as stream:
+                packet = mesh_pb2.MeshPacket.FromString(build_packet(packet_id=77))
+                packet.want_ack = True
+                handle = await stream.send_packet(packet)
+                with mock.patch.object(context.connection, "sendto") as sendto:
+                    context.pending_acks.process_due(now=handle.pending.next_retry_monotonic)
+                context.pending_acks.clear()
+            return packet, handle, sendto, (context.connection.host, context.connection.port)
+
+        packet, handle, sendto, group = self.run_async(scenario())
+
+        self.assertEqual(handle.retries, 1)
+        sendto.assert_called_once_with(packet.SerializeToString(), group)
+
+    def test_stop_leaves_the_connection_usable(self) -> None:
+        connection = loopback_connection()
+        stream = AsyncPacketStream("224.0.0.69", 4403, connection=connection, parse_payload=False)
+
+        async def round_trip(packet_id):
+            async with stream:
+                packets = stream.packets()
+                sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sender.sendto(build_packet(packet_id=packet_id), (connection.host, connection.port))
+                sender.close()
+                return (await packets.__anext__()).id
+
+        self.assertEqual(self.run_async(round_trip(1)), 1)
+        connection.sendto(b"still open", (connection.host, connection.port))
+        self.assertEqual(connection.recvfrom(timeout=1.0)[0], b"still open")
+        self.assertEqual(self.run_async(round_trip(2)), 2)
+        connection.socket.close()
+
+    def test_send_requires_start(self) -> None:
+        stream = AsyncPacketStream("224.0.0.69", 4403, connection=loopback_connection())
+
+        with self.assertRaises(RuntimeError):
+            self.run_async(stream.send_text_message("hi"))
+
+
+if __name__ == "__main__":
+    unittest.main()
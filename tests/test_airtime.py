@@ -0,0 +1,175 @@
+import time
+import unittest
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp import send_text_message
+from mudp.airtime import (
+    UDP_MIN_PACKET_AIRTIME_MSEC,
+    AirtimeExceeded,
+    AirtimeLimiter,
+    packet_airtime_msec,
+    set_airtime_limiter,
+)
+from mudp.flow_control import SendWindow
+from mudp.reliability import PendingAckRegistry
+from mudp.tx_scheduler import TxScheduler
+
+TEXT = portnums_pb2.PortNum.TEXT_MESSAGE_APP
+TELEMETRY = portnums_pb2.PortNum.TELEMETRY_APP
+
+
+class AirtimeLimiterTests(unittest.TestCase):
+    def test_packet_airtime_model(self) -> None:
+        self.assertEqual(packet_airtime_msec(1), UDP_MIN_PACKET_AIRTIME_MSEC)
+        self.assertEqual(packet_airtime_msec(100), 800)
+
+    def test_bucket_allows_burst_then_throttles(self) -> None:
+        limiter = AirtimeLimiter(duty_cycle=0.5, burst_msec=100)
+
+        self.assertEqual(limiter.reserve(10), 0.0)
+        wait = limiter.reserve(10)
+
+        self.assertAlmostEqual(wait, (80 - 20) / 500, delta=0.01)
+        stats = limiter.stats()
+        self.assertEqual((stats.packets, stats.throttled), (1, 1))
+        self.assertEqual(stats.airtime_msec, 80)
+        self.assertGreater(stats.utilization, 0.0)
+
+    def test_reject_mode_raises_with_wait(self) -> None:
+        limiter = AirtimeLimiter(duty_cycle=0.01, burst_msec=100, mode="reject")
+        limiter.acquire(10)
+
+        with self.assertRaises(AirtimeExceeded) as ctx:
+            limiter.acquire(10)
+
+        self.assertGreater(ctx.exception.wait_sec, 1.0)
+        self.assertEqual(limiter.stats().rejected, 1)
+
+    def test_delay_mode_waits_for_refill(self) -> None:
+        limiter = AirtimeLimiter(duty_cycle=1.0, burst_msec=80)
+        limiter.acquire(10)
+
+        start = time.monotonic()
+        limiter.acquire(10)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.07)
+        self.assertGreater(limiter.stats().delayed_sec, 0.0)
+
+    def test_max_delay_rejects_long_waits(self) -> None:
+        limiter = AirtimeLimiter(duty_cycle=0.01, burst_msec=80, max_delay_sec=0.05)
+        limiter.acquire(10)
+
+        with self.assertRaises(AirtimeExceeded):
+            limiter.acquire(10)
+
+    def test_oversized_packets_go_out_when_the_bucket_is_full(self) -> None:
+        limiter = AirtimeLimiter(duty_cycle=0.1, burst_msec=100)
+
+        self.assertEqual(limiter.reserve(1000), 0.0)
+        self.assertLess(limiter.stats().available_msec, 0.0)
+
+    def test_port_budgets_are_enforced_on_top_of_the_global_one(self) -> None:
+        limiter = AirtimeLimiter(duty_cycle=0.5, burst_msec=1000, port_duty_cycles={TELEMETRY: 0.05})
+
+        self.assertEqual(limiter.reserve(10, portnum=TELEMETRY), 0.0)
+        self.assertGreater(limiter.reserve(10, portnum=TELEMETRY), 0.0)
+        self.assertEqual(limiter.reserve(10, portnum=TEXT), 0.0)
+
+        stats = limiter.stats()
+        self.assertEqual(stats.packets, 2)
+        self.assertEqual(stats.ports[TELEMETRY].packets, 1)
+        self.assertEqual(stats.ports[TELEMETRY].throttled, 1)
+
+    def test_limiter_paces_a_tx_scheduler(self) -> None:
+        sent = []
+        limiter = AirtimeLimiter(duty_cycle=1.0, burst_msec=80)
+        scheduler = TxScheduler(pacer=limiter)
+        for _ in range(2):
+            scheduler.submit(b"x", lambda raw, addr: sent.append(raw), ("224.0.0.69", 4403), 64)
+
+        scheduler.start()
+        scheduler.stop()
+
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(scheduler.stats().paced, 1)
+
+    def test_active_limiter_applies_to_send_functions(self) -> None:
+        limiter = AirtimeLimiter(duty_cycle=0.01, burst_msec=100, mode="reject")
+        set_airtime_limiter(limiter)
+        self.addCleanup(set_airtime_limiter, None)
+
+        with (
+            mock.patch("mudp.tx_message_handler.conn") as conn,
+            mock.patch("mudp.tx_message_handler.node") as node,
+        ):
+            conn.host, conn.port = ("224.0.0.69", 4403)
+            node.node_id, node.channel, node.key = "!00000abc", "", ""
+            self.assertIsNone(send_text_message("first"))
+            with self.assertRaises(AirtimeExceeded):
+                send_text_message("second")
+
+        conn.sendto.assert_called_once()
+        self.assertEqual(limiter.stats().rejected, 1)
+
+    def test_released_window_sends_do_not_sleep_on_the_acking_thread(self) -> None:
+        limiter = AirtimeLimiter(duty_cycle=0.01, burst_msec=100)
+        set_airtime_limiter(limiter)
+        self.addCleanup(set_airtime_limiter, None)
+        self.addCleanup(limiter.close, drain=False)
+        registry = PendingAckRegistry()
+        registry._ensure_worker = lambda: None
+        window = SendWindow(max_in_flight=1, registry=registry)
+
+        with (
+            mock.patch("mudp.reliability.conn") as conn,
+            mock.patch("mudp.tx_message_handler.conn", conn),
+            mock.patch("mudp.tx_message_handler.node") as node,
+            mock.patch("mudp.tx_message_handler.send_window", window),
+        ):
+            conn.host, conn.port = ("224.0.0.69", 4403)
+            node.node_id, node.channel, node.key = "!00000abc", "", ""
+            first = send_text_message("first", to=0x1234, want_ack=True)
+            second = send_text_message("second", to=0x1234, want_ack=True)
+
+            start = time.monotonic()
+            registry.resolve(first.packet_id, routing=mesh_pb2.Routing())
+            elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(conn.sendto.call_count, 1)
+        self.assertEqual(len(limiter._delay_queue), 1)
+        self.assertFalse(second.done())
+
+    def test_scheduler_pacing_applies_port_budgets(self) -> None:
+        limiter = AirtimeLimiter(duty_cycle=1.0, burst_msec=1000, port_duty_cycles={TELEMETRY: 0.08})
+        scheduler = TxScheduler(pacer=limiter)
+        sender = scheduler.sender(lambda raw, addr: None, 64, TELEMETRY)
+        for _ in range(2):
+            sender(b"x", ("224.0.0.69", 4403))
+
+        scheduler.start()
+        scheduler.stop()
+
+        self.assertEqual(limiter.stats().ports[TELEMETRY].packets, 2)
+        self.assertEqual(scheduler.stats().paced, 1)
+
+    def test_non_blocking_sends_queue_instead_of_sleeping(self) -> None:
+        sent = []
+        limiter = AirtimeLimiter(duty_cycle=1.0, burst_msec=80)
+        self.addCleanup(limiter.close)
+        sendto = limiter.wrap(lambda raw, addr: sent.append(raw), blocking=False)
+
+        start = time.monotonic()
+        sendto(b"first", ("224.0.0.69", 4403))
+        sendto(b"second", ("224.0.0.69", 4403))
+
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.assertEqual(sent, [b"first"])
+        limiter.close()
+        self.assertEqual(sent, [b"first", b"second"])
+
+
+if __name__ == "__main__":
+    unittest.main()
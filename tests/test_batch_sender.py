@@ -0,0 +1,156 @@
+import errno
+import socket
+import unittest
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp import send_many, send_text_many
+from mudp.batch_sender import UIO_MAXIOV, send_datagrams, sendmmsg_available
+from mudp.connection import Connection
+from mudp.flow_control import SendWindow
+from mudp.reliability import PendingAckRegistry
+
+
+def receiver_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(1.0)
+    return sock
+
+
+def receive(sock: socket.socket, count: int) -> list[bytes]:
+    return [sock.recvfrom(65535)[0] for _ in range(count)]
+
+
+class SendDatagramsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.receiver = receiver_socket()
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.receiver.close)
+        self.addCleanup(self.sender.close)
+
+    def test_sends_every_datagram_in_order(self) -> None:
+        datagrams = [b"packet %d" % i for i in range(10)]
+
+        sent = send_datagrams(self.sender, datagrams, self.receiver.getsockname())
+
+        self.assertEqual(sent, 10)
+        self.assertEqual(receive(self.receiver, 10), datagrams)
+
+    @unittest.skipUnless(sendmmsg_available(), "sendmmsg requires Linux")
+    def test_batches_use_one_sendmmsg_call_per_chunk(self) -> None:
+        with mock.patch("mudp.batch_sender._sendmmsg_chunk", return_value=UIO_MAXIOV) as chunk:
+            send_datagrams(self.sender, [b"x"] * (UIO_MAXIOV + 1), self.receiver.getsockname())
+
+        self.assertEqual(chunk.call_count, 2)
+        self.assertEqual(self.sender.gettimeout(), None)
+
+    @unittest.skipUnless(sendmmsg_available(), "sendmmsg requires Linux")
+    def test_interrupted_and_full_sends_are_retried(self) -> None:
+        with (
+            mock.patch("mudp.batch_sender._sendmmsg", side_effect=[-1, -1, 1, 1]) as sendmmsg,
+            mock.patch("mudp.batch_sender.ctypes.get_errno", side_effect=[errno.EINTR, errno.EAGAIN]),
+            mock.patch("mudp.batch_sender.select.select") as wait,
+        ):
+            sent = send_datagrams(self.sender, [b"a", b"b"], self.receiver.getsockname())
+
+        self.assertEqual(sent, 2)
+        self.assertEqual([call.args[2] for call in sendmmsg.call_args_list], [2, 2, 2, 1])
+        wait.assert_called_once_with([], [self.sender.fileno()], [])
+
+    def test_hostnames_fall_back_to_sendto(self) -> None:
+        with mock.patch("mudp.batch_sender._sendmmsg_chunk") as chunk:
+            send_datagrams(self.sender, [b"a", b"b"], ("localhost", self.receiver.getsockname()[1]))
+
+        chunk.assert_not_called()
+        self.assertEqual(sorted(receive(self.receiver, 2)), [b"a", b"b"])
+
+
+class SendManyTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.receiver = receiver_socket()
+        self.addCleanup(self.receiver.close)
+        connection = Connection()
+        connection.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(connection.socket.close)
+        connection.host, connection.port = self.receiver.getsockname()
+
+        registry = PendingAckRegistry()
+        registry._ensure_worker = lambda: None
+        self.registry = registry
+        for target in ("mudp.tx_message_handler.conn", "mudp.reliability.conn"):
+            patcher = mock.patch(target, connection)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.window = SendWindow(registry=registry)
+        patcher = mock.patch("mudp.tx_message_handler.send_window", self.window)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("mudp.tx_message_handler.node")
+        node = patcher.start()
+        self.addCleanup(patcher.stop)
+        node.node_id, node.channel, node.key = "!00000abc", "", ""
+
+    def test_fan_out_text_to_a_roster(self) -> None:
+        with mock.patch("mudp.tx_message_handler.send_datagrams", wraps=send_datagrams) as batch:
+            results = send_text_many("hello", [0x1111, "!00002222", 0x3333], want_ack=True)
+
+        batch.assert_called_once()
+        packets = [mesh_pb2.MeshPacket.FromString(raw) for raw in receive(self.receiver, 3)]
+        self.assertEqual([packet.to for packet in packets], [0x1111, 0x2222, 0x3333])
+        self.assertEqual([packet.id for packet in packets], [result.id for result in results])
+        self.assertTrue(all(packet.decoded.payload == b"hello" for packet in packets))
+        self.assertEqual(len({packet.id for packet in packets}), 3)
+        self.assertIs(self.registry.get(results[0].id), results[0].handle.pending)
+
+    def test_mixed_messages_and_common_options(self) -> None:
+        position = mesh_pb2.Position(latitude_i=1)
+        results = send_many(
+            [
+                {"message": "text", "to": 0x1111},
+                {"payload": position, "portnum": portnums_pb2.POSITION_APP},
+            ],
+            hop_limit=5,
+        )
+
+        packets = [mesh_pb2.MeshPacket.FromString(raw) for raw in receive(self.receiver, 2)]
+        self.assertEqual([packet.hop_limit for packet in packets], [5, 5])
+        self.assertEqual(packets[1].decoded.portnum, portnums_pb2.POSITION_APP)
+        self.assertEqual(mesh_pb2.Position.FromString(packets[1].decoded.payload).latitude_i, 1)
+        self.assertIsNone(results[1].handle)
+
+    def test_failed_batch_fails_its_handles(self) -> None:
+        handles = []
+        window_send = self.window.send
+
+        def send(*args, **kwargs):
+            handles.append(window_send(*args, **kwargs))
+            return handles[-1]
+
+        with (
+            mock.patch("mudp.tx_message_handler.send_datagrams", side_effect=OSError(errno.ENETUNREACH, "unreachable")),
+            mock.patch.object(self.window, "send", send),
+            self.assertRaises(OSError),
+        ):
+            send_text_many("hi", [0x1111, 0x2222], want_ack=True)
+
+        self.assertEqual(len(handles), 2)
+        self.assertEqual(len(self.registry), 0)
+        self.assertIsNone(self.window.stats(0x1111))
+        for handle in handles:
+            with self.assertRaises(OSError):
+                handle.result(timeout=0)
+
+    def test_packets_released_after_the_batch_are_sent_directly(self) -> None:
+        self.window.set_limits(max_in_flight=1)
+        results = send_text_many("hi", [0x1111, 0x1111], want_ack=True)
+        self.assertEqual(len(receive(self.receiver, 1)), 1)
+        self.registry.resolve(results[0].id, routing=mesh_pb2.Routing())
+
+        released = mesh_pb2.MeshPacket.FromString(receive(self.receiver, 1)[0])
+        self.assertEqual(released.id, results[1].id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from mudp import bench
+from mudp.dispatch import RX_TEXT, dispatcher
+
+
+class BenchSuiteTests(unittest.TestCase):
+    def test_every_case_runs_and_reports(self) -> None:
+        results = bench.run_benchmarks(iterations=2, repeats=1)
+
+        keys = [result.key for result in results]
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual({result.name.split(".")[0] for result in results}, {"rx", "dedupe", "tx", "crypto", "reliability"})
+        self.assertTrue(all(result.ns_per_op > 0 for result in results))
+        self.assertFalse(dispatcher.has_listeners(RX_TEXT))
+
+    def test_json_output_and_regression_check(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(bench.main(["--filter", "crypto", "--iterations", "2", "--repeats", "1", "--json", path]), 0)
+            with open(path, encoding="utf-8") as handle:
+                document = json.load(handle)
+
+            self.assertEqual([entry["key"] for entry in document["results"]], ["crypto.encrypt", "crypto.decrypt"])
+            self.assertIn("protobuf_backend", document["environment"])
+
+            for entry in document["results"]:
+                entry["ns_per_op"] = 1.0
+            with open(path, "w", encoding="utf-8") as handle:
+                json.dump(document, handle)
+            with redirect_stdout(io.StringIO()), mock.patch("sys.stderr", io.StringIO()) as stderr:
+                status = bench.main(["--filter", "crypto", "--iterations", "2", "--repeats", "1", "--compare", path, "--max-regression", "10"])
+
+        self.assertEqual(status, 1)
+        self.assertIn("regression: crypto.encrypt", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import socket
+import unittest
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp import MeshContext, Node, UDPPacketStream, conn, default_context, node, send_nodeinfo, send_text_message
+from mudp.connection import Connection
+from mudp.encryption import decrypt_packet, generate_hash
+from mudp.reliability import pending_acks
+
+KEY = "1PG7OiApB1nwvP+rz05pAQ=="
+
+
+def localhost_context(receiver: socket.socket, **node_fields) -> MeshContext:
+    connection = Connection()
+    connection.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    connection.host, connection.port = receiver.getsockname()
+    context = MeshContext(node=Node(**node_fields), connection=connection)
+    context.pending_acks._ensure_worker = lambda: None
+    return context
+
+
+def ack_for(packet: mesh_pb2.MeshPacket) -> bytes:
+    ack = mesh_pb2.MeshPacket(id=1, to=getattr(packet, "from"))
+    setattr(ack, "from", packet.to)
+    ack.decoded.portnum = portnums_pb2.PortNum.ROUTING_APP
+    ack.decoded.request_id = packet.id
+    ack.decoded.payload = mesh_pb2.Routing(error_reason=mesh_pb2.Routing.Error.NONE).SerializeToString()
+    return ack.SerializeToString()
+
+
+class MeshContextTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.bind(("127.0.0.1", 0))
+        self.receiver.settimeout(1.0)
+        self.addCleanup(self.receiver.close)
+        self.context = localhost_context(self.receiver, node_id="!00000abc", channel="LongFast", key=KEY)
+        self.addCleanup(self.context.connection.socket.close)
+
+    def receive(self) -> mesh_pb2.MeshPacket:
+        return mesh_pb2.MeshPacket.FromString(self.receiver.recvfrom(65535)[0])
+
+    def test_default_context_is_the_module_singletons(self) -> None:
+        context = default_context()
+
+        self.assertIs(context.connection, conn)
+        self.assertIs(context.node, node)
+        self.assertIs(context.pending_acks, pending_acks)
+
+    def test_send_functions_use_the_context_identity_and_connection(self) -> None:
+        send_text_message("hello", context=self.context)
+
+        packet = self.receive()
+        self.assertEqual(getattr(packet, "from"), 0xABC)
+        self.assertEqual(packet.channel, generate_hash("LongFast", KEY))
+        self.assertEqual(decrypt_packet(packet, KEY).payload, b"hello")
+
+    def test_virtual_nodes_share_the_socket_with_their_own_identity(self) -> None:
+        other = self.context.virtual_node(Node(node_id="!00000def", long_name="Other", channel="LongFast", key=KEY))
+
+        send_nodeinfo(context=self.context)
+        send_nodeinfo(context=other)
+
+        first, second = self.receive(), self.receive()
+        self.assertEqual([getattr(first, "from"), getattr(second, "from")], [0xABC, 0xDEF])
+        user = mesh_pb2.User.FromString(decrypt_packet(second, KEY).payload)
+        self.assertEqual((user.id, user.long_name), ("!00000def", "Other"))
+        self.assertIs(other.connection, self.context.connection)
+        self.assertIs(other.pending_acks, self.context.pending_acks)
+        self.assertIsNot(other.send_window, self.context.send_window)
+
+    def test_reliable_sends_are_tracked_and_retried_in_the_context(self) -> None:
+        with mock.patch.object(pending_acks, "start") as global_start:
+            handle = send_text_message("hello", to=0x1234, want_ack=True, context=self.context)
+
+        global_start.assert_not_called()
+        sent = self.receive()
+        self.assertIs(self.context.pending_acks.get(sent.id), handle.pending)
+
+        self.context.pending_acks.process_due(now=handle.pending.next_retry_monotonic)
+        self.assertEqual(self.receive().id, sent.id)
+
+    def test_stream_resolves_acks_and_dedupes_through_its_context(self) -> None:
+        handle = send_text_message("hello", to=0x1234, want_ack=True, context=self.context)
+        sent = self.receive()
+        first = UDPPacketStream("224.0.0.69", 4403, parse_payload=False, context=self.context)
+        second = UDPPacketStream("224.0.0.69", 4403, parse_payload=False, context=self.context)
+
+        first._handle_datagram(ack_for(sent), ("127.0.0.1", 4403))
+
+        self.assertTrue(handle.result(timeout=0).acked)
+        self.assertIs(second.dedupe, first.dedupe)
+        self.assertTrue(second._is_duplicate_key((0x1234, 1)))
+
+    def test_stream_refuses_dedupe_settings_with_a_shared_cache(self) -> None:
+        with self.assertRaises(ValueError):
+            UDPPacketStream("224.0.0.69", 4403, context=self.context, dedupe_ttl_sec=5.0)
+
+    def test_stream_reuses_an_open_context_socket(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, context=self.context)
+
+        with mock.patch.object(self.context.connection, "setup_multicast") as setup:
+            stream.start()
+            stream.stop()
+
+        setup.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
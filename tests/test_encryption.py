@@ -0,0 +1,55 @@
+import unittest
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp.encryption import CipherKeyCache, cipher_cache, decrypt_packet, encrypt_packet, generate_hash
+
+
+def build_packet() -> mesh_pb2.MeshPacket:
+    packet = mesh_pb2.MeshPacket()
+    packet.id = 5678
+    setattr(packet, "from", 1234)
+    return packet
+
+
+class CipherKeyCacheTests(unittest.TestCase):
+    def test_encrypt_decrypt_round_trip_uses_cached_material(self) -> None:
+        cipher_cache.invalidate()
+        packet = build_packet()
+        data = mesh_pb2.Data()
+        data.portnum = portnums_pb2.PortNum.TEXT_MESSAGE_APP
+        data.payload = b"hello"
+
+        packet.encrypted = encrypt_packet("LongFast", "AQ==", packet, data)
+        decoded = decrypt_packet(packet, "AQ==")
+
+        self.assertEqual(decoded, data)
+        self.assertEqual(packet.channel, generate_hash("LongFast", "AQ=="))
+        self.assertEqual(len(cipher_cache), 1)
+
+    def test_short_alias_and_full_key_hash_identically(self) -> None:
+        self.assertEqual(generate_hash("LongFast", "AQ=="), 8)
+        self.assertEqual(generate_hash("LongFast", "1PG7OiApB1nwvP+rz05pAQ=="), 8)
+
+    def test_lru_eviction_and_invalidate(self) -> None:
+        cache = CipherKeyCache(max_entries=2)
+        first = cache.get("AQ==")
+        cache.get("Ag==")
+        cache.get("AQ==")
+        cache.get("Aw==")
+
+        self.assertIs(cache.get("AQ=="), first)
+        self.assertEqual(len(cache), 2)
+
+        cache.invalidate("AQ==")
+        self.assertIsNot(cache.get("AQ=="), first)
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+    def test_empty_key_still_hashes_but_cannot_encrypt(self) -> None:
+        self.assertEqual(generate_hash("", ""), 0)
+        self.assertIsNone(decrypt_packet(build_packet(), "", silent=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
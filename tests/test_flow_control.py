@@ -0,0 +1,170 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2
+
+from mudp.context import MeshContext
+from mudp.flow_control import SendWindow, SendWindowFull, SendWindowTimeout
+from mudp.node import Node
+from mudp.reliability import PendingAckRegistry, publish_ack, send_ack
+
+ADDR = ("224.0.0.69", 4403)
+ACK = mesh_pb2.Routing(error_reason=mesh_pb2.Routing.Error.NONE)
+
+
+def reliable_packet(packet_id: int, to: int = 4321, want_ack: bool = True) -> mesh_pb2.MeshPacket:
+    return mesh_pb2.MeshPacket(id=packet_id, to=to, want_ack=want_ack)
+
+
+class SendWindowTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = PendingAckRegistry()
+        self.registry._ensure_worker = lambda: None
+        self.window = SendWindow(max_in_flight=2, max_queued=3, registry=self.registry)
+        self.sent: list[int] = []
+        patcher = mock.patch("mudp.reliability.conn")
+        conn = patcher.start()
+        conn.host, conn.port = ADDR
+        self.addCleanup(patcher.stop)
+
+    def sendto(self, raw: bytes, addr) -> None:
+        self.sent.append(mesh_pb2.MeshPacket.FromString(raw).id)
+
+    def send(self, packet_id: int, **kwargs):
+        packet = reliable_packet(packet_id, **kwargs)
+        return self.window.send(packet, packet.SerializeToString(), self.sendto, ADDR)
+
+    def test_sends_beyond_window_queue_until_acked(self) -> None:
+        handles = [self.send(packet_id) for packet_id in range(1, 5)]
+
+        self.assertEqual(self.sent, [1, 2])
+        stats = self.window.stats(4321)
+        self.assertEqual((stats.in_flight, stats.queued, stats.deferred), (2, 2, 2))
+        self.assertIsNone(self.registry.get(3))
+
+        self.registry.resolve(1, routing=ACK)
+        self.assertEqual(self.sent, [1, 2, 3])
+        self.registry.resolve(2, routing=mesh_pb2.Routing(error_reason=mesh_pb2.Routing.Error.NO_ROUTE))
+        self.assertEqual(self.sent, [1, 2, 3, 4])
+
+        self.assertTrue(handles[0].result(timeout=0).acked)
+        self.assertFalse(handles[1].result(timeout=0).acked)
+        self.assertFalse(handles[3].done())
+        self.assertEqual(self.window.stats(4321).queue_high_water, 2)
+
+    def test_idle_destinations_are_forgotten(self) -> None:
+        self.send(1, to=1111)
+        self.send(2, to=1111)
+        self.send(3, to=1111)
+
+        self.registry.resolve(1, routing=ACK)
+        self.assertEqual(self.window.stats(1111).queued, 0)
+        self.registry.resolve(2, routing=ACK)
+        self.registry.resolve(3, routing=ACK)
+
+        self.assertIsNone(self.window.stats(1111))
+        self.assertEqual(self.window._windows, {})
+
+    def test_destinations_have_independent_windows(self) -> None:
+        for packet_id in range(1, 4):
+            self.send(packet_id, to=1111)
+        self.send(10, to=2222)
+
+        self.assertEqual(self.sent, [1, 2, 10])
+        self.assertEqual(set(self.window.stats()), {1111, 2222})
+
+    def test_unreliable_packets_bypass_the_window(self) -> None:
+        for packet_id in range(1, 4):
+            self.send(packet_id)
+        handle = self.send(20, want_ack=False)
+        broadcast = self.send(21, to=0xFFFFFFFF)
+
+        self.assertIsNone(handle)
+        self.assertIsNone(broadcast)
+        self.assertEqual(self.sent, [1, 2, 20, 21])
+
+    def test_full_queue_rejects_sends(self) -> None:
+        for packet_id in range(1, 6):
+            self.send(packet_id)
+
+        with self.assertRaises(SendWindowFull):
+            self.send(6)
+        self.assertEqual(self.window.stats(4321).rejected, 1)
+        self.assertIsNone(self.registry.get(6))
+        self.assertEqual(len(self.window._windows[4321].queue), 3)
+
+    def test_default_window_is_unlimited(self) -> None:
+        window = SendWindow(registry=self.registry)
+        for packet_id in range(1, 11):
+            packet = reliable_packet(packet_id)
+            window.send(packet, packet.SerializeToString(), self.sendto, ADDR)
+
+        self.assertEqual(self.sent, list(range(1, 11)))
+
+    def test_acks_bypass_a_full_window(self) -> None:
+        for packet_id in range(1, 6):
+            self.send(packet_id)
+        connection = mock.Mock(host=ADDR[0], port=ADDR[1], sendto=self.sendto)
+        context = MeshContext(node=Node(node_id="!000004d2"), connection=connection, pending_acks=self.registry, send_window=self.window)
+        request = reliable_packet(99, to=1234)
+        setattr(request, "from", 4321)
+
+        handle = publish_ack(send_ack(request, want_ack=True, packet_id=100, context=context), context=context)
+
+        self.assertEqual(self.sent, [1, 2, 100])
+        self.assertIs(self.registry.get(100), handle.pending)
+
+    def test_cancelled_queued_sends_are_skipped(self) -> None:
+        self.send(1)
+        self.send(2)
+        queued = self.send(3)
+        self.send(4)
+
+        queued.cancel()
+        self.registry.resolve(1, routing=ACK)
+
+        self.assertEqual(self.sent, [1, 2, 4])
+
+    def test_failed_packets_release_their_slot(self) -> None:
+        self.send(1)
+        self.send(2)
+        self.send(3)
+
+        with (
+            mock.patch("mudp.reliability.conn.sendto"),
+            mock.patch("mudp.reliability.pub.sendMessage"),
+        ):
+            for attempt in range(1, 4):
+                self.registry.process_due(now=time.monotonic() + 3600 * attempt)
+
+        self.assertEqual(self.sent, [1, 2, 3])
+
+    def test_send_timeout_waits_for_a_slot(self) -> None:
+        self.send(1)
+        self.send(2)
+        packet = reliable_packet(3)
+
+        with self.assertRaises(SendWindowTimeout):
+            self.window.send(packet, packet.SerializeToString(), self.sendto, ADDR, timeout=0.01)
+
+        threading.Timer(0.05, self.registry.resolve, args=(1,), kwargs={"routing": ACK}).start()
+        handle = self.window.send(packet, packet.SerializeToString(), self.sendto, ADDR, timeout=2.0)
+
+        self.assertEqual(handle.packet_id, 3)
+        self.assertEqual(self.sent, [1, 2, 3])
+        self.assertEqual(self.window.stats(4321).timed_out, 1)
+
+    def test_raising_the_limit_releases_queued_sends(self) -> None:
+        for packet_id in range(1, 5):
+            self.send(packet_id)
+
+        self.window.set_limits(max_in_flight=0)
+
+        self.assertEqual(self.sent, [1, 2, 3, 4])
+        self.assertEqual(self.window.stats(4321).in_flight, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import io
+import logging
+import unittest
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2
+
+from mudp import enable_console_logging, set_quiet, send_text_message
+from mudp.encryption import encrypt_packet
+from mudp.log import logger
+from mudp.tx_message_handler import get_portnum_name
+
+
+class TxLoggingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.addCleanup(logger.setLevel, logger.level)
+        for target in ("conn", "node"):
+            patcher = mock.patch(f"mudp.tx_message_handler.{target}")
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.conn.host, self.conn.port = ("224.0.0.69", 4403)
+        self.node.node_id, self.node.channel, self.node.key = "!00000abc", "", ""
+
+    def test_portnum_names(self) -> None:
+        self.assertEqual(get_portnum_name(1), "TEXT_MESSAGE_APP")
+        self.assertEqual(get_portnum_name(12345), "UNKNOWN_PORTNUM (12345)")
+
+    def test_send_is_logged_at_info_and_bytes_at_debug(self) -> None:
+        with self.assertLogs("mudp", level=logging.DEBUG) as logs:
+            send_text_message("hello", to=1234, hop_limit=2)
+
+        info, debug = logs.records
+        self.assertEqual(info.levelno, logging.INFO)
+        self.assertIn("TEXT_MESSAGE_APP", info.getMessage())
+        self.assertIn("To: 1234", info.getMessage())
+        self.assertIn("hop_limit: 2", info.getMessage())
+        self.assertEqual(debug.levelno, logging.DEBUG)
+        self.assertIn("[SENT]", debug.getMessage())
+
+    def test_nothing_is_formatted_when_info_is_disabled(self) -> None:
+        logger.setLevel(logging.WARNING)
+
+        with mock.patch("mudp.tx_message_handler._log_tx") as log_tx:
+            send_text_message("hello")
+
+        log_tx.assert_not_called()
+        self.conn.sendto.assert_called_once()
+
+    def test_quiet_mode_silences_errors(self) -> None:
+        stream = io.StringIO()
+        handler = enable_console_logging(logging.DEBUG, stream)
+        self.addCleanup(logger.removeHandler, handler)
+        self.conn.sendto.side_effect = OSError("network down")
+
+        set_quiet()
+        send_text_message("hello")
+        self.assertEqual(stream.getvalue(), "")
+
+        set_quiet(False)
+        send_text_message("hello")
+        self.assertIn("Error while sending message: network down", stream.getvalue())
+
+    def test_console_logging_replaces_prints(self) -> None:
+        stream = io.StringIO()
+        handler = enable_console_logging(stream=stream)
+        self.addCleanup(logger.removeHandler, handler)
+
+        send_text_message("hello")
+
+        self.assertIn("[TX] Portnum = TEXT_MESSAGE_APP (1)", stream.getvalue())
+        self.assertNotIn("[SENT]", stream.getvalue())
+
+
+class EncryptionLoggingTests(unittest.TestCase):
+    def test_encrypt_failure_is_a_warning(self) -> None:
+        with self.assertLogs("mudp.encryption", level=logging.WARNING):
+            self.assertIsNone(encrypt_packet("LongFast", "not a key", mesh_pb2.MeshPacket(), mesh_pb2.Data()))
+
+
+if __name__ == "__main__":
+    unittest.main()
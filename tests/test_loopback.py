@@ -0,0 +1,156 @@
+import threading
+import time
+import unittest
+
+from meshtastic.protobuf import mesh_pb2
+from pubsub import pub
+
+from mudp import LoopbackNetwork, MeshContext, Node, UDPPacketStream, publish_ack, send_ack, send_text_message
+
+KEY = "1PG7OiApB1nwvP+rz05pAQ=="
+GROUP = ("224.0.0.69", 4403)
+
+
+def loopback_context(network: LoopbackNetwork, node_id: str) -> MeshContext:
+    context = MeshContext(node=Node(node_id=node_id, channel="LongFast", key=KEY), connection=network.connection(*GROUP))
+    context.pending_acks._ensure_worker = lambda: None
+    return context
+
+
+class LoopbackNetworkTests(unittest.TestCase):
+    def test_datagrams_reach_every_member_of_the_group(self) -> None:
+        network = LoopbackNetwork()
+        sender, receiver = network.connection(*GROUP), network.connection(*GROUP)
+        elsewhere = network.connection("224.0.0.70", 4403)
+
+        sender.sendto(b"hello", GROUP)
+
+        self.assertEqual(receiver.recvfrom(timeout=0), (b"hello", sender.address))
+        self.assertEqual(sender.recvfrom(timeout=0), (b"hello", sender.address))
+        with self.assertRaises(TimeoutError):
+            elsewhere.recvfrom(timeout=0)
+
+    def test_seeded_impairments_are_reproducible(self) -> None:
+        def run() -> tuple[list[bytes], dict[str, int]]:
+            network = LoopbackNetwork(loss=0.3, duplicate=0.2, seed=7)
+            sender, receiver = network.connection(), network.connection(*GROUP)
+            for index in range(200):
+                sender.sendto(index.to_bytes(2, "big"), GROUP)
+            return [receiver.recvfrom(timeout=0)[0] for _ in range(receiver.queued())], network.stats()
+
+        first, stats = run()
+        self.assertEqual(run(), (first, stats))
+        self.assertEqual(stats["sent"], 200)
+        self.assertGreater(stats["dropped"], 0)
+        self.assertGreater(stats["duplicated"], 0)
+        self.assertEqual(len(first), 200 - stats["dropped"] + stats["duplicated"])
+
+    def test_latency_and_reordering_delay_delivery(self) -> None:
+        network = LoopbackNetwork(latency_sec=0.05, reorder=1.0, reorder_delay_sec=0.05)
+        connection = network.connection(*GROUP)
+
+        connection.sendto(b"first", GROUP)
+        network.reorder = 0.0
+        connection.sendto(b"second", GROUP)
+
+        with self.assertRaises(TimeoutError):
+            connection.recvfrom(timeout=0)
+        self.assertEqual(connection.recvfrom(timeout=1.0)[0], b"second")
+        self.assertEqual(connection.recvfrom(timeout=1.0)[0], b"first")
+
+    def test_full_inbox_drops_new_datagrams(self) -> None:
+        network = LoopbackNetwork(max_queued=2)
+        connection = network.connection(*GROUP)
+
+        for payload in (b"a", b"b", b"c"):
+            connection.sendto(payload, GROUP)
+
+        self.assertEqual(network.stats()["overflowed"], 1)
+        self.assertEqual([connection.recvfrom(timeout=0)[0] for _ in range(2)], [b"a", b"b"])
+
+    def test_closed_connection_waits_out_the_timeout(self) -> None:
+        connection = LoopbackNetwork().connection(*GROUP)
+        connection.close()
+
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            connection.recvfrom(timeout=0.05)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        with self.assertRaises(RuntimeError):
+            connection.recvfrom()
+
+
+class LoopbackPipelineTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.network = LoopbackNetwork(seed=1)
+        self.alice = loopback_context(self.network, "!00000abc")
+        self.bob = loopback_context(self.network, "!00000def")
+
+    def start_stream(self, context: MeshContext) -> UDPPacketStream:
+        stream = UDPPacketStream(*GROUP, key=KEY, parse_payload=False, select_timeout=0.05, context=context)
+        stream.start()
+        self.addCleanup(stream.stop)
+        return stream
+
+    def test_stream_idles_after_its_connection_closes(self) -> None:
+        errors = []
+
+        def on_error(error) -> None:
+            errors.append(error)
+
+        pub.subscribe(on_error, "mesh.rx.listener_error")
+        self.addCleanup(pub.unsubscribe, on_error, "mesh.rx.listener_error")
+        self.start_stream(self.alice)
+
+        self.alice.connection.close()
+        time.sleep(0.2)
+
+        self.assertEqual(errors, [])
+
+    def test_retried_message_is_acked_through_streams(self) -> None:
+        def on_text(packet, addr=None) -> None:
+            if packet.to == 0xDEF:
+                publish_ack(send_ack(packet, want_ack=False, context=self.bob), context=self.bob)
+
+        pub.subscribe(on_text, "mesh.rx.text")
+        self.addCleanup(pub.unsubscribe, on_text, "mesh.rx.text")
+        self.start_stream(self.alice)
+        self.start_stream(self.bob)
+
+        self.network.loss = 1.0
+        handle = send_text_message("hello", to=0xDEF, want_ack=True, context=self.alice)
+        self.network.loss = 0.0
+        self.assertEqual(self.network.stats()["dropped"], 2)
+
+        self.alice.pending_acks.process_due(now=handle.pending.next_retry_monotonic)
+
+        result = handle.result(timeout=2.0)
+        self.assertTrue(result.acked)
+        self.assertEqual(result.retries, 1)
+
+    def test_stream_dedupes_duplicated_datagrams(self) -> None:
+        self.network.duplicate = 1.0
+        texts: list[mesh_pb2.MeshPacket] = []
+        duplicates = threading.Semaphore(0)
+
+        def on_text(packet, addr=None) -> None:
+            texts.append(packet)
+
+        def on_duplicate(packet, addr=None, **kwargs) -> None:
+            duplicates.release()
+
+        pub.subscribe(on_text, "mesh.rx.text")
+        pub.subscribe(on_duplicate, "mesh.rx.duplicate")
+        self.addCleanup(pub.unsubscribe, on_text, "mesh.rx.text")
+        self.addCleanup(pub.unsubscribe, on_duplicate, "mesh.rx.duplicate")
+        self.start_stream(self.bob)
+
+        send_text_message("hello", context=self.alice)
+
+        self.assertTrue(duplicates.acquire(timeout=2.0))
+        self.assertEqual(len(texts), 1)
+        self.assertEqual(texts[0].decoded.payload, b"hello")
+
+
+if __name__ == "__main__":
+    unittest.main()
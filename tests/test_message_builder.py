@@ -0,0 +1,89 @@
+import unittest
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2, telemetry_pb2
+
+from mudp import position_template, telemetry_template
+from mudp.message_builder import MessageBuilder
+
+
+def sent_payload(conn: mock.Mock, message_type):
+    packet = mesh_pb2.MeshPacket.FromString(conn.sendto.call_args.args[0])
+    return packet, message_type.FromString(packet.decoded.payload)
+
+
+class MessageBuilderTests(unittest.TestCase):
+    def test_unknown_names_and_none_values_are_dropped(self) -> None:
+        builder = MessageBuilder(telemetry_pb2.DeviceMetrics)
+
+        metrics = builder.build({"battery_level": 80, "voltage": None, "to": 1234})
+
+        self.assertEqual(metrics, telemetry_pb2.DeviceMetrics(battery_level=80))
+
+    def test_kwargs_override_defaults(self) -> None:
+        builder = MessageBuilder(mesh_pb2.Position)
+
+        position = builder.build({"time": 5}, {"time": 1, "altitude": 2})
+
+        self.assertEqual((position.time, position.altitude), (5, 2))
+
+    def test_excluded_fields(self) -> None:
+        builder = MessageBuilder(mesh_pb2.User, exclude=("long_name",))
+
+        self.assertNotIn("long_name", builder.fields)
+        self.assertEqual(builder.values({"long_name": "x", "short_name": "y"}), {"short_name": "y"})
+
+
+class PacketTemplateTests(unittest.TestCase):
+    def setUp(self) -> None:
+        for target in ("conn", "node"):
+            patcher = mock.patch(f"mudp.tx_message_handler.{target}")
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.conn.host, self.conn.port = ("224.0.0.69", 4403)
+        self.node.node_id, self.node.channel, self.node.key = "!00000abc", "", ""
+
+    def test_telemetry_template_updates_only_changed_fields(self) -> None:
+        template = telemetry_template(battery_level=100, voltage=4.1, to=1234, hop_limit=2)
+
+        with mock.patch("mudp.tx_message_handler.time.time", return_value=1700000000):
+            template.send(battery_level=97)
+
+        packet, telemetry = sent_payload(self.conn, telemetry_pb2.Telemetry)
+        self.assertEqual((packet.to, packet.hop_limit), (1234, 2))
+        self.assertEqual(packet.decoded.portnum, portnums_pb2.TELEMETRY_APP)
+        self.assertEqual(telemetry.time, 1700000000)
+        self.assertEqual(telemetry.device_metrics.battery_level, 97)
+        self.assertAlmostEqual(telemetry.device_metrics.voltage, 4.1, places=5)
+
+    def test_each_send_gets_a_new_packet_id(self) -> None:
+        template = telemetry_template("environment_metrics", temperature=20.0)
+
+        template.send()
+        first, _ = sent_payload(self.conn, telemetry_pb2.Telemetry)
+        template.send(temperature=21.0)
+        second, telemetry = sent_payload(self.conn, telemetry_pb2.Telemetry)
+
+        self.assertNotEqual(first.id, second.id)
+        self.assertEqual(telemetry.environment_metrics.temperature, 21.0)
+
+    def test_none_clears_a_field_and_unknown_fields_are_rejected(self) -> None:
+        template = position_template(1.5, 2.5, altitude=100)
+
+        template.update(altitude=None)
+        with self.assertRaises(ValueError):
+            template.update(battery_level=1)
+        template.send(latitude_i=16000000)
+
+        _, position = sent_payload(self.conn, mesh_pb2.Position)
+        self.assertEqual((position.latitude_i, position.longitude_i), (16000000, 25000000))
+        self.assertFalse(position.HasField("altitude"))
+        self.assertEqual(position.location_source, mesh_pb2.Position.LOC_MANUAL)
+
+    def test_unknown_metrics_variant(self) -> None:
+        with self.assertRaises(ValueError):
+            telemetry_template("air_quality")
+
+
+if __name__ == "__main__":
+    unittest.main()
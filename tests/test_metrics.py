@@ -0,0 +1,100 @@
+import os
+import tempfile
+import time
+import unittest
+import urllib.request
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp import LoopbackNetwork, MetricsExporter, UDPPacketStream
+from mudp.encryption import encrypt_packet
+from mudp.reliability import NUM_RELIABLE_RETX, PendingAckRegistry
+
+KEY = "1PG7OiApB1nwvP+rz05pAQ=="
+ADDR = ("127.0.0.1", 4403)
+
+
+def encrypted_text(packet_id: int) -> bytes:
+    packet = mesh_pb2.MeshPacket(id=packet_id, to=0xFFFFFFFF)
+    setattr(packet, "from", 0x1234)
+    data = mesh_pb2.Data(portnum=portnums_pb2.PortNum.TEXT_MESSAGE_APP, payload=b"hello")
+    packet.encrypted = encrypt_packet("LongFast", KEY, packet, data)
+    return packet.SerializeToString()
+
+
+class MetricsExporterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = PendingAckRegistry(connection=LoopbackNetwork().connection())
+        self.registry._ensure_worker = lambda: None
+        self.stream = UDPPacketStream("224.0.0.69", 4403, key=KEY, parse_payload=False, instrument=True)
+        self.exporter = MetricsExporter()
+        self.exporter.add_stream(self.stream, name="rx")
+        self.exporter.add_registry(self.registry, name="tx")
+
+    def track(self, packet_id: int):
+        return self.registry.track(packet_id, 0xDEF, time.time(), b"\x00" * 32, ADDR)
+
+    def test_render_covers_rx_dedupe_and_acks(self) -> None:
+        for packet_id in (1, 1, 2):
+            self.stream._handle_datagram(encrypted_text(packet_id), ADDR)
+        self.track(10)
+        self.registry.resolve(10, None, mesh_pb2.Routing(error_reason=mesh_pb2.Routing.Error.NONE))
+        self.track(11)
+        with mock.patch("mudp.reliability.pub.sendMessage"):
+            for attempt in range(NUM_RELIABLE_RETX):
+                self.registry.process_due(now=time.monotonic() + 3600 * (attempt + 1))
+
+        lines = self.exporter.render().splitlines()
+
+        for expected in (
+            'mudp_rx_packets_total{name="rx"} 3',
+            'mudp_rx_duplicates_total{name="rx"} 1',
+            'mudp_rx_unique_packets_total{name="rx",port="TEXT_MESSAGE_APP"} 2',
+            'mudp_rx_stage_seconds_count{name="rx",stage="decrypt"} 2',
+            'mudp_dedupe_entries{name="rx"} 2',
+            'mudp_dedupe_lookups_total{name="rx",result="hit"} 1',
+            'mudp_dedupe_hit_ratio{name="rx"} 0.3333333333333333',
+            'mudp_pending_acks{name="tx"} 0',
+            f'mudp_retransmits_total{{name="tx"}} {NUM_RELIABLE_RETX - 1}',
+            'mudp_max_retransmit_failures_total{name="tx"} 1',
+            'mudp_ack_rtt_seconds_bucket{name="tx",le="+Inf"} 1',
+            "# TYPE mudp_retransmits counter",
+        ):
+            self.assertIn(expected, lines)
+        self.assertEqual(lines[-1], "# EOF")
+        # The stream has no context, so it brought the module-level registry along as well.
+        self.assertTrue(any(line.startswith('mudp_pending_acks{name="rx"} ') for line in lines))
+
+    def test_prometheus_text_and_textfile(self) -> None:
+        text = self.exporter.render(openmetrics=False)
+        self.assertIn("# TYPE mudp_retransmits_total counter", text)
+        self.assertNotIn("# EOF", text)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "mudp.prom")
+            self.exporter.write_textfile(path)
+            with open(path, encoding="utf-8") as handle:
+                self.assertEqual(handle.read(), text)
+            self.assertEqual(os.listdir(directory), ["mudp.prom"])
+
+    def test_source_names_must_be_unique(self) -> None:
+        with self.assertRaises(ValueError):
+            self.exporter.add_registry(PendingAckRegistry(), name="tx")
+
+    def test_http_server_negotiates_format(self) -> None:
+        host, port = self.exporter.serve(port=0)
+        self.addCleanup(self.exporter.stop)
+        url = f"http://{host}:{port}/metrics"
+
+        with urllib.request.urlopen(url, timeout=5) as response:
+            self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+            self.assertIn(b"mudp_pending_acks", response.read())
+        request = urllib.request.Request(url, headers={"Accept": "application/openmetrics-text; version=1.0.0"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            self.assertTrue(response.headers["Content-Type"].startswith("application/openmetrics-text"))
+            self.assertTrue(response.read().endswith(b"# EOF\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import threading
+import unittest
+from unittest import mock
+
+from mudp.packet_id import PacketIdAllocator
+
+
+class PacketIdAllocatorTests(unittest.TestCase):
+    def test_ids_are_unique_across_threads(self) -> None:
+        allocator = PacketIdAllocator()
+        results: list[list[int]] = []
+        barrier = threading.Barrier(8)
+
+        def allocate() -> None:
+            barrier.wait()
+            results.append([allocator.next_id() for _ in range(20000)])
+
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        ids = [packet_id for chunk in results for packet_id in chunk]
+        self.assertEqual(len(ids), 160000)
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(0 < packet_id < 1 << 32 for packet_id in ids))
+
+    def test_one_prefix_draw_per_block(self) -> None:
+        allocator = PacketIdAllocator(counter_bits=10)
+
+        with mock.patch.object(allocator, "_new_block", wraps=allocator._new_block) as new_block:
+            ids = [allocator.next_id() for _ in range(2048)]
+
+        self.assertEqual(new_block.call_count, 2)
+        self.assertEqual([packet_id & 0x3FF for packet_id in ids[:3]], [0, 1, 2])
+
+    def test_prefixes_are_not_reused_within_the_window(self) -> None:
+        allocator = PacketIdAllocator(reuse_window_sec=10.0, counter_bits=1)
+        now = [100.0]
+
+        with (
+            mock.patch("mudp.packet_id.time.monotonic", side_effect=lambda: now[0]),
+            mock.patch.object(allocator._random, "randrange", side_effect=[7, 7, 9, 7]),
+        ):
+            first = [allocator.next_id() for _ in range(2)]
+            second = [allocator.next_id() for _ in range(2)]
+            self.assertEqual([packet_id >> 1 for packet_id in first + second], [7, 7, 9, 9])
+
+            now[0] += 20.0
+            self.assertEqual(allocator.next_id() >> 1, 7)
+
+    def test_blocks_expire_after_the_window(self) -> None:
+        allocator = PacketIdAllocator(reuse_window_sec=10.0)
+        now = [100.0]
+
+        with mock.patch("mudp.packet_id.time.monotonic", side_effect=lambda: now[0]):
+            first = allocator.next_id()
+            now[0] += 10.0
+            second = allocator.next_id()
+
+        self.assertNotEqual(first >> 10, second >> 10)
+        self.assertEqual(allocator.reserved_prefixes(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+
+from mudp.packet_queue import BLOCK, DROP_NEWEST, DROP_OLDEST, BoundedPacketQueue
+
+
+class BoundedPacketQueueTests(unittest.TestCase):
+    def test_drop_oldest_keeps_newest_items(self) -> None:
+        queue = BoundedPacketQueue(2, DROP_OLDEST)
+        for item in range(4):
+            self.assertTrue(queue.put(item))
+
+        self.assertEqual([queue.get(), queue.get()], [2, 3])
+        stats = queue.stats()
+        self.assertEqual(stats.dropped, 2)
+        self.assertEqual(stats.high_water, 2)
+        self.assertEqual(stats.depth, 0)
+
+    def test_drop_newest_rejects_incoming_items(self) -> None:
+        queue = BoundedPacketQueue(2, DROP_NEWEST)
+        results = [queue.put(item) for item in range(4)]
+
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual([queue.get(), queue.get()], [0, 1])
+        self.assertEqual(queue.stats().dropped, 2)
+
+    def test_block_waits_for_space(self) -> None:
+        queue = BoundedPacketQueue(1, BLOCK)
+        queue.put(0)
+
+        def consume() -> None:
+            time.sleep(0.05)
+            queue.get()
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        self.assertTrue(queue.put(1))
+        consumer.join()
+
+        self.assertEqual(queue.get(), 1)
+        stats = queue.stats()
+        self.assertEqual(stats.blocked, 1)
+        self.assertEqual(stats.dropped, 0)
+
+    def test_close_drains_then_returns_none(self) -> None:
+        queue = BoundedPacketQueue(4)
+        queue.put("a")
+        queue.close()
+
+        self.assertFalse(queue.put("b"))
+        self.assertEqual(queue.get(), "a")
+        self.assertIsNone(queue.get())
+
+    def test_get_times_out(self) -> None:
+        self.assertIsNone(BoundedPacketQueue(1).get(timeout=0.01))
+
+
+if __name__ == "__main__":
+    unittest.main()
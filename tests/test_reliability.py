@@ -0,0 +1,255 @@
+import asyncio
+import concurrent.futures
+import time
+import unittest
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp.reliability import (
+    NUM_RELIABLE_RETX,
+    RTO_MAX_SEC,
+    RTO_MIN_SEC,
+    AckResult,
+    DeliveryError,
+    PendingAckRegistry,
+    compute_retransmission_delay_msec,
+    register_pending_ack,
+)
+from mudp.rx_message_handler import UDPPacketStream
+
+
+def routing_reply(request_id: int, error_reason=mesh_pb2.Routing.Error.NONE) -> mesh_pb2.MeshPacket:
+    packet = mesh_pb2.MeshPacket()
+    packet.id = 777
+    setattr(packet, "from", 4321)
+    packet.to = 1234
+    packet.decoded.portnum = portnums_pb2.PortNum.ROUTING_APP
+    packet.decoded.request_id = request_id
+    packet.decoded.payload = mesh_pb2.Routing(error_reason=error_reason).SerializeToString()
+    return packet
+
+
+class AckHandleTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = PendingAckRegistry()
+        self.registry._ensure_worker = lambda: None
+
+    def track(self, packet_id: int = 55):
+        return self.registry.track(
+            packet_id=packet_id,
+            destination=4321,
+            created_at=time.time(),
+            raw_bytes=b"x" * 10,
+            addr=("224.0.0.69", 4403),
+        )
+
+    def test_ack_resolves_handle_with_rtt_and_retries(self) -> None:
+        handle = self.track()
+        reply = routing_reply(55)
+        routing = mesh_pb2.Routing.FromString(reply.decoded.payload)
+
+        self.registry.resolve(55, packet=reply, routing=routing)
+
+        result = handle.result(timeout=0)
+        self.assertIsInstance(result, AckResult)
+        self.assertTrue(result.acked)
+        self.assertEqual(result.retries, 0)
+        self.assertIs(result.packet, reply)
+        self.assertGreaterEqual(handle.rtt_sec, 0.0)
+
+    def test_nak_resolves_with_error_reason(self) -> None:
+        handle = self.track()
+        routing = mesh_pb2.Routing(error_reason=mesh_pb2.Routing.Error.NO_ROUTE)
+
+        self.registry.resolve(55, packet=None, routing=routing)
+
+        self.assertFalse(handle.result(timeout=0).acked)
+        self.assertEqual(handle.result(timeout=0).error_reason, mesh_pb2.Routing.Error.NO_ROUTE)
+
+    def test_exhausted_retries_raise_delivery_error(self) -> None:
+        handle = self.track()
+
+        with (
+            mock.patch("mudp.reliability.conn.sendto"),
+            mock.patch("mudp.reliability.pub.sendMessage"),
+        ):
+            for _ in range(NUM_RELIABLE_RETX):
+                self.assertFalse(handle.done())
+                self.registry.process_due(now=time.monotonic() + 3600 * (_ + 1))
+
+        self.assertEqual(handle.retries, NUM_RELIABLE_RETX - 1)
+        with self.assertRaises(DeliveryError) as ctx:
+            handle.result(timeout=0)
+        self.assertEqual(ctx.exception.error_reason, mesh_pb2.Routing.Error.MAX_RETRANSMIT)
+
+    def test_handles_are_awaitable(self) -> None:
+        handle = self.track()
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            loop.call_soon(self.registry.resolve, 55, None, mesh_pb2.Routing(error_reason=mesh_pb2.Routing.Error.NONE))
+            return await asyncio.wait_for(handle, 1.0)
+
+        self.assertTrue(asyncio.run(scenario()).acked)
+
+    def test_cancel_and_clear_cancel_handles(self) -> None:
+        first = self.track(1)
+        second = self.track(2)
+
+        self.assertTrue(first.cancel())
+        self.assertIsNone(self.registry.get(1))
+        self.registry.clear()
+
+        self.assertTrue(second.future.cancelled())
+        with self.assertRaises(concurrent.futures.CancelledError):
+            first.result(timeout=0)
+
+    def test_reusing_an_id_cancels_the_older_handle(self) -> None:
+        old = self.track(9)
+        new = self.track(9)
+
+        old.cancel()
+
+        self.assertTrue(old.future.cancelled())
+        self.assertIs(self.registry.get(9), new.pending)
+
+    def test_register_pending_ack_returns_handle_only_for_direct_want_ack(self) -> None:
+        packet = mesh_pb2.MeshPacket(id=77, to=4321, want_ack=True)
+        broadcast = mesh_pb2.MeshPacket(id=78, to=0xFFFFFFFF, want_ack=True)
+
+        with (
+            mock.patch("mudp.reliability.pending_acks", self.registry),
+            mock.patch("mudp.reliability.conn") as conn,
+        ):
+            conn.host, conn.port = "224.0.0.69", 4403
+            handle = register_pending_ack(packet, packet.SerializeToString())
+            self.assertIsNone(register_pending_ack(broadcast, broadcast.SerializeToString()))
+
+        self.assertEqual(handle.packet_id, 77)
+
+    def test_stream_resolves_handle_from_received_ack(self) -> None:
+        handle = self.track(4242)
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=False)
+
+        with mock.patch("mudp.rx_message_handler.pending_acks", self.registry):
+            stream._handle_datagram(routing_reply(4242).SerializeToString(), ("127.0.0.1", 4403))
+
+        result = handle.result(timeout=0)
+        self.assertTrue(result.acked)
+        self.assertEqual(result.packet.decoded.request_id, 4242)
+
+
+class RetryTimerTests(unittest.TestCase):
+    def test_worker_sleeps_until_deadlines_and_exits_when_idle(self) -> None:
+        registry = PendingAckRegistry()
+
+        with (
+            mock.patch("mudp.reliability.compute_retransmission_delay_msec", return_value=20),
+            mock.patch("mudp.reliability.conn.sendto") as sendto,
+            mock.patch("mudp.reliability.pub.sendMessage"),
+        ):
+            handle = registry.track(1, 4321, time.time(), b"x", ("224.0.0.69", 4403))
+            with self.assertRaises(DeliveryError):
+                handle.result(timeout=2.0)
+            worker = registry._worker
+            if worker is not None:
+                worker.join(1.0)
+
+        self.assertEqual(sendto.call_count, NUM_RELIABLE_RETX - 1)
+        self.assertIsNone(registry._worker)
+        self.assertEqual(len(registry), 0)
+
+    def test_resolved_entries_are_skipped_and_compacted(self) -> None:
+        registry = PendingAckRegistry()
+        registry._ensure_worker = lambda: None
+        for packet_id in range(500):
+            registry.track(packet_id, 4321, time.time(), b"x", ("224.0.0.69", 4403))
+        for packet_id in range(499):
+            registry.resolve(packet_id)
+
+        self.assertLess(len(registry._heap), 200)
+        with (
+            mock.patch("mudp.reliability.conn.sendto") as sendto,
+            mock.patch("mudp.reliability.pub.sendMessage"),
+        ):
+            registry.process_due(now=time.monotonic() + 3600)
+
+        sendto.assert_called_once()
+        self.assertEqual(registry.get(499).retries, 1)
+
+
+class AdaptiveTimeoutTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = PendingAckRegistry()
+        self.registry._ensure_worker = lambda: None
+        self.ack = mesh_pb2.Routing(error_reason=mesh_pb2.Routing.Error.NONE)
+
+    def ack_after(self, packet_id: int, rtt_sec: float, destination: int = 4321) -> None:
+        self.registry.track(packet_id, destination, time.time(), b"x", ("224.0.0.69", 4403))
+        self.registry.get(packet_id).sent_monotonic -= rtt_sec
+        self.registry.resolve(packet_id, routing=self.ack)
+
+    def test_cold_start_uses_size_based_delay(self) -> None:
+        self.assertIsNone(self.registry.rtt_stats(4321))
+        self.assertEqual(self.registry.retry_delay_sec(4321, 40), compute_retransmission_delay_msec(40) / 1000.0)
+
+    def test_acks_update_smoothed_rtt_and_rto(self) -> None:
+        self.ack_after(1, 2.0)
+        first = self.registry.rtt_stats("!000010e1")
+        self.assertAlmostEqual(first.srtt_sec, 2.0, places=2)
+        self.assertAlmostEqual(first.rttvar_sec, 1.0, places=2)
+        self.assertAlmostEqual(first.rto_sec, 6.0, places=2)
+
+        for packet_id in range(2, 40):
+            self.ack_after(packet_id, 1.0)
+
+        stats = self.registry.rtt_stats(4321)
+        self.assertEqual(stats.samples, 39)
+        self.assertAlmostEqual(stats.srtt_sec, 1.0, places=1)
+        self.assertLess(stats.rto_sec, 1.5)
+        self.assertEqual(self.registry.retry_delay_sec(4321, 40), stats.rto_sec)
+        self.assertEqual(self.registry.retry_delay_sec(4321, 40, attempt=2), stats.rto_sec * 4)
+        self.assertEqual(set(self.registry.all_rtt_stats()), {4321})
+
+    def test_rto_is_clamped_and_backoff_capped(self) -> None:
+        self.ack_after(1, 0.0001)
+        self.assertEqual(self.registry.rtt_stats(4321).rto_sec, RTO_MIN_SEC)
+        self.assertEqual(self.registry.retry_delay_sec(4321, 40, attempt=50), RTO_MAX_SEC)
+
+    def test_replies_to_retransmitted_packets_are_not_sampled(self) -> None:
+        self.registry.track(1, 4321, time.time(), b"x", ("224.0.0.69", 4403))
+        with (
+            mock.patch("mudp.reliability.conn.sendto"),
+            mock.patch("mudp.reliability.pub.sendMessage"),
+        ):
+            self.registry.process_due(now=time.monotonic() + 3600)
+        result = self.registry.resolve(1, routing=self.ack)
+
+        self.assertEqual(result.retries, 1)
+        self.assertIsNone(self.registry.rtt_stats(4321))
+
+    def test_retries_back_off_from_the_rto(self) -> None:
+        self.ack_after(1, 1.0)
+        rto = self.registry.rtt_stats(4321).rto_sec
+        self.registry.track(2, 4321, time.time(), b"x", ("224.0.0.69", 4403))
+        pending = self.registry.get(2)
+        self.assertAlmostEqual(pending.next_retry_monotonic - pending.sent_monotonic, rto, places=3)
+
+        now = pending.next_retry_monotonic
+        with (
+            mock.patch("mudp.reliability.conn.sendto"),
+            mock.patch("mudp.reliability.pub.sendMessage"),
+        ):
+            self.registry.process_due(now=now)
+
+        self.assertAlmostEqual(pending.next_retry_monotonic - now, rto * 2, places=3)
+
+    def test_reset_rtt_returns_to_cold_start(self) -> None:
+        self.ack_after(1, 1.0)
+        self.registry.reset_rtt(4321)
+        self.assertIsNone(self.registry.rtt_stats(4321))
+
+
+if __name__ == "__main__":
+    unittest.main()
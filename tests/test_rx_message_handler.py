@@ -1,12 +1,21 @@
+import socket
+import threading
 import unittest
 from unittest import mock
 
 from meshtastic.protobuf import mesh_pb2, portnums_pb2
+from pubsub import pub
 
+from mudp.batch_receiver import RecvIntoReceiver, RecvmmsgReceiver, recvmmsg_available
 from mudp.connection import Connection
-from mudp.encryption import normalize_psk
+from mudp.decoded_packet import DecodedPacket
+from mudp.dispatch import TopicDispatcher
+from mudp.packet_queue import BoundedPacketQueue, DROP_OLDEST
+from mudp.encryption import decrypt_packet, encrypt_packet, normalize_psk
+from mudp.keyring import KeyRing
 from mudp.reliability import is_ack, is_nak, is_text_message
 from mudp.rx_message_handler import UDPPacketStream
+from mudp.wire import PacketHeader
 
 
 def build_text_packet(*, from_id: int = 1234, packet_id: int = 5678) -> mesh_pb2.MeshPacket:
@@ -57,6 +66,7 @@ class UDPPacketStreamTests(unittest.TestCase):
             parse_payload=False,
             dedupe_ttl_sec=10.0,
             dedupe_max_entries=32,
+            skip_unsubscribed_topics=False,
         )
         self.addr = ("127.0.0.1", 4403)
 
@@ -92,7 +102,290 @@ class UDPPacketStreamTests(unittest.TestCase):
         self.assertEqual(topics.count("mesh.rx.routing"), 1)
         self.assertEqual(topics.count("mesh.rx.ack"), 1)
         self.assertEqual(topics.count("mesh.rx.duplicate"), 1)
-        resolve.assert_called_once_with(packet.decoded.request_id)
+        resolve.assert_called_once_with(packet.decoded.request_id, packet=mock.ANY, routing=mock.ANY)
+
+    def test_duplicates_skip_decrypt_and_reuse_cached_decoded_payload(self) -> None:
+        first = build_text_packet()
+        first.hop_limit = 3
+        second = build_text_packet()
+        second.hop_limit = 2
+        for packet in (first, second):
+            data = packet.decoded.SerializeToString()
+            packet.ClearField("decoded")
+            packet.encrypted = data
+
+        decoded = mesh_pb2.Data()
+        decoded.portnum = portnums_pb2.PortNum.TEXT_MESSAGE_APP
+        decoded.payload = b"hello"
+        self.stream.key = "AQ=="
+
+        with (
+            mock.patch("mudp.rx_message_handler.pub.sendMessage") as send_message,
+            mock.patch("mudp.rx_message_handler.decrypt_packet", return_value=decoded) as decrypt,
+        ):
+            self.stream._handle_datagram(first.SerializeToString(), self.addr)
+            self.stream._handle_datagram(second.SerializeToString(), self.addr)
+
+        decrypt.assert_called_once()
+        duplicates = [call.kwargs["packet"] for call in send_message.call_args_list if call.args[0] == "mesh.rx.duplicate"]
+        self.assertEqual(len(duplicates), 1)
+        self.assertEqual(duplicates[0].hop_limit, 2)
+        self.assertEqual(duplicates[0].decoded.payload, b"hello")
+
+    def test_header_duplicate_view_and_suppressed_packet_topic(self) -> None:
+        stream = UDPPacketStream(
+            "224.0.0.69",
+            4403,
+            parse_payload=False,
+            duplicate_view="header",
+            publish_duplicate_packets=False,
+            skip_unsubscribed_topics=False,
+        )
+        raw = build_text_packet().SerializeToString()
+
+        with mock.patch("mudp.rx_message_handler.pub.sendMessage") as send_message:
+            stream._handle_datagram(raw, self.addr)
+            stream._handle_datagram(raw, self.addr)
+
+        topics = [call.args[0] for call in send_message.call_args_list]
+        self.assertEqual(topics.count("mesh.rx.packet"), 1)
+        duplicate = next(call.kwargs["packet"] for call in send_message.call_args_list if call.args[0] == "mesh.rx.duplicate")
+        self.assertIsInstance(duplicate, PacketHeader)
+        self.assertEqual(duplicate.dedupe_key, (1234, 5678))
+
+    def test_keyring_decrypts_by_channel_hash_and_records_channel(self) -> None:
+        keyring = KeyRing([("LongFast", "AQ=="), ("Private", "1PG7OiApB1nwvP+rz05pAg==")])
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=False, keyring=keyring, skip_unsubscribed_topics=False)
+        packet = build_text_packet()
+        data = mesh_pb2.Data()
+        data.CopyFrom(packet.decoded)
+        packet.ClearField("decoded")
+        packet.encrypted = encrypt_packet("Private", "1PG7OiApB1nwvP+rz05pAg==", packet, data)
+
+        with (
+            mock.patch("mudp.rx_message_handler.pub.sendMessage") as send_message,
+            mock.patch("mudp.keyring.decrypt_packet", wraps=decrypt_packet) as decrypt,
+        ):
+            stream._handle_datagram(packet.SerializeToString(), self.addr)
+
+        decrypt.assert_called_once()
+        received = next(call.kwargs["packet"] for call in send_message.call_args_list if call.args[0] == "mesh.rx.text")
+        self.assertEqual(received.decoded.payload, b"hello")
+        self.assertEqual(stream.channel_for(received).name, "Private")
+
+    def test_publish_channel_sends_the_channel_name_with_every_packet(self) -> None:
+        keyring = KeyRing([("LongFast", "AQ=="), ("Private", "1PG7OiApB1nwvP+rz05pAg==")])
+        stream = UDPPacketStream(
+            "224.0.0.69", 4403, parse_payload=False, keyring=keyring, skip_unsubscribed_topics=False, publish_channel=True
+        )
+        # No (from, id) identity, so the dedupe cache cannot answer channel_for().
+        packet = build_text_packet(from_id=0, packet_id=0)
+        data = mesh_pb2.Data()
+        data.CopyFrom(packet.decoded)
+        packet.ClearField("decoded")
+        packet.encrypted = encrypt_packet("Private", "1PG7OiApB1nwvP+rz05pAg==", packet, data)
+
+        with mock.patch("mudp.rx_message_handler.pub.sendMessage") as send_message:
+            stream._handle_datagram(packet.SerializeToString(), self.addr)
+
+        channels = {call.args[0]: call.kwargs["channel"] for call in send_message.call_args_list if "packet" in call.kwargs}
+        self.assertEqual(channels["mesh.rx.text"], "Private")
+        self.assertEqual(channels["mesh.rx.unique_packet"], "Private")
+        self.assertIsNone(stream.channel_for(packet))
+
+    def test_keyring_tries_every_candidate_on_hash_collision(self) -> None:
+        # "LongFast" and "LongFasu" differ by one bit, so flipping one key bit collides the hashes.
+        keyring = KeyRing([("LongFast", "1PG7OiApB1nwvP+rz05pAQ=="), ("LongFasu", "1PG7OiApB1nwvP+rz05pAA==")])
+        self.assertEqual(len(keyring.candidates(keyring.get("LongFast").hash)), 2)
+        packet = build_text_packet()
+        data = mesh_pb2.Data()
+        data.CopyFrom(packet.decoded)
+        packet.ClearField("decoded")
+        packet.encrypted = encrypt_packet("LongFasu", "1PG7OiApB1nwvP+rz05pAA==", packet, data)
+
+        decoded, channel = keyring.decrypt(packet)
+
+        self.assertEqual(decoded, data)
+        self.assertEqual(channel.name, "LongFasu")
+
+    def test_lazy_payload_mode_publishes_wrapper_with_cached_typed_payload(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload="lazy", skip_unsubscribed_topics=False)
+        packet = build_text_packet()
+        position = mesh_pb2.Position(latitude_i=455000000, longitude_i=-1226000000)
+        packet.decoded.portnum = portnums_pb2.PortNum.POSITION_APP
+        packet.decoded.payload = position.SerializeToString()
+
+        with mock.patch("mudp.rx_message_handler.pub.sendMessage") as send_message:
+            stream._handle_datagram(packet.SerializeToString(), self.addr)
+
+        received = next(call.kwargs["packet"] for call in send_message.call_args_list if call.args[0] == "mesh.rx.decoded")
+        self.assertIsInstance(received, DecodedPacket)
+        self.assertEqual(received.decoded.payload, position.SerializeToString())
+        self.assertEqual(received.payload, position)
+        self.assertIs(received.payload, received.payload)
+        self.assertEqual(received.text, "latitude_i: 455000000 longitude_i: -1226000000")
+        self.assertEqual(getattr(received, "from"), 1234)
+
+    def test_lazy_payload_mode_still_resolves_acks(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload="lazy", skip_unsubscribed_topics=False)
+        packet = build_ack_packet()
+
+        with (
+            mock.patch("mudp.rx_message_handler.pub.sendMessage") as send_message,
+            mock.patch("mudp.rx_message_handler.pending_acks.resolve", return_value=None) as resolve,
+        ):
+            stream._handle_datagram(packet.SerializeToString(), self.addr)
+
+        topics = [call.args[0] for call in send_message.call_args_list]
+        self.assertEqual(topics.count("mesh.rx.ack"), 1)
+        resolve.assert_called_once_with(packet.decoded.request_id, packet=mock.ANY, routing=mock.ANY)
+
+    def test_text_payload_mode_keeps_rewriting_payload(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=True, skip_unsubscribed_topics=False)
+        packet = build_text_packet()
+        packet.decoded.portnum = portnums_pb2.PortNum.POSITION_APP
+        packet.decoded.payload = mesh_pb2.Position(latitude_i=1).SerializeToString()
+
+        with mock.patch("mudp.rx_message_handler.pub.sendMessage") as send_message:
+            stream._handle_datagram(packet.SerializeToString(), self.addr)
+
+        received = next(call.kwargs["packet"] for call in send_message.call_args_list if call.args[0] == "mesh.rx.decoded")
+        self.assertIsInstance(received, mesh_pb2.MeshPacket)
+        self.assertEqual(received.decoded.payload, b"latitude_i: 1")
+
+    def test_only_topics_with_listeners_are_sent(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=False)
+        received = []
+
+        def on_text(packet, addr=None) -> None:
+            received.append(packet)
+
+        pub.subscribe(on_text, "mesh.rx.text")
+        self.addCleanup(pub.unsubscribe, on_text, "mesh.rx.text")
+
+        with mock.patch("mudp.rx_message_handler.pub.sendMessage", wraps=pub.sendMessage) as send_message:
+            stream._handle_datagram(build_text_packet().SerializeToString(), self.addr)
+
+        self.assertEqual([call.args[0] for call in send_message.call_args_list], ["mesh.rx.text"])
+        self.assertEqual(len(received), 1)
+
+    def test_unsubscribed_acks_still_resolve_pending(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=False)
+        packet = build_ack_packet(request_id=4242)
+
+        with (
+            mock.patch("mudp.rx_message_handler.pub.sendMessage") as send_message,
+            mock.patch("mudp.rx_message_handler.pending_acks.resolve", return_value=None) as resolve,
+        ):
+            stream._handle_datagram(packet.SerializeToString(), self.addr)
+
+        send_message.assert_not_called()
+        resolve.assert_called_once_with(4242, packet=mock.ANY, routing=mock.ANY)
+
+    def test_dispatcher_sees_parent_topic_and_late_subscribers(self) -> None:
+        dispatcher = TopicDispatcher()
+        topic = "mesh.rx.port.4242"
+        self.assertFalse(dispatcher.has_listeners(topic))
+
+        def on_port(packet, addr=None) -> None:
+            pass
+
+        pub.subscribe(on_port, topic)
+        self.addCleanup(pub.unsubscribe, on_port, topic)
+        self.assertTrue(dispatcher.has_listeners(topic))
+        pub.unsubscribe(on_port, topic)
+        self.assertFalse(dispatcher.has_listeners(topic))
+
+        def on_any(topic=pub.AUTO_TOPIC, **kwargs) -> None:
+            pass
+
+        pub.subscribe(on_any, pub.ALL_TOPICS)
+        self.addCleanup(pub.unsubscribe, on_any, pub.ALL_TOPICS)
+        self.assertTrue(dispatcher.has_listeners(topic))
+        self.assertTrue(dispatcher.has_listeners("mesh.rx.not_created_yet"))
+
+    def test_queued_mode_absorbs_slow_subscriber_and_counts_drops(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=False, queue_size=2)
+        queue = BoundedPacketQueue(stream.queue_size, DROP_OLDEST)
+        stream._queues = [queue]
+        release = threading.Event()
+        handled = []
+
+        def slow_handle(raw, addr) -> None:
+            release.wait(1.0)
+            handled.append(raw)
+
+        stream._handle_datagram = slow_handle
+        worker = threading.Thread(target=stream._process_queue, args=(queue,))
+        worker.start()
+
+        raws = [build_text_packet(packet_id=i + 1).SerializeToString() for i in range(5)]
+        for raw in raws:
+            stream._deliver(memoryview(raw), self.addr)
+        stats = stream.queue_stats()
+        release.set()
+        queue.close()
+        worker.join(1.0)
+
+        self.assertEqual(stats.high_water, 2)
+        self.assertGreaterEqual(stats.dropped, 2)
+        self.assertEqual(handled[-1], raws[-1])
+        self.assertTrue(all(isinstance(raw, bytes) for raw in handled))
+
+    def test_decode_workers_keep_per_sender_order_and_dedupe(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=False, decode_workers=4, skip_unsubscribed_topics=False)
+        received = []
+        lock = threading.Lock()
+
+        def record(topic, **kwargs) -> None:
+            if topic == "mesh.rx.unique_packet":
+                packet = kwargs["packet"]
+                with lock:
+                    received.append((getattr(packet, "from"), packet.id))
+
+        senders = range(1, 9)
+        with mock.patch("mudp.rx_message_handler.pub.sendMessage", side_effect=record):
+            stream._start_workers()
+            for packet_id in range(1, 51):
+                for sender in senders:
+                    raw = build_text_packet(from_id=sender, packet_id=packet_id).SerializeToString()
+                    stream._deliver(raw, self.addr)
+                    stream._deliver(raw, self.addr)
+            stream._stop_workers()
+
+        self.assertEqual(len(received), 50 * len(senders))
+        for sender in senders:
+            self.assertEqual([packet_id for from_id, packet_id in received if from_id == sender], list(range(1, 51)))
+        self.assertEqual(stream.queue_stats().dropped, 0)
+
+    def test_process_pool_decodes_with_keyring(self) -> None:
+        keyring = KeyRing([("LongFast", "AQ==")])
+        stream = UDPPacketStream(
+            "224.0.0.69",
+            4403,
+            parse_payload=False,
+            keyring=keyring,
+            decode_workers=2,
+            decode_executor="process",
+        )
+        packet = build_text_packet()
+        data = mesh_pb2.Data()
+        data.CopyFrom(packet.decoded)
+        packet.ClearField("decoded")
+        packet.encrypted = encrypt_packet("LongFast", "AQ==", packet, data)
+
+        stream._start_workers()
+        try:
+            decoded = mesh_pb2.MeshPacket()
+            decoded.ParseFromString(packet.SerializeToString())
+            channel = stream._decode_unique(decoded, packet.SerializeToString())
+            start_method = stream._process_pool._mp_context.get_start_method()
+        finally:
+            stream._stop_workers()
+
+        self.assertEqual(decoded.decoded, data)
+        self.assertEqual(channel.name, "LongFast")
+        self.assertIn(start_method, ("forkserver", "spawn"))
 
     def test_packets_without_stable_identity_are_not_deduped(self) -> None:
         packet = build_text_packet(from_id=0, packet_id=0)
@@ -156,5 +449,79 @@ class UDPPacketStreamTests(unittest.TestCase):
         self.assertIs(conn.sock, fake_socket)
 
 
+class BatchReceiveTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.rx.bind(("127.0.0.1", 0))
+        self.rx.setblocking(False)
+        self.tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.tx.bind(("127.0.0.1", 0))
+        self.addCleanup(self.rx.close)
+        self.addCleanup(self.tx.close)
+
+    def _assert_drains_all_ready_datagrams(self, receiver_cls) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=False, recv_mode="batch", recv_batch_size=4)
+        stream._sock = self.rx
+        stream._receiver = receiver_cls(self.rx, batch_size=stream.recv_batch_size, bufsize=stream.recv_buf)
+
+        raws = [build_text_packet(packet_id=i + 1).SerializeToString() for i in range(10)]
+        for raw in raws:
+            self.tx.sendto(raw, self.rx.getsockname())
+
+        seen = []
+
+        def handle(raw, addr) -> None:
+            self.assertIsInstance(raw, memoryview)
+            seen.append((bytes(raw), addr))
+
+        stream._handle_datagram = handle
+        self.assertEqual(stream._drain_batches(), len(raws))
+        self.assertEqual([raw for raw, _ in seen], raws)
+        self.assertTrue(all(addr == self.tx.getsockname() for _, addr in seen))
+
+    def test_recv_into_ring_drains_all_ready_datagrams(self) -> None:
+        self._assert_drains_all_ready_datagrams(RecvIntoReceiver)
+
+    @unittest.skipUnless(recvmmsg_available(), "recvmmsg is not available")
+    def test_recvmmsg_drains_all_ready_datagrams(self) -> None:
+        self._assert_drains_all_ready_datagrams(RecvmmsgReceiver)
+
+    def test_raw_listeners_keep_their_data_across_batches(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=False, recv_mode="batch", recv_batch_size=2)
+        stream._sock = self.rx
+        stream._receiver = RecvIntoReceiver(self.rx, batch_size=stream.recv_batch_size, bufsize=stream.recv_buf)
+        held = []
+
+        def on_raw(data, addr) -> None:
+            held.append(data)
+
+        pub.subscribe(on_raw, "mesh.rx.raw")
+        self.addCleanup(pub.unsubscribe, on_raw, "mesh.rx.raw")
+
+        raws = [build_text_packet(packet_id=i + 1).SerializeToString() for i in range(4)]
+        for raw in raws[:2]:
+            self.tx.sendto(raw, self.rx.getsockname())
+        stream._drain_batches()
+        for raw in raws[2:]:
+            self.tx.sendto(raw, self.rx.getsockname())
+        stream._drain_batches()
+
+        self.assertEqual(held, raws)
+
+    def test_memoryview_datagrams_decode_through_pipeline(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, parse_payload=False, skip_unsubscribed_topics=False)
+        raw = memoryview(bytearray(build_text_packet().SerializeToString()))
+
+        with mock.patch("mudp.rx_message_handler.pub.sendMessage") as send_message:
+            stream._handle_datagram(raw, ("127.0.0.1", 4403))
+
+        topics = [call.args[0] for call in send_message.call_args_list]
+        self.assertEqual(topics.count("mesh.rx.text"), 1)
+
+    def test_unknown_recv_mode_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            UDPPacketStream("224.0.0.69", 4403, recv_mode="bogus")
+
+
 if __name__ == "__main__":
     unittest.main()
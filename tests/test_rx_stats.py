@@ -0,0 +1,110 @@
+import math
+import threading
+import unittest
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+from pubsub import pub
+
+from mudp import LoopbackNetwork, MeshContext, UDPPacketStream
+from mudp.encryption import encrypt_packet
+from mudp.rx_stats import BUCKET_BOUNDS_NS, LatencyHistogram, RxStats, STAGE_PARSE, bucket_index
+
+KEY = "1PG7OiApB1nwvP+rz05pAQ=="
+ADDR = ("127.0.0.1", 4403)
+
+
+def encrypted_text(packet_id: int, from_id: int = 0x1234) -> bytes:
+    packet = mesh_pb2.MeshPacket(id=packet_id, to=0xFFFFFFFF)
+    setattr(packet, "from", from_id)
+    data = mesh_pb2.Data(portnum=portnums_pb2.PortNum.TEXT_MESSAGE_APP, payload=b"hello")
+    packet.encrypted = encrypt_packet("LongFast", KEY, packet, data)
+    return packet.SerializeToString()
+
+
+class LatencyHistogramTests(unittest.TestCase):
+    def test_buckets_are_powers_of_two(self) -> None:
+        self.assertEqual(bucket_index(0), 0)
+        self.assertEqual(bucket_index(255), 0)
+        self.assertEqual(bucket_index(256), 1)
+        self.assertEqual(bucket_index(1 << 40), len(BUCKET_BOUNDS_NS))
+
+    def test_shards_from_every_thread_are_merged(self) -> None:
+        stats = RxStats()
+
+        def work(ns: int) -> None:
+            shard = stats.shard()
+            for _ in range(10):
+                shard.received += 1
+                shard.observe(STAGE_PARSE, ns)
+
+        threads = [threading.Thread(target=work, args=(ns,)) for ns in (300, 3000, 1 << 40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        snapshot = stats.snapshot()
+        parse = snapshot.stages["parse"]
+        self.assertEqual(snapshot.received, 30)
+        self.assertEqual(parse.count, 30)
+        self.assertEqual(parse.percentile_ns(0.3), 512.0)
+        self.assertEqual(parse.percentile_ns(0.5), 4096.0)
+        self.assertEqual(parse.percentile_ns(0.99), math.inf)
+        self.assertIsNone(LatencyHistogram().percentile_ns(0.5))
+
+
+class StreamInstrumentationTests(unittest.TestCase):
+    def test_disabled_by_default(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, key=KEY)
+        stream._handle_datagram(encrypted_text(1), ADDR)
+
+        self.assertIsNone(stream.stats_snapshot())
+
+    def test_counters_and_stage_latency(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, key=KEY, parse_payload=False, instrument=True)
+
+        stream._handle_datagram(encrypted_text(1), ADDR)
+        stream._handle_datagram(encrypted_text(1), ADDR)
+        stream._handle_datagram(encrypted_text(2), ADDR)
+        stream._handle_datagram(encrypted_text(3, from_id=0x9999), ADDR)
+        stream._handle_datagram(b"\xff\xff\xff", ADDR)
+
+        snapshot = stream.stats_snapshot()
+        self.assertEqual(
+            (snapshot.received, snapshot.unique, snapshot.duplicates, snapshot.decode_errors), (5, 3, 1, 1)
+        )
+        self.assertEqual(snapshot.ports, {"TEXT_MESSAGE_APP": 3})
+        self.assertEqual(snapshot.stages["dedupe"].count, 4)
+        self.assertEqual(snapshot.stages["decrypt"].count, 3)
+        self.assertEqual(snapshot.stages["payload"].count, 0)
+        self.assertEqual(snapshot.stages["dispatch"].count, 4)
+        self.assertGreater(snapshot.stages["decrypt"].mean_ns, 0)
+
+    def test_undecryptable_packets_are_counted_as_encrypted(self) -> None:
+        stream = UDPPacketStream("224.0.0.69", 4403, instrument=True)
+
+        stream._handle_datagram(encrypted_text(1), ADDR)
+
+        self.assertEqual(stream.stats_snapshot().ports, {"ENCRYPTED": 1})
+
+    def test_snapshots_are_published_at_the_interval(self) -> None:
+        network = LoopbackNetwork()
+        context = MeshContext(connection=network.connection("224.0.0.69", 4403))
+        received = threading.Event()
+
+        def on_stats(stats) -> None:
+            if stats.received:
+                received.set()
+
+        pub.subscribe(on_stats, "mesh.rx.stats")
+        self.addCleanup(pub.unsubscribe, on_stats, "mesh.rx.stats")
+        stream = UDPPacketStream("224.0.0.69", 4403, key=KEY, select_timeout=0.01, stats_interval_sec=0.02, context=context)
+        stream.start()
+        self.addCleanup(stream.stop)
+        context.connection.sendto(encrypted_text(1), ("224.0.0.69", 4403))
+
+        self.assertTrue(received.wait(2.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
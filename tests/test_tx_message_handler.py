@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp import send_position, send_text_message
+from mudp.tx_message_handler import EncodedPacket, create_payload, encode_packet, publish_message
+
+
+class PublishMessageTests(unittest.TestCase):
+    def setUp(self) -> None:
+        for target in ("conn", "node"):
+            patcher = mock.patch(f"mudp.tx_message_handler.{target}")
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.conn.host, self.conn.port = ("224.0.0.69", 4403)
+        self.node.node_id, self.node.channel, self.node.key = "!00000abc", "", ""
+        patcher = mock.patch("mudp.tx_message_handler.send_window")
+        self.send_window = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sent(self) -> tuple[mesh_pb2.MeshPacket, bytes]:
+        packet, raw = self.send_window.send.call_args.args[:2]
+        return packet, raw
+
+    def test_built_packet_is_sent_without_a_round_trip(self) -> None:
+        built = mesh_pb2.MeshPacket(id=7, to=1234, want_ack=True)
+        with (
+            mock.patch("mudp.tx_message_handler.create_packet", return_value=built),
+            mock.patch("mudp.tx_message_handler.mesh_pb2.MeshPacket.FromString") as from_string,
+        ):
+            send_text_message("hello", to=1234, want_ack=True)
+
+        from_string.assert_not_called()
+        packet, raw = self.sent()
+        self.assertIs(packet, built)
+        self.assertEqual(raw, built.SerializeToString())
+
+    def test_send_functions_no_longer_serialize_through_create_payload(self) -> None:
+        with mock.patch("mudp.tx_message_handler.create_payload", side_effect=AssertionError):
+            send_position(1.5, 2.5, to=1234)
+
+        packet, raw = self.sent()
+        self.assertEqual(mesh_pb2.MeshPacket.FromString(raw), packet)
+        self.assertEqual(packet.decoded.portnum, portnums_pb2.POSITION_APP)
+
+    def test_payload_functions_returning_bytes_still_work(self) -> None:
+        def legacy_payload(portnum: int, **kwargs) -> bytes:
+            return create_payload(b"raw", portnum, **kwargs)
+
+        publish_message(legacy_payload, 256, to=1234)
+
+        packet, raw = self.sent()
+        self.assertEqual(packet.to, 1234)
+        self.assertEqual(packet.SerializeToString(), raw)
+
+    def test_encode_packet_passes_encoded_packets_through(self) -> None:
+        encoded = EncodedPacket(mesh_pb2.MeshPacket(id=1), b"\x0d\x01")
+
+        self.assertIs(encode_packet(encoded), encoded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import time
+import unittest
+from unittest import mock
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp import send_device_telemetry, send_text_message
+from mudp.tx_scheduler import (
+    Priority,
+    TxQueueFull,
+    TxScheduler,
+    active_tx_scheduler,
+    disable_tx_scheduler,
+    enable_tx_scheduler,
+    packet_priority,
+)
+
+ADDR = ("224.0.0.69", 4403)
+
+
+class StepPacer:
+    def __init__(self, delays: list[float]) -> None:
+        self.delays = delays
+        self.reserved: list[tuple[int, int]] = []
+
+    def reserve(self, raw_size: int, priority: int, portnum: int | None = None) -> float:
+        if self.delays:
+            return self.delays.pop(0)
+        self.reserved.append((raw_size, priority))
+        return 0.0
+
+
+class TxSchedulerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sent: list[bytes] = []
+
+    def sendto(self, raw: bytes, addr) -> None:
+        self.sent.append(raw)
+
+    def test_higher_priorities_are_sent_first(self) -> None:
+        scheduler = TxScheduler()
+        scheduler.submit(b"telemetry", self.sendto, ADDR, Priority.BACKGROUND)
+        scheduler.submit(b"text", self.sendto, ADDR, Priority.DEFAULT)
+        scheduler.submit(b"reliable", self.sendto, ADDR, Priority.RELIABLE)
+        scheduler.submit(b"ack", self.sendto, ADDR, Priority.ACK)
+        self.assertEqual(scheduler.stats().queued["BACKGROUND"], 1)
+
+        scheduler.start()
+        scheduler.stop()
+
+        self.assertEqual(self.sent, [b"ack", b"reliable", b"text", b"telemetry"])
+        self.assertEqual(scheduler.stats().sent, 4)
+        self.assertEqual(scheduler.stats().promoted, 0)
+
+    def test_starved_packets_are_promoted_oldest_first(self) -> None:
+        scheduler = TxScheduler(starvation_sec=0.0)
+        scheduler.submit(b"old telemetry", self.sendto, ADDR, Priority.BACKGROUND)
+        time.sleep(0.002)
+        scheduler.submit(b"ack", self.sendto, ADDR, Priority.ACK)
+        time.sleep(0.002)
+
+        scheduler.start()
+        scheduler.stop()
+
+        self.assertEqual(self.sent, [b"old telemetry", b"ack"])
+        self.assertEqual(scheduler.stats().promoted, 1)
+
+    def test_pacer_delays_sends(self) -> None:
+        pacer = StepPacer([0.01])
+        scheduler = TxScheduler(pacer=pacer)
+        scheduler.submit(b"abc", self.sendto, ADDR, Priority.DEFAULT)
+
+        scheduler.start()
+        scheduler.stop()
+
+        self.assertEqual(self.sent, [b"abc"])
+        self.assertEqual(pacer.reserved, [(3, Priority.DEFAULT)])
+        self.assertEqual(scheduler.stats().paced, 1)
+
+    def test_full_queue_and_dropping_stop(self) -> None:
+        scheduler = TxScheduler(max_queued=2)
+        scheduler.submit(b"1", self.sendto, ADDR, Priority.DEFAULT)
+        scheduler.submit(b"2", self.sendto, ADDR, Priority.DEFAULT)
+
+        with self.assertRaises(TxQueueFull):
+            scheduler.submit(b"3", self.sendto, ADDR, Priority.DEFAULT)
+        scheduler.stop(drain=False)
+
+        self.assertEqual(self.sent, [])
+        self.assertEqual(scheduler.stats().dropped, 3)
+
+    def test_send_errors_are_published(self) -> None:
+        scheduler = TxScheduler()
+
+        def failing_sendto(raw, addr):
+            raise OSError("network down")
+
+        scheduler.submit(b"x", failing_sendto, ADDR, Priority.DEFAULT)
+        with mock.patch("mudp.tx_scheduler.pub.sendMessage") as send_message:
+            scheduler.start()
+            scheduler.stop()
+
+        self.assertEqual(send_message.call_args.args[0], "mesh.tx.send_error")
+        self.assertEqual(scheduler.stats().errors, 1)
+
+    def test_packet_priority_defaults(self) -> None:
+        self.assertEqual(packet_priority(mesh_pb2.MeshPacket(priority=Priority.ACK, want_ack=True)), Priority.ACK)
+        self.assertEqual(packet_priority(mesh_pb2.MeshPacket(want_ack=True)), Priority.RELIABLE)
+        self.assertEqual(
+            packet_priority(mesh_pb2.MeshPacket(), portnums_pb2.PortNum.TELEMETRY_APP),
+            Priority.BACKGROUND,
+        )
+        self.assertEqual(packet_priority(mesh_pb2.MeshPacket()), Priority.DEFAULT)
+
+    def test_enabled_scheduler_carries_send_functions(self) -> None:
+        with (
+            mock.patch("mudp.tx_message_handler.conn") as conn,
+            mock.patch("mudp.tx_message_handler.node") as node,
+        ):
+            conn.host, conn.port = ADDR
+            node.node_id, node.channel, node.key = "!00000abc", "", ""
+            scheduler = TxScheduler()
+            with mock.patch("mudp.tx_scheduler._active", scheduler):
+                send_device_telemetry(battery_level=50)
+                send_text_message("hi")
+            conn.sendto.assert_not_called()
+            self.assertEqual(scheduler.stats().queued, {"DEFAULT": 1, "BACKGROUND": 1})
+            scheduler.start()
+            scheduler.stop()
+
+        sent = [mesh_pb2.MeshPacket.FromString(call.args[0]) for call in conn.sendto.call_args_list]
+        self.assertEqual([packet.decoded.portnum for packet in sent], [portnums_pb2.TEXT_MESSAGE_APP, portnums_pb2.TELEMETRY_APP])
+
+    def test_enable_and_disable_the_global_scheduler(self) -> None:
+        scheduler = enable_tx_scheduler(starvation_sec=1.0)
+        self.assertIs(active_tx_scheduler(), scheduler)
+        self.assertTrue(scheduler._thread.is_alive())
+
+        disable_tx_scheduler()
+
+        self.assertIsNone(active_tx_scheduler())
+        self.assertIsNone(scheduler._thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
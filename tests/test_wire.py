@@ -0,0 +1,66 @@
+import unittest
+
+from meshtastic.protobuf import mesh_pb2, portnums_pb2
+
+from mudp.wire import PacketHeader, peek_from, scan_header
+
+
+def build_packet() -> mesh_pb2.MeshPacket:
+    packet = mesh_pb2.MeshPacket()
+    packet.id = 0xDEADBEEF
+    setattr(packet, "from", 0x12345678)
+    packet.to = 0xFFFFFFFF
+    packet.channel = 8
+    packet.hop_limit = 3
+    packet.hop_start = 7
+    packet.want_ack = True
+    packet.rx_snr = 1.5
+    packet.decoded.portnum = portnums_pb2.PortNum.TEXT_MESSAGE_APP
+    packet.decoded.payload = b"hello"
+    return packet
+
+
+class ScanHeaderTests(unittest.TestCase):
+    def test_scan_matches_full_parse(self) -> None:
+        packet = build_packet()
+        raw = packet.SerializeToString()
+
+        header = scan_header(raw)
+
+        self.assertEqual(header, PacketHeader.from_packet(packet))
+        self.assertEqual(header.dedupe_key, (0x12345678, 0xDEADBEEF))
+
+    def test_scan_accepts_memoryview_and_encrypted_payload(self) -> None:
+        packet = build_packet()
+        packet.encrypted = b"\x00" * 200
+        raw = memoryview(bytearray(packet.SerializeToString()))
+
+        self.assertEqual(scan_header(raw), PacketHeader.from_packet(packet))
+
+    def test_missing_identity_has_no_dedupe_key(self) -> None:
+        packet = build_packet()
+        packet.id = 0
+
+        self.assertIsNone(scan_header(packet.SerializeToString()).dedupe_key)
+
+    def test_truncated_or_garbage_input_returns_none(self) -> None:
+        raw = build_packet().SerializeToString()
+
+        self.assertIsNone(scan_header(raw[:3]))
+        self.assertIsNone(scan_header(raw[:-1]))
+        self.assertIsNone(scan_header(b"\x07\x00"))
+        self.assertIsNone(scan_header(b"\xff\xff\xff"))
+
+    def test_peek_from_fast_path_and_fallback(self) -> None:
+        packet = build_packet()
+        raw = packet.SerializeToString()
+        self.assertEqual(peek_from(raw), 0x12345678)
+
+        # 'from' is not the first field here, so peek_from has to scan.
+        reordered = mesh_pb2.MeshPacket(id=7).SerializeToString() + raw
+        self.assertEqual(peek_from(reordered), 0x12345678)
+        self.assertEqual(peek_from(b"\x07"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()